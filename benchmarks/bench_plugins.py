@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Measure the throughput and the latency of each stage of the acquisition of the Redpitaya plugins.
+
+The viewer, sweep and move plugins are run headless against the local simulated board. For each
+(nsamples, decimation) case the grabs are timed as a whole and per stage: arming, sleeping before
+the trigger, trigger polling, data transfer and parsing, and emission of the DataToExport. The
+results can be saved as a baseline, a later run failing if the median time of a case has increased
+by more than the threshold.
+
+usage: python bench_plugins.py [--nsamples 1000 16384] [--decimation 1 64] [--repeat 50]
+                               [--save baseline.json] [--baseline baseline.json --threshold 0.2]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Callable, Dict, List
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+STAGES = ('arm', 'sleep', 'trigger', 'transfer', 'emit')
+PERCENTILES = (50, 90, 99)
+
+
+class StageTimer:
+    """ Accumulate the durations of the calls of wrapped functions, per stage name"""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def wrap(self, stage: str, function: Callable) -> Callable:
+        @wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.durations[stage].append(time.perf_counter() - start)
+        return timed
+
+    def instrument_viewer(self, plugin):
+        """ Time the stages of the acquisition of a viewer plugin"""
+        plugin.controller.acquisition_start = self.wrap('arm', plugin.controller.acquisition_start)
+        plugin.trigger_waiter.sleep = self.wrap('sleep', plugin.trigger_waiter.sleep)
+        plugin.wait_acquisition = self.wrap('trigger', plugin.wait_acquisition)
+        plugin.read_channels = self.wrap('transfer', plugin.read_channels)
+        plugin.publish = self.wrap('emit', plugin.publish)
+
+    def reset(self):
+        self.durations.clear()
+
+
+def percentiles(durations) -> Dict[str, float]:
+    values = np.percentile(np.asarray(durations) * 1000, PERCENTILES)
+    return {f'p{percentile}': float(value) for percentile, value in zip(PERCENTILES, values)}
+
+
+def connect(plugin, simulator: RedPitayaSimulator):
+    plugin.emit_status = lambda status: None
+    plugin.settings.child('ip_address').setValue(simulator.address[0])
+    plugin.settings.child('port').setValue(simulator.address[1])
+
+
+def set_setting(plugin, *path, value):
+    param = plugin.settings.child(*path)
+    param.setValue(value)
+    plugin.commit_settings(param)
+
+
+def bench_viewer(plugin_class, simulator: RedPitayaSimulator, nsamples_grid, decimation_grid,
+                 repeat: int, configure: Callable = None) -> Dict[str, dict]:
+    """ Time repeat grabs of a viewer plugin for each (nsamples, decimation) case"""
+    plugin = plugin_class()
+    connect(plugin, simulator)
+    plugin.ini_detector()
+    if configure is not None:
+        configure(plugin)
+    timer = StageTimer()
+    timer.instrument_viewer(plugin)
+    results = {}
+    for nsamples in nsamples_grid:
+        for decimation in decimation_grid:
+            set_setting(plugin, 'sampling', 'nsamples', value=nsamples)
+            set_setting(plugin, 'sampling', 'decimation', value=decimation)
+            plugin.grab_data()  # warm up, the configuration being cached by the first grab
+            timer.reset()
+            durations = []
+            for ind in range(repeat):
+                start = time.perf_counter()
+                plugin.grab_data()
+                durations.append(time.perf_counter() - start)
+            results[f'nsamples={nsamples} decimation={decimation}'] = dict(
+                fps=len(durations) / sum(durations), total=percentiles(durations),
+                stages={stage: percentiles(timer.durations[stage]) for stage in STAGES
+                        if timer.durations[stage]})
+    plugin.close()
+    return results
+
+
+def bench_move(simulator: RedPitayaSimulator, repeat: int) -> Dict[str, dict]:
+    """ Time the moves of the generator amplitude and frequency and their read back"""
+    from pymodaq.utils.data import DataActuator
+    from pymodaq_plugins_redpitaya.daq_move_plugins.daq_move_RedpitayaSCPI import \
+        DAQ_Move_RedpitayaSCPI
+
+    plugin = DAQ_Move_RedpitayaSCPI()
+    connect(plugin, simulator)
+    plugin.ini_stage()
+    results = {}
+    for axis, values in (('amplitude', np.linspace(0.1, 0.5, repeat)),
+                         ('frequency', np.linspace(1e3, 1e5, repeat))):
+        plugin.axis_name = axis
+        plugin.commit_settings(plugin.settings.child('controller', 'axis'))
+        moves, reads = [], []
+        for value in values:
+            start = time.perf_counter()
+            plugin.move_abs(DataActuator(data=float(value), units=plugin.axis_unit))
+            moves.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            plugin.get_actuator_value()
+            reads.append(time.perf_counter() - start)
+        results[f'axis={axis}'] = dict(fps=len(moves) / (sum(moves) + sum(reads)),
+                                       total=percentiles(np.add(moves, reads)),
+                                       stages=dict(move=percentiles(moves),
+                                                   read=percentiles(reads)))
+    plugin.close()
+    return results
+
+
+def configure_sweep(plugin):
+    set_setting(plugin, 'output', 'persistent', value=True)
+
+
+def print_results(name: str, results: Dict[str, dict]):
+    print(f'\n{name}')
+    stages = sorted({stage for result in results.values() for stage in result['stages']},
+                    key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES))
+    header = f"{'case':<32}{'fps':>9}" + ''.join(f'{"p" + str(p) + " (ms)":>12}'
+                                                for p in PERCENTILES)
+    print(header + ''.join(f'{stage + " p50":>14}' for stage in stages))
+    for case, result in results.items():
+        line = f"{case:<32}{result['fps']:>9.1f}" + ''.join(
+            f"{result['total'][f'p{p}']:>12.3f}" for p in PERCENTILES)
+        print(line + ''.join(f"{result['stages'].get(stage, {}).get('p50', np.nan):>14.3f}"
+                             for stage in stages))
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """ List the cases whose median time exceeds the baseline one by more than threshold"""
+    regressions = []
+    for plugin, cases in results.items():
+        for case, result in cases.items():
+            reference = baseline.get(plugin, {}).get(case)
+            if reference is None:
+                continue
+            median, reference_median = result['total']['p50'], reference['total']['p50']
+            if median > reference_median * (1 + threshold):
+                regressions.append(f'{plugin} {case}: {median:.3f} ms instead of '
+                                   f'{reference_median:.3f} ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--nsamples', type=int, nargs='+', default=[1000, 4096, 16384])
+    parser.add_argument('--decimation', type=int, nargs='+', default=[1, 8, 64])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=0.,
+                        help='simulated latency per command in s')
+    parser.add_argument('--plugins', nargs='+', default=['viewer', 'sweep', 'move'],
+                        choices=['viewer', 'sweep', 'move'])
+    parser.add_argument('--save', help='save the results as a json baseline')
+    parser.add_argument('--baseline', help='json baseline to compare the results to')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative increase of a median time considered as a regression')
+    args = parser.parse_args()
+
+    simulator = RedPitayaSimulator(latency=args.latency).start()
+    results = {}
+    for name in args.plugins:
+        try:
+            if name == 'viewer':
+                from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.\
+                    daq_1Dviewer_RedPitayaSCPI import DAQ_1DViewer_RedPitayaSCPI
+                results[name] = bench_viewer(DAQ_1DViewer_RedPitayaSCPI, simulator, args.nsamples,
+                                             args.decimation, args.repeat)
+            elif name == 'sweep':
+                from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_Sweep \
+                    import DAQ_1DViewer_Sweep
+                results[name] = bench_viewer(DAQ_1DViewer_Sweep, simulator, args.nsamples,
+                                             args.decimation, args.repeat,
+                                             configure=configure_sweep)
+            else:
+                results[name] = bench_move(simulator, args.repeat)
+        except ImportError as e:  # the generator needs the pymeasure version with analog outputs
+            print(f'\n{name} skipped: {e}')
+            continue
+        print_results(name, results[name])
+    simulator.stop()
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print('\nRegressions:\n' + '\n'.join(regressions))
+            sys.exit(1)
+        print(f'\nNo regression above {args.threshold:.0%}')
+
+
+if __name__ == '__main__':
+    main()
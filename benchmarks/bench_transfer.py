@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Compare the ASCII and BIN transfer of the fast analog inputs buffer, and the sequential versus
+pipelined readout of both channels.
+
+The simulated board of the hardware subpackage is started locally and answers the
+``ACQ:SOUR<n>:DATA:OLD:N?`` query either as a comma separated string or as a binary block of
+float32, as the board does. The timing includes the socket transfer and the parsing into a numpy
+array.
+
+usage: python bench_transfer.py [--nsamples 1000 16384] [--repeat 50]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import get_channel_data, get_channels_data
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+def bench(controller: RedPitayaScpi, acq_format: str, nsamples: int, repeat: int) -> np.ndarray:
+    controller.acq_format = acq_format
+    timings = np.zeros((repeat,))
+    for ind in range(repeat):
+        start = time.perf_counter()
+        get_channel_data(controller, 1, nsamples, acq_format)
+        timings[ind] = time.perf_counter() - start
+    return timings
+
+
+def bench_channels(controller: RedPitayaScpi, pipelined: bool, nsamples: int,
+                   repeat: int) -> np.ndarray:
+    controller.acq_format = 'BIN'
+    timings = np.zeros((repeat,))
+    for ind in range(repeat):
+        start = time.perf_counter()
+        if pipelined:
+            get_channels_data(controller, (1, 2), nsamples, 'BIN')
+        else:
+            for channel in (1, 2):
+                get_channel_data(controller, channel, nsamples, 'BIN')
+        timings[ind] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--nsamples', type=int, nargs='+', default=[1000, 4096, 16384])
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=1e-3,
+                        help='simulated latency per command in s for the two channels readout')
+    args = parser.parse_args()
+
+    server = RedPitayaSimulator(inputs=('sine', 'sine')).start()
+    controller = RedPitayaScpi(ip_address='127.0.0.1', port=server.address[1])
+
+    print(f"{'nsamples':>10}{'ASCII (ms)':>14}{'BIN (ms)':>14}{'speedup':>10}")
+    for nsamples in args.nsamples:
+        ascii_time = np.median(bench(controller, 'ASCII', nsamples, args.repeat)) * 1000
+        bin_time = np.median(bench(controller, 'BIN', nsamples, args.repeat)) * 1000
+        print(f'{nsamples:>10d}{ascii_time:>14.3f}{bin_time:>14.3f}{ascii_time / bin_time:>10.1f}')
+
+    server.latency = args.latency
+    print(f"\n{'nsamples':>10}{'2 x 1ch (ms)':>14}{'2ch (ms)':>14}{'speedup':>10}")
+    for nsamples in args.nsamples:
+        sequential = np.median(bench_channels(controller, False, nsamples, args.repeat)) * 1000
+        pipelined = np.median(bench_channels(controller, True, nsamples, args.repeat)) * 1000
+        print(f'{nsamples:>10d}{sequential:>14.3f}{pipelined:>14.3f}{sequential / pipelined:>10.1f}')
+
+    controller.adapter.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
-
+import math
 from typing import Union, List, Dict
+
+from qtpy import QtCore
 from pymodaq.control_modules.move_utility_classes import (DAQ_Move_base, comon_parameters_fun,
                                                           main, DataActuatorType, DataActuator)
 
@@ -12,9 +14,22 @@ from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi, Analog
 from pymodaq_data import Q_
 
 from pymodaq_plugins_redpitaya.utils import Config
+from pymodaq_plugins_redpitaya.hardware.connection import (acquire_controller, release_controller,
+                                                           ConnectionKeeper, CONNECTION_ERRORS)
+from pymodaq_plugins_redpitaya.hardware.settings_cache import ScpiWriteCache
+from pymodaq_plugins_redpitaya.hardware.scan_table import (ScanTable, FREQUENCY_LIMITS,
+                                                           AMPLITUDE_LIMITS, OFFSET_LIMITS)
+from pymodaq_plugins_redpitaya.hardware.arbitrary_waveform import (WaveformLoader, WAVEFORMS,
+                                                                   UPLOAD_FORMATS, chirp,
+                                                                   pulse_train, expression)
 
 plugin_config = Config()
 
+# generator properties configured from the settings
+GENERATOR_SETTINGS = ('shape', 'enable', 'offset', 'phase', 'dutycycle')
+# when the actuator value is read back from the board rather than from the written state
+READBACK_POLICIES = ['Always', 'On settle', 'Never']
+
 class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
     """ Instrument plugin class for Red Pitaya
 
@@ -48,8 +63,8 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
        """
 
     is_multiaxes = True
-    _axis_names: Union[List[str], Dict[str, int]] = ['amplitude', 'frequency']
-    _controller_units: Union[str, List[str]] = ['V','Hz']
+    _axis_names: Union[List[str], Dict[str, int]] = ['amplitude', 'frequency', 'table', 'offset']
+    _controller_units: Union[str, List[str]] = ['V','Hz', '', 'V']  # table: index of the scan table
     _epsilon: Union[float, List[float]] = 0.1  # Detailing 1mV and 1Hz #TODO replace this by a value that is correct depending on your controller
     # TODO it could be a single float of a list of float (as much as the number of axes)
     data_actuator_type = DataActuatorType.DataActuator
@@ -73,13 +88,67 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
                       'value': plugin_config('generator', 'phase')},
                 {'title': 'Dutycycle', 'name': 'dutycycle', 'type': 'float', 'limits' : AnalogOutputFastChannel.CYCLES,
                       'value': plugin_config('generator', 'cycle')},
+                {'title': 'Read back:', 'name': 'readback', 'type': 'list', 'limits': READBACK_POLICIES,
+                 'value': plugin_config('generator', 'readback'),
+                 'tip': 'Query the board at each poll of the actuator value, once after each move '
+                        'or never, the last written value being returned otherwise'},
+                {'title': 'Scan table:', 'name': 'table', 'type': 'group', 'children': [
+                    {'title': 'Source:', 'name': 'source', 'type': 'list', 'limits': ['Grid', 'File'],
+                     'value': plugin_config('scan_table', 'source')},
+                    {'title': 'Start frequency (Hz):', 'name': 'start', 'type': 'float',
+                     'value': plugin_config('scan_table', 'start_frequency')},
+                    {'title': 'Stop frequency (Hz):', 'name': 'stop', 'type': 'float',
+                     'value': plugin_config('scan_table', 'stop_frequency')},
+                    {'title': 'Npoints:', 'name': 'npoints', 'type': 'int', 'min': 1,
+                     'value': plugin_config('scan_table', 'npoints')},
+                    {'title': 'Spacing:', 'name': 'mode', 'type': 'list', 'limits': ['LINEAR', 'LOG'],
+                     'value': plugin_config('scan_table', 'mode')},
+                    {'title': 'Start amplitude (V):', 'name': 'amplitude_start', 'type': 'float',
+                     'value': plugin_config('scan_table', 'start_amplitude')},
+                    {'title': 'Stop amplitude (V):', 'name': 'amplitude_stop', 'type': 'float',
+                     'value': plugin_config('scan_table', 'stop_amplitude')},
+                    {'title': 'File:', 'name': 'path', 'type': 'str',
+                     'value': plugin_config('scan_table', 'path'),
+                     'tip': 'Text file of comma separated frequency (Hz), amplitude (V) rows'},
+                    {'title': 'Settle time (s):', 'name': 'settle', 'type': 'float', 'min': 0.,
+                     'value': plugin_config('scan_table', 'settle'),
+                     'tip': 'Delay after writing a point of the table, before the move is done'},
+                    {'title': 'Size:', 'name': 'size', 'type': 'int', 'value': 0, 'readonly': True},
+                ]},
+                {'title': 'Arbitrary waveform:', 'name': 'arbitrary', 'type': 'group', 'children': [
+                    {'title': 'Enabled:', 'name': 'enabled', 'type': 'bool', 'value': False,
+                     'tip': 'Output the arbitrary waveform instead of the shape'},
+                    {'title': 'Waveform:', 'name': 'waveform', 'type': 'list', 'limits': list(WAVEFORMS),
+                     'value': plugin_config('arbitrary', 'waveform')},
+                    {'title': 'Chirp start (cycles):', 'name': 'start_cycles', 'type': 'float',
+                     'value': plugin_config('arbitrary', 'start_cycles')},
+                    {'title': 'Chirp stop (cycles):', 'name': 'stop_cycles', 'type': 'float',
+                     'value': plugin_config('arbitrary', 'stop_cycles')},
+                    {'title': 'Pulses:', 'name': 'npulses', 'type': 'int', 'min': 1,
+                     'value': plugin_config('arbitrary', 'npulses')},
+                    {'title': 'Pulse dutycycle:', 'name': 'pulse_dutycycle', 'type': 'float',
+                     'min': 0., 'max': 1., 'value': plugin_config('arbitrary', 'pulse_dutycycle')},
+                    {'title': 'Expression:', 'name': 'expression', 'type': 'str',
+                     'value': plugin_config('arbitrary', 'expression'),
+                     'tip': 'numpy expression of the phase t in [0, 1[ of the period'},
+                    {'title': 'Upload format:', 'name': 'upload_format', 'type': 'list',
+                     'limits': list(UPLOAD_FORMATS),
+                     'value': plugin_config('arbitrary', 'upload_format')},
+                ]},
                 ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names, epsilon=_epsilon)
     # _epsilon is the initial default value for the epsilon parameter allowing pymodaq to know if the controller reached
     # the target value. It is the developer responsibility to put here a meaningful value
 
     def ini_attributes(self):
         self.controller: RedPitayaScpi = None
-        pass
+        self.generator_caches: Dict[int, ScpiWriteCache] = {}  # state of each used channel
+        self._confirmed = set()  # (channel, name) read back from the board since their last write
+        self.connection: ConnectionKeeper = None
+        self.scan_table: ScanTable = None
+        self.waveforms: WaveformLoader = None
+        self.arbitrary_channels = set()  # channels whose shape is set to ARBITRARY
+        self.table_index = 0  # index of the last point of the scan table written
+        self.settled_index = 0  # index of the last point of the scan table that has settled
 
     def get_actuator_value(self):
         """Get the current value from the hardware with scaling conversion.
@@ -88,15 +157,27 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
         -------
         float: The position obtained after scaling conversion.
         """
-        pos = DataActuator(data=getattr(self.aout, self.axis_name),
-                           units=self.axis_unit)
+        if self.axis_name == 'table':  # the written point, once its settle time has elapsed
+            pos = DataActuator(data=self.settled_index, units=self.axis_unit)
+        else:
+            pos = DataActuator(data=self.connection.call(self.read_generator, self.axis_name),
+                               units=self.axis_unit)
         pos = self.get_position_with_scaling(pos)
 
         return pos
 
     def close(self):
-        """Terminate the communication protocol"""
-        self.aout.enable = False
+        """Terminate the communication protocol, the connection being closed by its last user"""
+        if self.controller is None:
+            return
+        try:
+            self.write_generator('enable', False)
+        except CONNECTION_ERRORS as e:
+            self.emit_status(ThreadCommand('Update_Status', [f'Could not disable the output: {e}']))
+        self.connection = None
+        if self.is_master:
+            release_controller(self.controller)
+            self.controller = None
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -106,36 +187,157 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
         param: Parameter
             A given parameter (within detector_settings) whose value has been changed by the user
         """
-        if param.name() == 'axis':
-            if param.value() =='frequency':
-                self.settings.child('bounds', 'min_bound').setValue(1e-6)
-                self.settings.child('bounds', 'max_bound').setValue(50e6)
-            elif param.value == 'amplitude':
-                self.settings.child('bounds', 'min_bound').setValue(0)
-                self.settings.child('bounds', 'max_bound').setValue(1)
-
-            self.settings.child('bounds', 'is_bounds').value()
-            self.settings.child('bounds', 'is_bounds').setValue(True)
-        elif param.name() == 'enable':
-            self.aout.enable = param.value()
-        elif param.name() == 'shape':
-            self.aout.shape = param.value()
-        elif param.name() == 'offset':
-            self.aout.offset = param.value()
-        elif param.name() == 'phase':
-            self.aout.phase = param.value()
-        elif param.name() == 'dutycycle':
-            self.aout.dutycycle = param.value()
+        if param.parent() is not None and param.parent().name() == 'table':
+            if param.name() not in ('settle', 'size'):
+                self.build_table()
+        elif param.parent() is not None and param.parent().name() == 'arbitrary':
+            if param.name() == 'upload_format':
+                self.waveforms.upload_format = param.value()
+            else:
+                self.connection.call(self.configure_arbitrary)
+        elif param.name() == 'axis':
+            self.set_axis_bounds()
+        elif param.name() == 'shape' and self.settings['arbitrary', 'enabled']:
+            pass  # written once the arbitrary waveform is disabled
+        elif param.name() in GENERATOR_SETTINGS:
+            self.connection.call(self.write_generator, param.name(), param.value())
+            if param.name() == 'offset':
+                self.build_table()
+        elif param.name() == 'channel':
+            self.connection.call(self.configure_generator)
 
     def is_enabled(self) -> bool:
         "It defines if the supply voltage is enabled on the output channel chosen"
-        return self.settings['enable'] == True
+        return self.generator_settings.values.get('enable', False) == True
 
     @property
     def aout(self):
         """ It defines what output channel the user chose"""
         return self.controller.analog_out[self.settings['channel']]
 
+    def set_axis_bounds(self):
+        """ Bound the current axis to the generator limits or to the indexes of the scan table"""
+        if self.axis_name == 'frequency':
+            bounds = FREQUENCY_LIMITS
+        elif self.axis_name == 'amplitude':
+            bounds = AMPLITUDE_LIMITS
+        elif self.axis_name == 'offset':
+            bounds = OFFSET_LIMITS
+        else:
+            bounds = (0, max(self.settings['table', 'size'] - 1, 0))
+        self.settings.child('bounds', 'min_bound').setValue(bounds[0])
+        self.settings.child('bounds', 'max_bound').setValue(bounds[1])
+        self.settings.child('bounds', 'is_bounds').setValue(True)
+
+    def build_table(self):
+        """ Build the scan table from the settings, validating all its points at once"""
+        try:
+            if self.settings['table', 'source'] == 'File':
+                self.scan_table = ScanTable.load(self.settings['table', 'path'],
+                                                 offset=self.settings['offset'])
+            else:
+                self.scan_table = ScanTable.from_grid(
+                    self.settings['table', 'start'], self.settings['table', 'stop'],
+                    self.settings['table', 'npoints'], self.settings['table', 'mode'],
+                    self.settings['table', 'amplitude_start'],
+                    self.settings['table', 'amplitude_stop'], offset=self.settings['offset'])
+        except (OSError, ValueError) as e:
+            self.scan_table = None
+            self.emit_status(ThreadCommand('Update_Status', [f'Invalid scan table: {e}']))
+        self.settings.child('table', 'size').setValue(
+            0 if self.scan_table is None else len(self.scan_table))
+        if self.axis_name == 'table':
+            self.set_axis_bounds()
+
+    @property
+    def generator_settings(self) -> ScpiWriteCache:
+        """ The generator state of the selected output channel, as last written or read back"""
+        return self.generator_caches[self.settings['channel']]
+
+    def read_generator(self, name: str):
+        """ Read a property of the selected output channel
+
+        The board is queried if the property is unknown or, depending on the read back policy, at
+        each call or at the first call after a write. Otherwise the cached value is returned.
+        """
+        key = (self.settings['channel'], name)
+        cache = self.generator_settings
+        policy = self.settings['readback']
+        if name not in cache.values or policy == 'Always' or \
+                (policy == 'On settle' and key not in self._confirmed):
+            with self.controller.lock:
+                cache.values[name] = getattr(self.aout, name)
+            self._confirmed.add(key)
+        return cache.values[name]
+
+    def write_generator(self, name: str, value):
+        """ Write a property of the selected output channel if it differs from its cached value"""
+        if self.generator_settings.set(name, value):
+            self._confirmed.discard((self.settings['channel'], name))
+
+    def configure_generator(self):
+        """ Write the generator settings to the selected output channel and start it"""
+        channel = self.settings['channel']
+        if channel not in self.generator_caches:
+            self.generator_caches[channel] = self.controller.generator_cache(channel)
+        for name in GENERATOR_SETTINGS:
+            if name != 'shape' or not self.settings['arbitrary', 'enabled']:
+                self.write_generator(name, self.settings[name])
+        self.configure_arbitrary()
+        self.aout.run()
+
+    def get_waveform(self):
+        """ Synthesize a period of the arbitrary waveform of the settings
+
+        Raises
+        ------
+        ValueError: if the expression of the waveform is invalid
+        """
+        waveform = self.settings['arbitrary', 'waveform']
+        if waveform == 'Chirp':
+            return chirp(self.settings['arbitrary', 'start_cycles'],
+                         self.settings['arbitrary', 'stop_cycles'])
+        elif waveform == 'Pulse train':
+            return pulse_train(self.settings['arbitrary', 'npulses'],
+                               self.settings['arbitrary', 'pulse_dutycycle'])
+        return expression(self.settings['arbitrary', 'expression'])
+
+    def configure_arbitrary(self):
+        """ Load the arbitrary waveform on the selected channel and output it if enabled, restore
+        the shape of the settings otherwise
+
+        The waveform is only uploaded if the channel does not already hold the same samples
+        """
+        channel = self.settings['channel']
+        if not self.settings['arbitrary', 'enabled']:
+            if channel in self.arbitrary_channels:
+                self.arbitrary_channels.discard(channel)
+                self.write_generator('shape', self.settings['shape'])
+            return
+        try:
+            waveform = self.get_waveform()
+        except ValueError as e:
+            self.emit_status(ThreadCommand('Update_Status', [str(e)]))
+            return
+        self.waveforms.load(channel, waveform)
+        if channel not in self.arbitrary_channels:
+            self.controller.write(f'SOUR{channel:d}:FUNC ARBITRARY')
+            self.generator_settings.invalidate('shape')
+            self.arbitrary_channels.add(channel)
+
+    def restore_configuration(self):
+        """ Write again the configuration of the used generator channels after a reconnection or
+        its invalidation by another user of the controller"""
+        self._confirmed.clear()
+        self.waveforms.invalidate()
+        self.arbitrary_channels.clear()
+        for channel, cache in self.generator_caches.items():
+            cache.replay()
+            self.controller.analog_out[channel].run()
+        self.configure_arbitrary()
+        self.emit_status(ThreadCommand('Update_Status',
+                                       ['Generator configuration written again to the board']))
+
     def ini_stage(self, controller=None):
         """Actuator communication initialization
 
@@ -152,16 +354,18 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
         """
 
         if self.is_master:  # is needed when controller is master
-            self.controller = RedPitayaScpi(ip_address=plugin_config('ip_address')) #  arguments for instantiation!)
+            self.controller = acquire_controller(self.settings['ip_address'], self.settings['port'])
         else:
             self.controller = controller
 
-        self.aout.shape = self.settings['shape'] #plugin_config('generator', 'shape')
-
         self.settings.child('bounds', 'is_bounds').setOpts(readonly=True)
+        self.build_table()
+        self.set_axis_bounds()
 
-        self.aout.enable = self.settings['enable']
-        self.aout.run()
+        self.waveforms = WaveformLoader(self.controller, self.settings['arbitrary', 'upload_format'])
+        self.configure_generator()
+        self.connection = ConnectionKeeper(self.controller, self.restore_configuration,
+                                           **plugin_config('connection'))
 
         info = "Whatever info you want to log"
         initialized = True
@@ -174,13 +378,48 @@ class DAQ_Move_RedpitayaSCPI(DAQ_Move_base):
         ----------
         value: (float) value of the absolute target positioning
         """
-        if not self.is_enabled():
-            self.aout.enable = True
         value = self.check_bound(value)  #if user checked bounds, the defined bounds are applied here
         self.target_value = value
         value = self.set_position_with_scaling(value)  # apply scaling if the user specified one
 
-        setattr(self.controller.analog_out[self.settings['channel']], self.axis_name, value.value(self.axis_unit))
+        if self.axis_name == 'table' and self.scan_table is None:
+            self.emit_status(ThreadCommand('Update_Status', ['No valid scan table to move along']))
+            return
+        self.connection.call(self.write_target, value.value(self.axis_unit))
+        if self.axis_name == 'table':  # done once settled, without waiting for the next poll
+            index = self.table_index
+            QtCore.QTimer.singleShot(math.ceil(self.settings['table', 'settle'] * 1000),
+                                     QtCore.Qt.PreciseTimer,
+                                     lambda: self.table_point_settled(index))
+
+    def write_target(self, value: float):
+        """ Write the target value of the current axis, enabling the output if needed"""
+        if not self.is_enabled():
+            self.write_generator('enable', True)
+            self.settings.child('enable').setValue(True)
+        if self.axis_name == 'table':
+            self.write_table_point(int(round(value)))
+        else:
+            self.write_generator(self.axis_name, value)
+
+    def write_table_point(self, index: int):
+        """ Write the frequency and amplitude of a point of the scan table
+
+        Only the values differing from the previous point are sent to the board. The point is
+        reported by get_actuator_value once its settle time has elapsed, see table_point_settled.
+        """
+        index = min(max(index, 0), len(self.scan_table) - 1)
+        frequency, amplitude = self.scan_table[index]
+        self.write_generator('frequency', frequency)
+        self.write_generator('amplitude', amplitude)
+        self.table_index = index
+
+    def table_point_settled(self, index: int):
+        """ Report the point index of the scan table and end its move, unless another point has
+        been written since"""
+        if index == self.table_index:
+            self.settled_index = index
+            self.move_done(self.get_actuator_value())
 
     def move_rel(self, value: DataActuator):
         """ Move the actuator to the relative target actuator value defined by value
@@ -0,0 +1,118 @@
+import numpy as np
+
+from pymodaq.utils.data import DataFromPlugins, DataToExport
+from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq.utils.parameter import Parameter
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSCPI import \
+    DAQ_1DViewer_RedPitayaSCPI
+from pymodaq_plugins_redpitaya.processing import LOCKIN_OUTPUTS, LockIn, split_segments
+from pymodaq_plugins_redpitaya.utils import Config
+
+plugin_config = Config()
+
+LOCKIN_UNITS = {'X': 'V', 'Y': 'V', 'R': 'V', 'theta': 'deg'}
+REFERENCES = ['Settings', 'OUT1', 'OUT2']  # OUTn: read back from the generator channel n
+
+
+class DAQ_0DViewer_RedPitayaLockIn(DAQ_1DViewer_RedPitayaSCPI):
+    """ Instrument plugin class for a 0D viewer demodulating the fast analog inputs as a lock-in.
+
+    The frames are acquired as by the RedPitayaSCPI 1D viewer and demodulated within the plugin at
+    a reference frequency and phase, either set in the settings or read back from a channel of the
+    board generator (for instance driven by the RedpitayaSCPI actuator). The low pass filtered
+    in-phase X, quadrature Y, amplitude R and phase theta of each enabled channel are emitted as
+    Data0D. The phase is referenced to the trigger, so it is only meaningful for acquisitions
+    triggered by the generator (AWG_PE/AWG_NE trigger sources) or by a signal synchronous with it.
+
+    * Should be compatible with all redpitaya flavour using the SCPI communication protocol
+    * Tested with the STEMlab 125-14 version
+    * PyMoDAQ >= 4.1.0
+    """
+    params = [param for param in DAQ_1DViewer_RedPitayaSCPI.params
+              if param['name'] != 'display'] + [
+        {'title': 'Lock-in:', 'name': 'lockin', 'type': 'group', 'children': [
+            {'title': 'Reference:', 'name': 'reference', 'type': 'list', 'limits': REFERENCES,
+             'value': plugin_config('lockin', 'reference'),
+             'tip': 'Generator channels are read back from the board at each grab'},
+            {'title': 'Frequency (Hz):', 'name': 'frequency', 'type': 'float', 'min': 0.,
+             'value': plugin_config('lockin', 'frequency'),
+             'readonly': plugin_config('lockin', 'reference') != 'Settings'},
+            {'title': 'Phase (°):', 'name': 'phase', 'type': 'float',
+             'value': plugin_config('lockin', 'phase'),
+             'readonly': plugin_config('lockin', 'reference') != 'Settings'},
+            {'title': 'Time constant (s):', 'name': 'time_constant', 'type': 'float', 'min': 0.,
+             'value': plugin_config('lockin', 'time_constant'),
+             'tip': 'Time constant of the low pass filter, 0 to average over the whole frame'},
+            {'title': 'Filter order:', 'name': 'order', 'type': 'int', 'min': 1, 'max': 4,
+             'value': plugin_config('lockin', 'order'),
+             'tip': 'Number of cascaded first order filters, 6 dB/octave each'},
+        ]},
+    ]
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.commit_settings
+        """
+        if param.parent() is not None and param.parent().name() == 'lockin':
+            if param.name() == 'reference':
+                readonly = param.value() != 'Settings'
+                for name in ('frequency', 'phase'):
+                    self.settings.child('lockin', name).setOpts(readonly=readonly)
+            return  # read when emitting
+        super().commit_settings(param)
+
+    def get_lockin(self) -> LockIn:
+        """ Get a lock-in at the current reference, read back from the board generator if selected"""
+        reference = self.settings['lockin', 'reference']
+        if reference != 'Settings':
+            with self.controller.lock:
+                aout = self.controller.analog_out[int(reference[-1])]
+                frequency, phase = aout.frequency, aout.phase
+            self.settings.child('lockin', 'frequency').setValue(frequency)
+            self.settings.child('lockin', 'phase').setValue(phase)
+        return LockIn(self.settings['lockin', 'frequency'], self.acq_config.sampling_period,
+                      phase=self.settings['lockin', 'phase'],
+                      time_constant=self.settings['lockin', 'time_constant'],
+                      order=self.settings['lockin', 'order'])
+
+    def emit_lockin(self, frames: np.ndarray, starts=0.):
+        """ Emit the lock-in outputs of frames of shape (..., len(self.channels), nsamples) as Data0D
+
+        If there are several frames (segments or streamed batch), their outputs are averaged
+
+        Parameters
+        ----------
+        frames: ndarray
+        starts: float or ndarray
+            The time in s of the first sample of the frames relative to the trigger
+        """
+        config = self.acq_config
+        lockin = self.get_lockin()
+        lockin.add(frames, starts)
+        outputs = lockin.outputs()
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+            DataFromPlugins(name=name, data=[np.array([value]) for value in outputs[name]],
+                            dim='Data0D', labels=config.labels, units=LOCKIN_UNITS[name])
+            for name in LOCKIN_OUTPUTS]))
+        self.telemetry.mark('emit')
+
+    def emit_frame(self, data_array: np.ndarray):
+        self.emit_lockin(data_array, self.acq_config.offset)
+
+    def emit_segments(self, record: np.ndarray):
+        config = self.acq_config
+        segments = split_segments(record, config.nsegments, config.period, config.nsamples)
+        starts = config.offset + np.arange(config.nsegments) * config.period * \
+            config.sampling_period
+        self.emit_lockin(np.swapaxes(segments, 0, 1), starts[:, np.newaxis])
+
+    def emit_batch(self, batch: np.ndarray):
+        self.emit_lockin(batch, self.acq_config.offset)
+
+
+if __name__ == '__main__':
+    main(__file__)
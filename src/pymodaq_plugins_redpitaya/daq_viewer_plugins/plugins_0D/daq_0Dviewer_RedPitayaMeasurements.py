@@ -0,0 +1,93 @@
+import numpy as np
+
+from pymodaq.utils.data import DataFromPlugins, DataToExport
+from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq.utils.parameter import Parameter
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSCPI import \
+    DAQ_1DViewer_RedPitayaSCPI
+from pymodaq_plugins_redpitaya.processing import (MEASUREMENTS, MIN_FREQUENCY_SAMPLES, measurements,
+                                                  split_segments)
+
+MEASUREMENT_UNITS = {'mean': 'V', 'rms': 'V', 'peak_to_peak': 'V', 'frequency': 'Hz'}
+MEASUREMENT_TITLES = {'mean': 'Mean', 'rms': 'RMS', 'peak_to_peak': 'Peak to peak',
+                      'frequency': 'Frequency'}
+
+
+class DAQ_0DViewer_RedPitayaMeasurements(DAQ_1DViewer_RedPitayaSCPI):
+    """ Instrument plugin class for a 0D viewer emitting figures of merit of the fast analog inputs.
+
+    The frames are acquired as by the RedPitayaSCPI 1D viewer, then reduced within the plugin to
+    the mean, RMS value, peak to peak amplitude and dominant frequency of each enabled channel,
+    only these scalars being emitted.
+
+    * Should be compatible with all redpitaya flavour using the SCPI communication protocol
+    * Tested with the STEMlab 125-14 version
+    * PyMoDAQ >= 4.1.0
+    """
+    params = [param for param in DAQ_1DViewer_RedPitayaSCPI.params
+              if param['name'] != 'display'] + [
+        {'title': 'Measurements:', 'name': 'measurements', 'type': 'group', 'children': [
+            {'title': f'{MEASUREMENT_TITLES[name]}:', 'name': name, 'type': 'bool', 'value': True}
+            for name in MEASUREMENTS]},
+    ]
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.commit_settings
+        """
+        if param.parent() is not None and param.parent().name() == 'measurements':
+            return  # read when emitting
+        super().commit_settings(param)
+
+    def ini_detector(self, controller=None):
+        """Detector communication initialization, frames being long enough for the frequency
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.ini_detector
+        """
+        info, initialized = super().ini_detector(controller)
+        nsamples = self.settings.child('sampling', 'nsamples')
+        nsamples.setLimits((MIN_FREQUENCY_SAMPLES, self.settings['sampling', 'buffer_length']))
+        if nsamples.value() < MIN_FREQUENCY_SAMPLES:
+            nsamples.setValue(MIN_FREQUENCY_SAMPLES)
+            self.commit_settings(nsamples)
+        return info, initialized
+
+    def emit_measurements(self, frames: np.ndarray):
+        """ Emit the measurements of frames of shape (..., len(self.channels), nsamples) as Data0D
+
+        If there are several frames (segments or streamed batch), their measurements are averaged
+        """
+        config = self.acq_config
+        values = measurements(frames, config.sampling_period)
+        data = []
+        for name in MEASUREMENTS:
+            if not self.settings['measurements', name]:
+                continue
+            channel_values = values[name].reshape((-1, len(config.channels))).mean(axis=0)
+            data.append(DataFromPlugins(name=MEASUREMENT_TITLES[name],
+                                        data=[np.array([value]) for value in channel_values],
+                                        dim='Data0D', labels=config.labels,
+                                        units=MEASUREMENT_UNITS[name]))
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=data))
+        self.telemetry.mark('emit')
+
+    def emit_frame(self, data_array: np.ndarray):
+        self.emit_measurements(data_array)
+
+    def emit_segments(self, record: np.ndarray):
+        config = self.acq_config
+        segments = split_segments(record, config.nsegments, config.period, config.nsamples)
+        self.emit_measurements(np.swapaxes(segments, 0, 1))
+
+    def emit_batch(self, batch: np.ndarray):
+        self.emit_measurements(batch)
+
+
+if __name__ == '__main__':
+    main(__file__)
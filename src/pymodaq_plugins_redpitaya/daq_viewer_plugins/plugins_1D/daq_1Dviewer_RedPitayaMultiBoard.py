@@ -0,0 +1,221 @@
+from typing import List
+
+import numpy as np
+
+from pymodaq.utils.daq_utils import ThreadCommand
+from pymodaq.utils.data import DataFromPlugins, DataToExport
+from pymodaq.control_modules.viewer_utility_classes import DAQ_Viewer_base, comon_parameters, main
+from pymodaq.utils.parameter import Parameter
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSCPI import \
+    DAQ_1DViewer_RedPitayaSCPI
+from pymodaq_plugins_redpitaya.hardware.connection import (acquire_controller, release_controller,
+                                                           CONNECTION_ERRORS)
+from pymodaq_plugins_redpitaya.hardware.frame_pool import FramePool
+from pymodaq_plugins_redpitaya.hardware.multi_board import (BoardAcquisition,
+                                                            MultiBoardAcquisition,
+                                                            parse_endpoints)
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig
+from pymodaq_plugins_redpitaya.hardware.trigger import TriggerTimeout
+from pymodaq_plugins_redpitaya.processing import FrameAccumulator
+from pymodaq_plugins_redpitaya.utils import Config
+
+
+class DAQ_1DViewer_RedPitayaMultiBoard(DAQ_Viewer_base):
+    """ Instrument plugin class for a 1D viewer acquiring several boards side by side.
+
+    All the boards share the sampling and triggering settings. Each step of the acquisition (arm,
+    trigger, wait and read) is run on all of them concurrently, so that a grab lasts about as long
+    as the one of the slowest board. The frames, each one relative to the trigger of its board,
+    are emitted in a single DataToExport with one Data1D per board. For the frames to be
+    synchronous, the boards should share their trigger, for instance an external one.
+
+    * Should be compatible with all redpitaya flavour using the SCPI communication protocol
+    * Tested with the STEMlab 125-14 version
+    * PyMoDAQ >= 4.1.0
+    """
+    hardware_averaging = True  # Naverage frames are accumulated within the plugin
+    plugin_config = Config()
+
+    params = comon_parameters + [
+        {'title': 'Boards:', 'name': 'endpoints', 'type': 'str',
+         'value': ', '.join(plugin_config('multiboard', 'endpoints')),
+         'tip': 'Comma separated ip_address:port of the boards, used at the initialization'},
+        {'title': 'Board names:', 'name': 'bnames', 'type': 'str', 'value': '', 'readonly': True},
+    ] + [param for param in DAQ_1DViewer_RedPitayaSCPI.params
+         if param['name'] in ('sampling', 'triggering')]
+
+    def ini_attributes(self):
+        self.controller: MultiBoardAcquisition = None
+        self.controllers = []  # the board controllers acquired by this plugin
+        self.endpoints = []  # the 'ip_address:port' of the boards, naming their data
+        self.accumulator: FrameAccumulator = None
+        self.frame_pool: FramePool = None
+        self._acq_config: AcquisitionConfig = None
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings
+
+        Parameters
+        ----------
+        param: Parameter
+            A given parameter (within detector_settings) whose value has been changed by the user
+        """
+        self._acq_config = None
+        if param.name() in ('in1', 'in2') and not self.channels:
+            param.setValue(True)  # at least one channel should be read
+        elif param.name() == 'decimation':
+            self.settings.child('sampling', 'sample_rate').setValue(
+                self.acq_config.clock / param.value())
+        if param.name() not in ('endpoints', 'bnames', 'sample_rate', 'buffer_length'):
+            self.configure_boards()
+
+    @property
+    def channels(self) -> List[int]:
+        """ The fast analog input channels enabled by the user"""
+        return [channel for channel in (1, 2) if self.settings['sampling', f'in{channel}']]
+
+    @property
+    def acq_config(self) -> AcquisitionConfig:
+        """ The acquisition settings snapshot shared by the boards, rebuilt after a change"""
+        if self._acq_config is None:
+            self._acq_config = AcquisitionConfig(
+                nsamples=self.settings['sampling', 'nsamples'],
+                decimation=self.settings['sampling', 'decimation'],
+                channels=self.channels,
+                acq_format=self.settings['sampling', 'acq_format'],
+                trigger_source=self.settings['triggering', 'source'],
+                center_trigger=self.settings['triggering', 'center_trigger'],
+                timeout=self.settings['triggering', 'timeout'],
+                clock=self.controller.boards[0].controller.CLOCK)
+        return self._acq_config
+
+    def configure_boards(self):
+        """ Write the acquisition settings to all the boards concurrently"""
+        self.controller.configure(self.acq_config, self.settings['triggering', 'level'],
+                                  self.settings['sampling', 'average'])
+
+    def ini_detector(self, controller=None):
+        """Detector communication initialization
+
+        Parameters
+        ----------
+        controller: (object)
+            custom object of a PyMoDAQ plugin (Slave case). None if only one actuator/detector by controller
+            (Master case)
+
+        Returns
+        -------
+        info: str
+        initialized: bool
+            False if initialization failed otherwise True
+        """
+        if self.is_master:
+            for ip_address, port in parse_endpoints(self.settings['endpoints']):
+                self.controllers.append(acquire_controller(ip_address, port))
+                self.endpoints.append(f'{ip_address}:{port}')
+            new_controller = MultiBoardAcquisition(
+                [BoardAcquisition(board, **self.plugin_config('connection'))
+                 for board in self.controllers])
+        else:
+            new_controller = None
+        self.ini_detector_init(old_controller=controller, new_controller=new_controller)
+        if not self.endpoints:  # slave case
+            self.endpoints = [board.name for board in self.controller.boards]
+        names = [board.controller.name for board in self.controller.boards]
+        self.settings.child('bnames').setValue(', '.join(names))
+
+        buffer_length = min(board.buffer_length for board in self.controller.boards)
+        self.settings.child('sampling', 'buffer_length').setValue(buffer_length)
+        self.settings.child('sampling', 'nsamples').setLimits((1, buffer_length))
+        self.settings.child('sampling', 'sample_rate').setValue(
+            self.acq_config.clock / self.settings['sampling', 'decimation'])
+        self.controller.run(lambda board: board.controller.acquisition_reset())
+        self.configure_boards()
+
+        info = f"Succesfully connected to the Redpitaya boards {names}"
+        initialized = True
+        return info, initialized
+
+    def close(self):
+        """Terminate the communication protocol, the connections being closed by their last user"""
+        if self.controller is None:
+            return
+        try:
+            self.controller.stop()
+        except CONNECTION_ERRORS as e:
+            self.emit_status(ThreadCommand('Update_Status', [f'Could not stop the boards: {e}']))
+        if self.is_master:
+            self.controller.close()
+            for controller in self.controllers:
+                release_controller(controller)
+            self.controllers = []
+            self.endpoints = []
+            self.controller = None
+
+    def get_frame(self, shape) -> np.ndarray:
+        """ Get a free float32 array of frames of the given shape from the pool
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.get_frame
+        """
+        if self.frame_pool is None or self.frame_pool.shape != tuple(shape):
+            self.frame_pool = FramePool(shape, max_size=self.plugin_config('sampling', 'frame_pool'))
+        return self.frame_pool.get()
+
+    def emit_frames(self, frames: np.ndarray):
+        """ Emit the frames of shape (nboards, len(self.channels), nsamples), one Data1D per board"""
+        config = self.acq_config
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+            DataFromPlugins(name=endpoint, data=list(board_frames), dim='Data1D',
+                            labels=config.labels, axes=[config.get_time_axis()])
+            for endpoint, board_frames in zip(self.endpoints, frames)]))
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Start a grab from the detector
+
+        Parameters
+        ----------
+        Naverage: int
+            Number of frames to be acquired and averaged before being emitted
+        kwargs: dict
+            others optionals arguments
+        """
+        self.controller.reset()
+        try:
+            self.grab(Naverage)
+        except TriggerTimeout:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f'No trigger received within '
+                                            f'{self.acq_config.timeout} s by all the boards']))
+        except ConnectionError as e:
+            self.emit_status(ThreadCommand('Update_Status', [str(e)]))
+
+    def grab(self, Naverage=1):
+        """ Acquire Naverage frames on all the boards and emit their average"""
+        config = self.acq_config
+        shape = (len(self.controller),) + config.shape
+        if Naverage > 1:
+            if self.accumulator is None or self.accumulator.shape != shape:
+                self.accumulator = FrameAccumulator(shape)
+            else:
+                self.accumulator.reset()
+            for ind in range(Naverage):
+                if self.controller.acquire(config, out=self.accumulator.frame) is None:
+                    return
+                self.accumulator.add(self.accumulator.frame)
+            frames = self.accumulator.mean()
+        else:
+            frames = self.controller.acquire(config, out=self.get_frame(shape))
+        if frames is not None:
+            self.emit_frames(frames)
+
+    def stop(self):
+        """Stop the current grab hardware wise if necessary"""
+        self.controller.stop()
+        return ''
+
+
+if __name__ == '__main__':
+    main(__file__)
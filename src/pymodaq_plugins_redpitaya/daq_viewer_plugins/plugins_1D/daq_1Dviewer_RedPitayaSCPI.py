@@ -1,6 +1,7 @@
+import time
+from typing import List, Optional
+
 import numpy as np
-from qtpy import QtWidgets
-from qtpy.QtCore import QThread
 
 from pymodaq.utils.daq_utils import ThreadCommand
 from pymodaq.utils.data import DataFromPlugins, Axis, DataToExport
@@ -10,6 +11,17 @@ from pymodaq_plugins_redpitaya.utils import Config
 
 from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
 
+from pymodaq_plugins_redpitaya.hardware.connection import (acquire_controller, release_controller,
+                                                           ConnectionKeeper, CONNECTION_ERRORS)
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import ACQ_FORMATS, get_channels_data
+from pymodaq_plugins_redpitaya.hardware.settings_cache import ScpiWriteCache, AcquisitionConfig
+from pymodaq_plugins_redpitaya.hardware.trigger import TriggerWaiter, TriggerTimeout
+from pymodaq_plugins_redpitaya.hardware.streaming import FrameRingBuffer, StreamingAcquisition
+from pymodaq_plugins_redpitaya.hardware.telemetry import FrameTelemetry
+from pymodaq_plugins_redpitaya.hardware.frame_pool import FramePool
+from pymodaq_plugins_redpitaya.processing import (FrameAccumulator, ExponentialAverage,
+                                                   split_segments, minmax_envelope)
+
 
 class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
     """ Instrument plugin class for a 1D viewer.
@@ -29,6 +41,8 @@ class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
          hardware library.
 
     """
+    hardware_averaging = True  # Naverage frames are accumulated within the plugin
+
     plugin_config = Config()
 
     params = comon_parameters+[
@@ -44,7 +58,11 @@ class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
             {'title': 'Nsamples:', 'name': 'nsamples', 'type': 'int',
              'value': plugin_config('sampling', 'nsamples')},
             {'title': 'Buffer Length:', 'name': 'buffer_length', 'type': 'int', 'readonly': True},
-
+            {'title': 'Transfer format:', 'name': 'acq_format', 'type': 'list', 'limits': ACQ_FORMATS,
+             'value': plugin_config('sampling', 'acq_format'),
+             'tip': 'BIN transfers the buffer as a binary block, ASCII as a comma separated string'},
+            {'title': 'IN1 enabled:', 'name': 'in1', 'type': 'bool', 'value': True},
+            {'title': 'IN2 enabled:', 'name': 'in2', 'type': 'bool', 'value': True},
          ]},
         {'title': 'Triggering:', 'name': 'triggering', 'type': 'group', 'children': [
             {'title': 'Source:', 'name': 'source', 'type': 'list',
@@ -53,12 +71,101 @@ class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
              'value': plugin_config('trigger', 'level')},
             {'title': 'Center Trigger:', 'name': 'center_trigger', 'type': 'bool',
              'value': plugin_config('trigger', 'center_trigger')},
+            {'title': 'Timeout (s):', 'name': 'timeout', 'type': 'float', 'min': 0.,
+             'value': plugin_config('trigger', 'timeout'),
+             'tip': 'Maximum time to wait for the trigger and the buffer filling, 0 to wait forever'},
+        ]},
+        {'title': 'Acquisition:', 'name': 'acquisition', 'type': 'group', 'children': [
+            {'title': 'Mode:', 'name': 'mode', 'type': 'list',
+             'limits': ['Single', 'Streaming', 'Segmented'], 'value': 'Single',
+             'tip': 'In Streaming mode, a background thread keeps acquiring frames into a ring '
+                    'buffer. In Segmented mode, a single record is read and split into segments'},
+            {'title': 'Streaming:', 'name': 'streaming', 'type': 'group', 'children': [
+                {'title': 'Buffer depth:', 'name': 'depth', 'type': 'int', 'min': 2,
+                 'value': plugin_config('streaming', 'depth')},
+                {'title': 'Publish:', 'name': 'publish', 'type': 'list', 'limits': ['Latest', 'Batch'],
+                 'value': 'Latest',
+                 'tip': 'Emit only the latest frame or all frames acquired since the last grab'},
+                {'title': 'Acquired frames:', 'name': 'acquired', 'type': 'int', 'value': 0,
+                 'readonly': True},
+                {'title': 'Dropped frames:', 'name': 'dropped', 'type': 'int', 'value': 0,
+                 'readonly': True, 'tip': 'Frames acquired but never emitted'},
+            ]},
+            {'title': 'Segmented:', 'name': 'segmented', 'type': 'group', 'children': [
+                {'title': 'Segments:', 'name': 'nsegments', 'type': 'int', 'min': 1,
+                 'value': plugin_config('segmented', 'nsegments')},
+                {'title': 'Period (samples):', 'name': 'period', 'type': 'int', 'min': 1,
+                 'value': plugin_config('segmented', 'period'),
+                 'tip': 'Number of samples between the starts of two segments, for instance the '
+                        'period of the pulses in sampling periods'},
+                {'title': 'Record length:', 'name': 'record_length', 'type': 'int', 'value': 0,
+                 'readonly': True, 'tip': 'Samples read from the board in a single transfer'},
+                {'title': 'Emit as:', 'name': 'emission', 'type': 'list',
+                 'limits': ['Data2D', 'Data1D stack'], 'value': 'Data2D',
+                 'tip': 'One image (segments x time) or one set of curves per channel'},
+            ]},
+            {'title': 'Running average:', 'name': 'running_average', 'type': 'bool', 'value': False,
+             'tip': 'Exponential running average of the emitted frames'},
+            {'title': 'Smoothing factor:', 'name': 'alpha', 'type': 'float', 'value': 0.1,
+             'min': 0.001, 'max': 1., 'tip': 'Weight of the new frame in the running average'},
+        ]},
+        {'title': 'Display:', 'name': 'display', 'type': 'group', 'children': [
+            {'title': 'Envelope:', 'name': 'envelope', 'type': 'bool',
+             'value': plugin_config('display', 'envelope'),
+             'tip': 'Plot the min/max envelope of the frames while saving them at full resolution'},
+            {'title': 'Width (bins):', 'name': 'width', 'type': 'int', 'min': 2,
+             'value': plugin_config('display', 'width'),
+             'tip': 'Number of bins of the envelope, about the width of the plot in pixels'},
+        ]},
+        {'title': 'Telemetry:', 'name': 'telemetry', 'type': 'group', 'children': [
+            {'title': 'Enabled:', 'name': 'enabled', 'type': 'bool',
+             'value': plugin_config('telemetry', 'enabled'),
+             'tip': 'Record the duration of the stages and the SCPI traffic of the single acquisitions'},
+            {'title': 'Window (frames):', 'name': 'window', 'type': 'int', 'min': 1,
+             'value': plugin_config('telemetry', 'window')},
+            {'title': 'Rate (Hz):', 'name': 'rate', 'type': 'float', 'value': 0., 'readonly': True},
+            {'title': 'Total (ms):', 'name': 'total', 'type': 'float', 'value': 0., 'readonly': True},
+            {'title': 'Total p90 (ms):', 'name': 'total_p90', 'type': 'float', 'value': 0.,
+             'readonly': True},
+            {'title': 'Arm (ms):', 'name': 'arm', 'type': 'float', 'value': 0., 'readonly': True,
+             'tip': 'Configuration and start of the acquisition'},
+            {'title': 'Trigger (ms):', 'name': 'trigger', 'type': 'float', 'value': 0.,
+             'readonly': True, 'tip': 'Pretrigger samples filling and arming of the trigger'},
+            {'title': 'Buffer filled (ms):', 'name': 'filled', 'type': 'float', 'value': 0.,
+             'readonly': True, 'tip': 'Wait for the trigger and the buffer filling'},
+            {'title': 'Transfer (ms):', 'name': 'transfer', 'type': 'float', 'value': 0.,
+             'readonly': True, 'tip': 'Readout and parsing of the buffer'},
+            {'title': 'Emit (ms):', 'name': 'emit', 'type': 'float', 'value': 0., 'readonly': True,
+             'tip': 'Processing and emission of the data'},
+            {'title': 'Commands:', 'name': 'commands', 'type': 'float', 'value': 0.,
+             'readonly': True, 'tip': 'SCPI commands written per frame'},
+            {'title': 'Bytes sent:', 'name': 'bytes_sent', 'type': 'float', 'value': 0.,
+             'readonly': True},
+            {'title': 'Bytes received:', 'name': 'bytes_received', 'type': 'float', 'value': 0.,
+             'readonly': True},
+            {'title': 'Export path:', 'name': 'export_path', 'type': 'str', 'value': '',
+             'tip': 'File the statistics window is exported to, as JSON if ending with .json, '
+                    'as CSV otherwise'},
+            {'title': 'Export:', 'name': 'export', 'type': 'bool_push', 'value': False},
         ]},
         ]
 
     def ini_attributes(self):
         self.controller: RedPitayaScpi = None
         self.x_axis: Axis = None
+        self.trigger_waiter: TriggerWaiter = None
+        self.streaming: StreamingAcquisition = None
+        self.accumulator: FrameAccumulator = None
+        self.frame_pool: FramePool = None
+        self._envelope_axis = None
+        self.running_average = ExponentialAverage(self.settings['acquisition', 'alpha'])
+        self.acq_settings: ScpiWriteCache = None
+        self._acq_config: AcquisitionConfig = None
+        self.connection: ConnectionKeeper = None
+        self.telemetry = FrameTelemetry(window=self.settings['telemetry', 'window'])
+        self.telemetry.enabled = self.settings['telemetry', 'enabled']
+        self._telemetry_update = 0.
+        self._telemetry_refresh = self.plugin_config('telemetry', 'refresh')
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -68,32 +175,353 @@ class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
         param: Parameter
             A given parameter (within detector_settings) whose value has been changed by the user
         """
+        if param.parent() is not None and param.parent().name() == 'telemetry':
+            self.commit_telemetry(param)
+            return
+        if param.name() not in ('publish', 'acquired', 'dropped', 'alpha', 'emission',
+                                'record_length', 'envelope', 'width'):
+            self.stop_streaming()
+            self.running_average.reset()
+        # reset once the streaming thread has stopped, its acquisitions building it again if None
+        self._acq_config = None
+
         if param.name() == 'decimation':
-            self.controller.decimation = param.value()
-            self.settings.child('sampling', 'decimation').setValue(self.controller.decimation)
-            self.settings.child('sampling', 'sample_rate').setValue(self.controller.CLOCK /
-                                                        self.controller.decimation)
+            if self.acq_settings.set('decimation', param.value()):
+                self.acq_settings.values['decimation'] = self.controller.decimation
+                self.settings.child('sampling', 'decimation').setValue(
+                    self.acq_settings.values['decimation'])
+                self.settings.child('sampling', 'sample_rate').setValue(
+                    self.controller.CLOCK / self.acq_settings.values['decimation'])
 
         elif param.name() == 'level':
-            self.controller.acq_trigger_level = param.value()
+            self.acq_settings.set('acq_trigger_level', param.value())
 
         elif param.name() == 'center_trigger':
            self._center_trigger()
 
         elif param.name() == 'average':
-            self.controller.average_skipped_samples = param.value()
+            self.acq_settings.set('average_skipped_samples', param.value())
 
-        elif param.name() == 'nsamples':
+        elif param.name() in ('nsamples', 'mode', 'nsegments', 'period'):
+            self._check_segments()
             self._center_trigger()
 
-    def _center_trigger(self):
-        if self.settings['triggering', 'center_trigger']:
-            self.controller.acq_trigger_delay_samples = \
-                int(self.settings['sampling', 'buffer_length'] / 2 -
-                    self.settings['sampling', 'nsamples'] / 2)
+        elif param.name() == 'acq_format':
+            self.acq_settings.set('acq_format', param.value())
+
+        elif param.name() in ('in1', 'in2'):
+            if not self.channels:  # at least one channel should be read
+                param.setValue(True)
+
+        elif param.name() == 'alpha':
+            self.running_average.alpha = param.value()
+
+    def commit_telemetry(self, param: Parameter):
+        """ Apply a change of the telemetry settings, the statistics being read-only"""
+        if param.name() == 'enabled':
+            self.telemetry.enabled = param.value()
+            self.telemetry.reset()
+        elif param.name() == 'window':
+            self.telemetry.window = param.value()
+        elif param.name() == 'export' and param.value():
+            param.setValue(False)
+            path = self.settings['telemetry', 'export_path']
+            if not path:
+                self.emit_status(ThreadCommand('Update_Status', ['No telemetry export path set']))
+                return
+            try:
+                self.telemetry.export(path)
+                self.emit_status(ThreadCommand('Update_Status',
+                                               [f'Telemetry of {len(self.telemetry.records)} '
+                                                f'frames exported to {path}']))
+            except OSError as e:
+                self.emit_status(ThreadCommand('Update_Status',
+                                               [f'Could not export the telemetry: {e}']))
+
+    def update_telemetry(self):
+        """ Show the telemetry statistics in the settings, at most once per refresh interval"""
+        now = time.perf_counter()
+        if now - self._telemetry_update < self._telemetry_refresh:
+            return
+        self._telemetry_update = now
+        for name, value in self.telemetry.statistics().items():
+            self.settings.child('telemetry', name).setValue(value)
+
+    @property
+    def channels(self) -> List[int]:
+        """ The fast analog input channels enabled by the user"""
+        return [channel for channel in (1, 2) if self.settings['sampling', f'in{channel}']]
+
+    @property
+    def acq_config(self) -> AcquisitionConfig:
+        """ The acquisition settings snapshot, rebuilt only after a change of the settings"""
+        if self._acq_config is None:
+            self._acq_config = AcquisitionConfig(
+                nsamples=self.settings['sampling', 'nsamples'],
+                decimation=self.settings['sampling', 'decimation'],
+                channels=self.channels,
+                acq_format=self.settings['sampling', 'acq_format'],
+                trigger_source=self.settings['triggering', 'source'],
+                center_trigger=self.settings['triggering', 'center_trigger'],
+                timeout=self.settings['triggering', 'timeout'],
+                clock=self.controller.CLOCK,
+                nsegments=self.settings['acquisition', 'segmented', 'nsegments']
+                if self.settings['acquisition', 'mode'] == 'Segmented' else 1,
+                period=self.settings['acquisition', 'segmented', 'period'])
+        return self._acq_config
+
+    def read_channels(self, nsamples: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """ Read the enabled channels in a single exchange with the board
+
+        Parameters
+        ----------
+        nsamples: int
+        out: ndarray
+            optional array of shape (len(self.channels), nsamples) to be filled in place
+
+        Returns
+        -------
+        ndarray: array of shape (len(self.channels), nsamples)
+        """
+        config = self.acq_config
+        with self.controller.lock:  # the queries and their answers must not be interleaved
+            return get_channels_data(self.controller, config.channels, nsamples,
+                                     config.acq_format, out=out)
+
+    def wait_acquisition(self, wait_time: float) -> bool:
+        """ Wait for the trigger to be fired and the buffer to be filled
+
+        Parameters
+        ----------
+        wait_time: float
+            The expected acquisition time in s
+
+        Returns
+        -------
+        bool: True if the data is ready to be read, False if cancelled or timed out
+        """
+        timeout = self.acq_config.timeout
+        try:
+            return self.trigger_waiter.wait(wait_time, timeout)
+        except TriggerTimeout:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f"No trigger received within {timeout} s"]))
+            return False
+
+    def on_trigger_armed(self):
+        """ Called during an acquisition once the trigger source is set, to be subclassed"""
+        pass
+
+    def acquire(self, nsamples: int, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """ Run a full acquisition: arm, fill the pretrigger samples, set the trigger, wait and read
+
+        Parameters
+        ----------
+        nsamples: int
+        out: ndarray
+            optional array of shape (len(self.channels), nsamples) to be filled in place
+
+        Returns
+        -------
+        ndarray: the data of the enabled channels or None if the acquisition has been cancelled or
+        has timed out
+        """
+        config = self.acq_config
+        wait_time = nsamples * config.sampling_period
+
+        self.controller.acquisition_start()
+        self.telemetry.mark('arm')
+
+        if not self.trigger_waiter.sleep(wait_time):
+            return None
+        # not cached: setting the source arms the trigger, the board disables it once fired
+        self.controller.acq_trigger_source = config.trigger_source
+        self.on_trigger_armed()
+        self.telemetry.mark('trigger')
+
+        if not self.wait_acquisition(wait_time):
+            return None
+        self.telemetry.mark('filled')
+
+        data_array = self.read_channels(nsamples, out=out)
+        self.telemetry.mark('transfer')
+        return data_array
+
+    def emit_frame(self, data_array: np.ndarray):
+        """ Emit a frame of shape (len(self.channels), nsamples) as Data1D
+
+        If the display envelope is activated and the frame has more points than the envelope, the
+        full frame is only saved and its min/max envelope only plotted
+        """
+        config = self.acq_config
+        width = self.settings['display', 'width']
+        if not self.settings['display', 'envelope'] or config.nsamples <= 2 * width:
+            self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+                DataFromPlugins(name='RedPitaya', data=list(data_array), dim='Data1D',
+                                labels=config.labels, axes=[config.time_axis])]))
+        else:
+            envelope = minmax_envelope(data_array, width)
+            self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+                DataFromPlugins(name='RedPitaya', data=list(data_array), dim='Data1D',
+                                labels=config.labels, axes=[config.time_axis],
+                                do_plot=False, do_save=True),
+                DataFromPlugins(name='RedPitaya envelope', data=list(envelope), dim='Data1D',
+                                labels=config.labels, axes=[self.get_envelope_axis(width)],
+                                do_plot=True, do_save=False)]))
+        self.telemetry.mark('emit')
+
+    def get_envelope_axis(self, width: int) -> Axis:
+        """ The time axis of the min/max envelope of a frame, rebuilt only after a change"""
+        config = self.acq_config
+        if self._envelope_axis is None or self._envelope_axis[:2] != (config, width):
+            bin_size = -(-config.nsamples // width)
+            nbins = -(-config.nsamples // bin_size)
+            axis = Axis('time', units='s', offset=config.offset,
+                        scaling=bin_size * config.sampling_period / 2, size=2 * nbins, index=0)
+            self._envelope_axis = (config, width, axis)
+        return self._envelope_axis[2]
+
+    def emit_segments(self, record: np.ndarray):
+        """ Emit a record of shape (len(self.channels), record_length) split into its segments
+
+        The segments are views of the record, emitted either as one Data2D (segments x time) or
+        as one Data1D per channel holding a curve per segment
+        """
+        config = self.acq_config
+        segments = split_segments(record, config.nsegments, config.period, config.nsamples)
+        if self.settings['acquisition', 'segmented', 'emission'] == 'Data2D':
+            data = [DataFromPlugins(name='RedPitaya', data=list(segments), dim='Data2D',
+                                    labels=config.labels,
+                                    axes=[config.get_segment_axis(index=0),
+                                          config.get_time_axis(index=1)])]
+        else:
+            data = [DataFromPlugins(name=label, data=list(channel_segments), dim='Data1D',
+                                    labels=[f'{label} segment {ind}' for ind
+                                            in range(config.nsegments)],
+                                    axes=[config.get_time_axis()])
+                    for label, channel_segments in zip(config.labels, segments)]
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=data))
+        self.telemetry.mark('emit')
+
+    def publish(self, data_array: np.ndarray):
+        """ Emit a frame, through the running average if activated"""
+        if self.settings['acquisition', 'running_average']:
+            data_array = self.running_average.update(data_array)
+        if self.acq_config.segmented:
+            self.emit_segments(data_array)
+        else:
+            self.emit_frame(data_array)
+
+    def get_accumulator(self, shape) -> FrameAccumulator:
+        """ Get a reset accumulator for frames of the given shape, reallocated only if needed"""
+        if self.accumulator is None or self.accumulator.shape != tuple(shape):
+            self.accumulator = FrameAccumulator(shape)
         else:
-            self.controller.acq_trigger_delay_samples = int(self.settings['sampling',
-            'buffer_length'] / 2)
+            self.accumulator.reset()
+        return self.accumulator
+
+    def get_frame(self, shape) -> np.ndarray:
+        """ Get a float32 frame of the given shape from the pool, reallocated only if needed
+
+        The emitted data wraps views of the frame, which is written again once the pool has handed
+        out all its other frames
+        """
+        if self.frame_pool is None or self.frame_pool.shape != tuple(shape):
+            self.frame_pool = FramePool(shape, max_size=self.plugin_config('sampling', 'frame_pool'))
+        return self.frame_pool.get()
+
+    def emit_batch(self, batch: np.ndarray):
+        """ Emit frames of shape (nframes, len(self.channels), nsamples) as Data2D"""
+        config = self.acq_config
+        frame_axis = Axis('frames', data=np.arange(batch.shape[0]), index=0)
+        self.dte_signal.emit(DataToExport('Redpitaya_dte',
+                                          data=[DataFromPlugins(name='RedPitaya',
+                                                                data=[batch[:, ind, :] for ind
+                                                                      in range(batch.shape[1])],
+                                                                dim='Data2D', labels=config.labels,
+                                                                axes=[frame_axis,
+                                                                      config.get_time_axis(index=1)])]))
+        self.telemetry.mark('emit')
+
+    def start_streaming(self):
+        """ Start the background acquisition thread filling a new ring buffer"""
+        config = self.acq_config
+        nsamples = config.nsamples
+        ring = FrameRingBuffer(self.settings['acquisition', 'streaming', 'depth'], config.shape,
+                               dtype=np.float32)
+        self.trigger_waiter.reset()
+        self.streaming = StreamingAcquisition(
+            ring, lambda frame: self.acquire(nsamples, out=frame) is not None,
+            on_stop=self.trigger_waiter.cancel)
+        self.streaming.start()
+
+    def stop_streaming(self):
+        """ Stop the background acquisition thread if running and log its frame counts"""
+        if self.streaming is not None:
+            self.streaming.stop()
+            ring = self.streaming.ring
+            self.streaming = None
+            self.controller.acquisition_stop()
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f'Streaming stopped: {ring.acquired} frames acquired, '
+                                            f'{ring.dropped} dropped']))
+
+    def wait_streaming(self) -> bool:
+        """ Wait for the streaming thread to provide at least one new frame"""
+        timeout = self.acq_config.timeout or None
+        if not self.streaming.ring.wait(timeout):
+            if self.streaming.error is not None:
+                raise self.streaming.error
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f'No frame streamed within {timeout} s']))
+            return False
+        return True
+
+    def grab_streaming(self, Naverage=1):
+        """ Publish the frames acquired by the streaming thread
+
+        Either the average of the Naverage next frames, the latest frame or the batch of frames
+        acquired since the last call, depending on the settings
+        """
+        if self.streaming is None:
+            self.start_streaming()
+        ring = self.streaming.ring
+        if Naverage > 1:
+            accumulator = self.get_accumulator(ring.frames.shape[1:])
+            while accumulator.count < Naverage:
+                if not self.wait_streaming():
+                    return
+                for frame in ring.pop_batch(Naverage - accumulator.count):
+                    accumulator.add(frame)
+            self.publish(accumulator.mean())
+        elif not self.wait_streaming():
+            return
+        elif self.settings['acquisition', 'streaming', 'publish'] == 'Latest':
+            self.publish(ring.pop_latest(out=self.get_frame(ring.frames.shape[1:])))
+        else:
+            self.emit_batch(ring.pop_batch())
+        self.settings.child('acquisition', 'streaming', 'acquired').setValue(ring.acquired)
+        self.settings.child('acquisition', 'streaming', 'dropped').setValue(ring.dropped)
+
+    def _check_segments(self):
+        """ Reduce the number of segments if the record does not fit in the board buffer"""
+        nsamples = self.settings['sampling', 'nsamples']
+        period = self.settings['acquisition', 'segmented', 'period']
+        nsegments = self.settings['acquisition', 'segmented', 'nsegments']
+        max_segments = max((self.settings['sampling', 'buffer_length'] - nsamples) // period + 1, 1)
+        if nsegments > max_segments:
+            self.emit_status(ThreadCommand('Update_Status', [f'Only {max_segments} segments fit in '
+                                                            f'the board buffer']))
+            self.settings.child('acquisition', 'segmented', 'nsegments').setValue(max_segments)
+            self._acq_config = None
+        self.settings.child('acquisition', 'segmented', 'record_length').setValue(
+            self.acq_config.record_length)
+
+    def _center_trigger(self):
+        """ Write the trigger delay, centring the whole record on the trigger if asked"""
+        buffer_length = self.settings['sampling', 'buffer_length']
+        self.acq_settings.set('acq_trigger_delay_samples',
+                              self.acq_config.trigger_delay(buffer_length))
 
     def ini_detector(self, controller=None):
         """Detector communication initialization
@@ -111,78 +539,115 @@ class DAQ_1DViewer_RedPitayaSCPI(DAQ_Viewer_base):
             False if initialization failed otherwise True
         """
         self.ini_detector_init(old_controller=controller,
-                               new_controller=RedPitayaScpi(ip_address=self.settings['ip_address'],
-                                                            port=self.settings['port']))
+                               new_controller=acquire_controller(self.settings['ip_address'],
+                                                                 self.settings['port'])
+                               if self.is_master else None)
         bname = self.controller.name
         self.settings.child('bname').setValue(bname)
 
+        self.trigger_waiter = TriggerWaiter(self.controller)
+        self.telemetry.controller = self.controller
         self.controller.acquisition_reset()
-
-        self.controller.acq_format = 'ASCII'
-        self.controller.acq_units = 'VOLTS'
-        self.controller.acq_trigger_level = self.settings['triggering', 'level']
-        self.controller.decimation = self.settings['sampling', 'decimation']
-        self.controller.average_skipped_samples = self.settings['sampling', 'average']
+        self.acq_settings = ScpiWriteCache(self.controller)
+        self._acq_config = None
+
+        self.acq_settings.set('acq_format', self.settings['sampling', 'acq_format'])
+        self.acq_settings.set('acq_units', 'VOLTS')
+        self.acq_settings.set('acq_trigger_level', self.settings['triggering', 'level'])
+        self.acq_settings.set('decimation', self.settings['sampling', 'decimation'])
+        self.acq_settings.set('average_skipped_samples', self.settings['sampling', 'average'])
         self.settings.child('sampling', 'buffer_length').setValue(self.controller.buffer_length)
         self.settings.child('sampling',
                             'nsamples').setLimits((1, self.settings['sampling', 'buffer_length']))
         self.settings.child('sampling', 'sample_rate').setValue(self.controller.CLOCK /
                                                     self.controller.decimation)
+        self._check_segments()
         self._center_trigger()
+        self.connection = ConnectionKeeper(self.controller, self.restore_configuration,
+                                           sleep=self.trigger_waiter.sleep,
+                                           **self.plugin_config('connection'))
 
         info = f"Succesfully connected to the Redpitaya {bname} board"
         initialized = True
         return info, initialized
 
+    def restore_configuration(self):
+        """ Write again the acquisition configuration to the board after a reconnection or its
+        invalidation by another user of the controller"""
+        self.stop_streaming()
+        self.controller.acquisition_reset()
+        self.acq_settings.replay()
+        self.emit_status(ThreadCommand('Update_Status',
+                                       ['Acquisition configuration written again to the board']))
+
     def close(self):
-        """Terminate the communication protocol"""
-        pass
+        """Terminate the communication protocol, the connection being closed by its last user"""
+        if self.controller is None:
+            return
+        try:
+            self.stop()
+        except CONNECTION_ERRORS as e:
+            self.emit_status(ThreadCommand('Update_Status', [f'Could not stop the board: {e}']))
+        self.connection = None
+        if self.is_master:
+            release_controller(self.controller)
+            self.controller = None
 
     def grab_data(self, Naverage=1, **kwargs):
         """Start a grab from the detector
 
+        If the communication with the board fails, the connection is reopened and the grab done
+        again once. If the telemetry is enabled, the grab is timed from here to the emission.
+
         Parameters
         ----------
         Naverage: int
-            Number of hardware averaging (if hardware averaging is possible, self.hardware_averaging should be set to
-            True in class preamble and you should code this implementation)
+            Number of frames to be acquired and averaged before being emitted
         kwargs: dict
             others optionals arguments
         """
-
-        nsamples = self.settings['sampling', 'nsamples']
-        wait_time = nsamples / self.controller.CLOCK * self.settings['sampling', 'decimation']
-
-        if self.settings['triggering',  'center_trigger']:
-            offset = -self.settings['sampling', 'decimation'] / self.controller.CLOCK * nsamples / 2
+        self.trigger_waiter.reset()
+        if self.streaming is None:  # the streaming acquisitions are not timed
+            self.telemetry.begin()
+        try:
+            self.connection.call(self.grab, Naverage)
+        except ConnectionError as e:
+            if not self.trigger_waiter.cancelled:
+                self.emit_status(ThreadCommand('Update_Status', [str(e)]))
+        if self.telemetry.end():
+            self.update_telemetry()
+
+    def grab(self, Naverage=1):
+        """ Acquire and emit Naverage frames, in single, streaming or segmented acquisition mode
+
+        In segmented mode, each frame is a record holding all the segments, read in a single
+        transfer
+        """
+        if self.settings['acquisition', 'mode'] == 'Streaming':
+            self.telemetry.cancel()
+            self.grab_streaming(Naverage)
+            return
+
+        self.trigger_waiter.reset()
+        config = self.acq_config
+        nsamples = config.record_length
+        if Naverage > 1:
+            accumulator = self.get_accumulator(config.record_shape)
+            for ind in range(Naverage):
+                if self.acquire(nsamples, out=accumulator.frame) is None:
+                    return
+                accumulator.add(accumulator.frame)
+            data_array = accumulator.mean()
         else:
-            offset = 0
-
-        self.controller.acquisition_start()
-
-        QThread.msleep(max((1, int(wait_time * 1000))))
-        self.controller.acq_trigger_source = self.settings['triggering', 'source']
-
-        while not self.controller.acq_trigger_status:
-            QThread.msleep(10)
-            QtWidgets.QApplication.processEvents()
-
-        while not self.controller.acq_buffer_filled:
-            QThread.msleep(10)
-            QtWidgets.QApplication.processEvents()
-
-        data_list = [self.controller.analog_in[1].get_data(npts=nsamples)]
-        data_list.append(self.controller.analog_in[2].get_data(npts=nsamples))
-        axis = Axis('time', units='s', offset=offset,
-                    scaling=self.settings['sampling', 'decimation'] / self.controller.CLOCK,
-                    size=nsamples)
-        self.dte_signal.emit(DataToExport('Redpitaya_dte',
-                                          data=[DataFromPlugins(name='RedPitaya', data=data_list,
-                                                                dim='Data1D', labels=['AI0'],
-                                                                axes=[axis])]))
+            data_array = self.acquire(nsamples, out=self.get_frame(config.record_shape))
+        if data_array is not None:
+            self.publish(data_array)
 
     def stop(self):
         """Stop the current grab hardware wise if necessary"""
+        self.stop_streaming()
+        if self.trigger_waiter is not None:
+            self.trigger_waiter.cancel()
         self.controller.acquisition_stop()
         return ''
 
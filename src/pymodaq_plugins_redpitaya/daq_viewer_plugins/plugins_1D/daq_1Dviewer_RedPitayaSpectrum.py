@@ -0,0 +1,144 @@
+from typing import Tuple
+
+import numpy as np
+
+from pymodaq.utils.data import DataFromPlugins, Axis, DataToExport
+from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq.utils.parameter import Parameter
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSCPI import \
+    DAQ_1DViewer_RedPitayaSCPI
+from pymodaq_plugins_redpitaya.processing import PowerSpectrum, WINDOWS
+from pymodaq_plugins_redpitaya.utils import Config
+
+plugin_config = Config()
+
+SCALINGS = {'PSD': 'density', 'Power spectrum': 'spectrum'}
+SCALING_UNITS = {'density': 'V²/Hz', 'spectrum': 'V²'}
+
+
+class DAQ_1DViewer_RedPitayaSpectrum(DAQ_1DViewer_RedPitayaSCPI):
+    """ Instrument plugin class for a 1D viewer emitting the power spectra of the fast analog inputs.
+
+    The frames are acquired as by the RedPitayaSCPI 1D viewer. Their windowed rFFT power spectra
+    are averaged with the Welch method over the segments of each frame and over the Naverage
+    captures of a grab, in the streaming mode over all the consecutive frames acquired. The
+    running average of the settings averages the spectra of consecutive grabs.
+
+    * Should be compatible with all redpitaya flavour using the SCPI communication protocol
+    * Tested with the STEMlab 125-14 version
+    * PyMoDAQ >= 4.1.0
+    """
+    params = [param for param in DAQ_1DViewer_RedPitayaSCPI.params
+              if param['name'] != 'display'] + [
+        {'title': 'Spectrum:', 'name': 'spectrum', 'type': 'group', 'children': [
+            {'title': 'Window:', 'name': 'window', 'type': 'list', 'limits': list(WINDOWS),
+             'value': plugin_config('spectrum', 'window')},
+            {'title': 'Segment length:', 'name': 'segment_length', 'type': 'int', 'min': 0,
+             'value': plugin_config('spectrum', 'segment_length'),
+             'tip': 'Number of samples of the Welch segments, 0 for the whole frame'},
+            {'title': 'Overlap:', 'name': 'overlap', 'type': 'float', 'min': 0., 'max': 0.95,
+             'value': plugin_config('spectrum', 'overlap'),
+             'tip': 'Overlap of consecutive segments, as a fraction of their length'},
+            {'title': 'Scaling:', 'name': 'scaling', 'type': 'list', 'limits': SCALINGS,
+             'value': 'density'},
+            {'title': 'dB:', 'name': 'db', 'type': 'bool', 'value': True},
+            {'title': 'Resolution (Hz):', 'name': 'resolution', 'type': 'float', 'value': 0.,
+             'readonly': True},
+        ]},
+    ]
+
+    def ini_attributes(self):
+        super().ini_attributes()
+        self.spectrum: PowerSpectrum = None
+        self._spectrum_key = None
+        self._frequency_axis: Axis = None
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.commit_settings
+        """
+        if param.parent() is not None and param.parent().name() == 'spectrum':
+            if param.name() != 'resolution':
+                self.running_average.reset()
+            return  # read when the spectrum is computed
+        super().commit_settings(param)
+
+    def get_spectrum(self) -> PowerSpectrum:
+        """ Get a reset power spectrum for the current settings, rebuilt only if they changed"""
+        config = self.acq_config
+        key = (config, self.settings['spectrum', 'window'],
+               self.settings['spectrum', 'segment_length'], self.settings['spectrum', 'overlap'])
+        if self.spectrum is None or key != self._spectrum_key:
+            self.spectrum = PowerSpectrum(config.record_length, config.sampling_period, *key[1:])
+            self._spectrum_key = key
+            self._frequency_axis = Axis('frequency', units='Hz', offset=0.,
+                                        scaling=self.spectrum.frequency_step,
+                                        size=self.spectrum.frequencies.size, index=0)
+            self.settings.child('spectrum', 'resolution').setValue(self.spectrum.frequency_step)
+        else:
+            self.spectrum.reset()
+        return self.spectrum
+
+    def get_power(self, spectrum: PowerSpectrum) -> Tuple[np.ndarray, str]:
+        """ The averaged spectra of the enabled channels, in the scaling of the settings
+
+        Returns
+        -------
+        ndarray: array of shape (len(self.channels), nfrequencies)
+        str: the units of the spectra
+        """
+        scaling = self.settings['spectrum', 'scaling']
+        power = spectrum.mean(scaling)
+        if self.settings['acquisition', 'running_average']:
+            power = self.running_average.update(power)
+        units = SCALING_UNITS[scaling]
+        if self.settings['spectrum', 'db']:
+            with np.errstate(divide='ignore'):
+                power = 10 * np.log10(power)
+            units = f'dB({units})'
+        return power, units
+
+    def emit_spectrum(self, spectrum: PowerSpectrum):
+        """ Emit the averaged spectra of the enabled channels as Data1D"""
+        config = self.acq_config
+        power, units = self.get_power(spectrum)
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+            DataFromPlugins(name='Spectrum', data=list(power), dim='Data1D', units=units,
+                            labels=config.labels, axes=[self._frequency_axis])]))
+        self.telemetry.mark('emit')
+
+    def grab(self, Naverage=1):
+        """ Acquire Naverage frames, or the frames streamed since the last grab, and emit their
+        averaged power spectra
+
+        In segmented mode, the spectra are computed on the whole records
+        """
+        spectrum = self.get_spectrum()
+        if self.settings['acquisition', 'mode'] == 'Streaming':
+            self.telemetry.cancel()
+            if self.streaming is None:
+                self.start_streaming()
+            ring = self.streaming.ring
+            while spectrum.count < Naverage or spectrum.count == 0:
+                if not self.wait_streaming():
+                    return
+                spectrum.add(ring.pop_batch())
+            self.settings.child('acquisition', 'streaming', 'acquired').setValue(ring.acquired)
+            self.settings.child('acquisition', 'streaming', 'dropped').setValue(ring.dropped)
+        else:
+            self.trigger_waiter.reset()
+            config = self.acq_config
+            frame = self.get_frame(config.record_shape)
+            for ind in range(Naverage):
+                if self.acquire(config.record_length, out=frame) is None:
+                    return
+                spectrum.add(frame)
+        self.emit_spectrum(spectrum)
+
+
+if __name__ == '__main__':
+    main(__file__)
@@ -1,6 +1,6 @@
+from typing import Optional
+
 import numpy as np
-from qtpy import QtWidgets
-from qtpy.QtCore import QThread
 
 from pymodaq.utils.daq_utils import ThreadCommand
 from pymodaq.utils.data import DataFromPlugins, Axis, DataToExport
@@ -11,11 +11,17 @@ from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPit
     DAQ_1DViewer_RedPitayaSCPI
 
 from pymodaq_plugins_redpitaya.utils import Config
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig, ScpiWriteCache
+from pymodaq_plugins_redpitaya.processing import FrequencyResponse, frequency_grid
 
 plugin_config = Config()
 
 from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi, AnalogOutputFastChannel
 
+# generator properties configured from the settings of the Analog Output group
+GENERATOR_SETTINGS = ('shape', 'amplitude', 'offset', 'phase', 'sweep_mode', 'sweep_start_frequency',
+                      'sweep_stop_frequency', 'sweep_time', 'sweep_direction')
+
 
 class DAQ_1DViewer_Sweep(DAQ_1DViewer_RedPitayaSCPI):
     """ Instrument plugin class for a 1D viewer.
@@ -39,7 +45,8 @@ class DAQ_1DViewer_Sweep(DAQ_1DViewer_RedPitayaSCPI):
     """
     params = DAQ_1DViewer_RedPitayaSCPI.params + [
     {'title': 'Analog Output:', 'name': 'output', 'type': 'group', 'children': [
-        {'title': 'AO Channel', 'name': 'aout_channel', 'type': 'list', 'limits': {'1': 1, '2': 2}},
+        {'title': 'AO Channel', 'name': 'aout_channel', 'type': 'list', 'limits': {'1': 1, '2': 2},
+         'value': plugin_config('generator', 'channel')},
 
         {'title': 'Amplitude', 'name': 'amplitude', 'type': 'float', 'limits': AnalogOutputFastChannel.AMPLITUDES,
          'value': plugin_config('generator', 'amplitude')},
@@ -63,12 +70,37 @@ class DAQ_1DViewer_Sweep(DAQ_1DViewer_RedPitayaSCPI):
         {'title': 'Sweep State', 'name': 'sweep_state', 'type': 'bool', 'value': False},
         {'title': 'Sweep Direction', 'name': 'sweep_direction', 'type': 'list', 'limits': AnalogOutputFastChannel.DIRECTION,
          'value': plugin_config('generator', 'direction')},
+        {'title': 'Persistent session', 'name': 'persistent', 'type': 'bool',
+         'value': plugin_config('generator', 'persistent_session'),
+         'tip': 'Configure the generator once and only re-trigger the sweep on each grab'},
+        {'title': 'Verify every (grabs)', 'name': 'verify_every', 'type': 'int', 'min': 0,
+         'value': plugin_config('generator', 'verify_every'),
+         'tip': 'In a persistent session, check the board generator state every N grabs (0: only at '
+                'the session start)'},
+    ]},
+    {'title': 'Frequency response:', 'name': 'response', 'type': 'group', 'children': [
+        {'title': 'Enabled', 'name': 'enabled', 'type': 'bool', 'value': False,
+         'tip': 'Emit the magnitude and phase of IN2/IN1 (or IN1/IN2) along the sweep instead of the '
+                'time traces. Naverage sweeps are averaged'},
+        {'title': 'Reference', 'name': 'reference', 'type': 'list', 'limits': {'IN1': 1, 'IN2': 2},
+         'value': 1, 'tip': 'The input measuring the excitation, the other one the response'},
+        {'title': 'Frequency points', 'name': 'npoints', 'type': 'int', 'min': 2,
+         'value': plugin_config('response', 'npoints')},
+        {'title': 'Segments', 'name': 'response_segments', 'type': 'int', 'min': 1,
+         'value': plugin_config('response', 'nsegments'),
+         'tip': 'Number of segments a record is split into for the demodulation'},
+        {'title': 'Threshold', 'name': 'threshold', 'type': 'float', 'min': 0., 'max': 1.,
+         'value': plugin_config('response', 'threshold'),
+         'tip': 'Segments whose reference power is below this fraction of the maximum are discarded'},
     ]},
     ]
 
     def ini_attributes(self):
-        self.controller: RedPitayaScpi = None
-        self.x_axis = None
+        super().ini_attributes()
+        self.generator_settings: ScpiWriteCache = None
+        self.session_grabs = 0
+        self.session_active = False
+        self.frequency_response: FrequencyResponse = None
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -80,87 +112,202 @@ class DAQ_1DViewer_Sweep(DAQ_1DViewer_RedPitayaSCPI):
         """
         super().commit_settings(param)
 
-        if param.name() == 'amplitude':
-            self.aout.amplitude = param.value()
-        elif param.name() == 'enable':
-            self.aout.enable = param.value()
-        elif param.name() == 'shape':
-            self.aout.shape = param.value()
-        elif param.name() == 'offset':
-            self.aout.offset = param.value()
-        elif param.name() == 'phase':
-            self.aout.phase = param.value()
-        elif param.name() == 'sweep_mode':
-            self.aout.sweep_mode = param.value()
-        elif param.name() == 'sweep_start_frequency':
-            self.aout.sweep_start_frequency = param.value()
-        elif param.name() == 'sweep_stop_frequency':
-            self.aout.sweep_stop_frequency = param.value()
-        elif param.name() == 'sweep_state':
-            self.aout.sweep_state = param.value()
-        elif param.name() == 'sweep_direction':
-            self.aout.sweep_direction = param.value()
+        if param.name() in GENERATOR_SETTINGS:
+            self.generator_settings.set(param.name(), param.value())
+        elif param.name() in ('enable', 'sweep_state'):
+            self.generator_settings.set(param.name(), param.value())
+            self.session_active = False
+        elif param.name() == 'aout_channel':
+            self.configure_generator()
+        elif param.name() == 'persistent':
+            self.session_active = False
 
     @property
     def aout(self):
         """ It defines what output channel the user chose"""
         return self.controller.analog_out[self.settings['output', 'aout_channel']]
 
+    def ini_detector(self, controller=None):
+        """Detector communication initialization, the generator being configured from the settings
 
-    def grab_data(self, Naverage=1, **kwargs):
-        """Start a grab from the detector
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.ini_detector
+        """
+        info, initialized = super().ini_detector(controller)
+        self.configure_generator()
+        return info, initialized
 
-        Parameters
-        ----------
-        Naverage: int
-            Number of hardware averaging (if hardware averaging is possible, self.hardware_averaging should be set to
-            True in class preamble and you should code this implementation)
-        kwargs: dict
-            others optionals arguments
+    def configure_generator(self):
+        """ Write all the generator settings to the selected output channel"""
+        self.generator_settings = ScpiWriteCache(self.aout)
+        for name in GENERATOR_SETTINGS:
+            self.generator_settings.set(name, self.settings['output', name])
+        self.session_active = False
+
+    def restore_configuration(self):
+        """ Write again the acquisition and generator configurations after a reconnection"""
+        super().restore_configuration()
+        self.generator_settings.replay()
+        self.session_active = False
+
+    def check_generator(self) -> bool:
+        """ Check that the generator state of the board matches the settings, rewrite it otherwise
+
+        Returns
+        -------
+        bool: True if the board state was matching
         """
-        self.controller.output_reset()
+        mismatches = []
+        for name, value in self.generator_settings.values.items():
+            try:
+                with self.controller.lock:
+                    board_value = getattr(self.aout, name)
+            except Exception:  # property that cannot be read back
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                matching = np.isclose(float(board_value), value)
+            else:
+                matching = board_value == value
+            if not matching:
+                mismatches.append(name)
+        if mismatches:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f'Generator state differs from the settings for '
+                                            f'{mismatches}, reconfiguring it']))
+            self.generator_settings.replay()
+        return not mismatches
+
+    def start_session(self):
+        """ Enable the sweep and the output once for a persistent session"""
+        self.check_generator()
+        self.generator_settings.set('sweep_state', True)
+        self.generator_settings.set('enable', True)
+        self.session_active = True
+        self.session_grabs = 0
 
-        nsamples = self.settings['sampling', 'nsamples']
-        wait_time = nsamples / self.controller.CLOCK * self.settings['sampling', 'decimation']
+    def on_trigger_armed(self):
+        """ Start the sweep once the acquisition trigger is armed"""
+        if not self.settings['output', 'persistent']:
+            self.aout.sweep_state = True
+            self.aout.enable = True
+        self.aout.run()
 
-        if self.settings['triggering', 'center_trigger']:
-            offset = -self.settings['sampling', 'decimation'] / self.controller.CLOCK * nsamples / 2
+    def acquire(self, nsamples: int, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """ Run a full acquisition of the sweep
+
+        In a persistent session, the generator is configured once and each acquisition only
+        re-triggers the sweep. Otherwise the generator is reset and configured before each
+        acquisition and disabled after.
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.acquire
+        """
+        if self.settings['output', 'persistent']:
+            if not self.session_active:
+                self.start_session()
+            elif self.settings['output', 'verify_every'] and \
+                    self.session_grabs % self.settings['output', 'verify_every'] == 0:
+                self.check_generator()
+            self.session_grabs += 1
+            return super().acquire(nsamples, out=out)
+
+        self.controller.output_reset()
+        self.generator_settings.replay()
+        data_array = super().acquire(nsamples, out=out)
+        self.controller.acquisition_stop()
+        self.aout.enable = False
+        # written directly by on_trigger_armed and here, their cached values are stale
+        self.generator_settings.invalidate('sweep_state')
+        self.generator_settings.invalidate('enable')
+        return data_array
+
+    def get_frequency_response(self) -> FrequencyResponse:
+        """ Get a reset frequency response for the current settings, reallocated only if needed"""
+        frequencies = frequency_grid(self.settings['output', 'sweep_start_frequency'],
+                                     self.settings['output', 'sweep_stop_frequency'],
+                                     self.settings['response', 'npoints'],
+                                     self.settings['output', 'sweep_mode'])
+        response = self.frequency_response
+        nsegments = self.settings['response', 'response_segments']
+        if response is None or response.nsegments != nsegments or \
+                not np.array_equal(response.frequencies, frequencies):
+            response = FrequencyResponse(frequencies, nsegments)
+            self.frequency_response = response
         else:
-            offset = 0
+            response.reset()
+        response.threshold = self.settings['response', 'threshold']
+        return response
 
-        self.controller.acquisition_start()
+    def emit_response(self, response: FrequencyResponse):
+        """ Emit the magnitude and phase of the frequency response as Data1D"""
+        magnitude, phase = response.magnitude_phase()
+        frequency_axis = Axis('frequency', units='Hz', data=response.frequencies, index=0)
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+            DataFromPlugins(name='Magnitude', data=[magnitude], dim='Data1D', units='dB',
+                            labels=['Magnitude'], axes=[frequency_axis]),
+            DataFromPlugins(name='Phase', data=[phase], dim='Data1D', units='deg',
+                            labels=['Phase'], axes=[frequency_axis.copy()])]))
+        self.telemetry.mark('emit')
 
+    def sweep_fits(self, config: AcquisitionConfig) -> bool:
+        """ Check that the whole sweep is recorded after the trigger, emit a status otherwise
 
-        QThread.msleep(max((1, int(wait_time * 1000))))
-        self.controller.acq_trigger_source = self.settings['triggering', 'source']
+        Returns
+        -------
+        bool: True if the sweep fits in the acquisition window
+        """
+        sweep_duration = self.settings['output', 'sweep_time'] * 1e-6  # the sweep time is in µs
+        window = config.wait_time + config.offset  # the part of the frame after the trigger
+        if sweep_duration > window:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           [f'The sweep lasts {sweep_duration:.3g} s, longer than '
+                                            f'the {window:.3g} s recorded after the trigger: '
+                                            f'increase the decimation or the number of samples, '
+                                            f'or shorten the sweep']))
+            return False
+        return True
 
-        self.aout.sweep_state = True
-        self.aout.enable = True
-        self.aout.run()
+    def grab_response(self, Naverage=1):
+        """ Acquire Naverage sweeps, demodulate them and emit their averaged frequency response"""
+        config = self.acq_config
+        if config.channels != [1, 2]:
+            self.emit_status(ThreadCommand('Update_Status',
+                                           ['The frequency response needs both IN1 and IN2 enabled']))
+            return
+        if not self.sweep_fits(config):
+            return
+        self.trigger_waiter.reset()
+        response = self.get_frequency_response()
+        accumulator = self.get_accumulator(config.shape)  # only its scratch frame is used
+        reference = self.settings['response', 'reference'] - 1
+        for ind in range(Naverage):
+            if self.acquire(config.nsamples, out=accumulator.frame) is None:
+                return
+            response.add(accumulator.frame[reference], accumulator.frame[1 - reference],
+                         config.sampling_period)
+        self.emit_response(response)
+
+    def grab(self, Naverage=1):
+        """ Acquire and emit either Naverage frames or the frequency response of Naverage sweeps
 
-        while not self.controller.acq_trigger_status:
-            QThread.msleep(10)
-            QtWidgets.QApplication.processEvents()
-
-        while not self.controller.acq_buffer_filled:
-            QThread.msleep(10)
-            QtWidgets.QApplication.processEvents()
-
-        data_list = [self.controller.analog_in[1].get_data(npts=nsamples)]
-        data_list.append(self.controller.analog_in[2].get_data(npts=nsamples))
-        axis = Axis('time', units='s', offset=offset,
-                    scaling=self.settings['sampling', 'decimation'] / self.controller.CLOCK,
-                    size=nsamples)
-        self.dte_signal.emit(DataToExport('Redpitaya_dte',
-                                          data=[DataFromPlugins(name='RedPitaya', data=data_list,
-                                                                dim='Data1D', labels=['AI0'],
-                                                                axes=[axis])]))
-        self.stop()
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSCPI.grab
+        """
+        if self.settings['response', 'enabled']:
+            self.grab_response(Naverage)
+        else:
+            super().grab(Naverage)
 
     def stop(self):
         """Stop the current grab hardware wise if necessary"""
         super().stop()
-        self.aout.enable= False
+        self.aout.enable = False
+        if self.generator_settings is not None:
+            self.generator_settings.invalidate('enable')
+        self.session_active = False
         return ''
 
 if __name__ == '__main__':
@@ -0,0 +1,149 @@
+import time
+
+import numpy as np
+
+from pymodaq.utils.data import DataFromPlugins, Axis, DataToExport
+from pymodaq.control_modules.viewer_utility_classes import main
+from pymodaq.utils.parameter import Parameter
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSCPI import \
+    DAQ_1DViewer_RedPitayaSCPI
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_RedPitayaSpectrum \
+    import DAQ_1DViewer_RedPitayaSpectrum
+from pymodaq_plugins_redpitaya.hardware.frame_pool import FramePool
+from pymodaq_plugins_redpitaya.processing import PowerSpectrum, Waterfall, split_segments
+from pymodaq_plugins_redpitaya.utils import Config
+
+plugin_config = Config()
+
+
+class DAQ_2DViewer_RedPitayaWaterfall(DAQ_1DViewer_RedPitayaSpectrum):
+    """ Instrument plugin class for a 2D viewer stacking the last frames of the fast analog inputs.
+
+    Each grab adds its time traces (or their power spectra, computed as by the RedPitayaSpectrum
+    viewer) to a waterfall of fixed depth, emitted as Data2D against the capture time and the
+    sample time (or frequency) axes. The waterfall is preallocated and updated in place, so that
+    its memory use does not depend on the duration of the run.
+
+    * Should be compatible with all redpitaya flavour using the SCPI communication protocol
+    * Tested with the STEMlab 125-14 version
+    * PyMoDAQ >= 4.1.0
+    """
+    params = DAQ_1DViewer_RedPitayaSpectrum.params + [
+        {'title': 'Waterfall:', 'name': 'waterfall', 'type': 'group', 'children': [
+            {'title': 'Content:', 'name': 'content', 'type': 'list',
+             'limits': ['Time traces', 'Spectra'], 'value': plugin_config('waterfall', 'content')},
+            {'title': 'Depth (frames):', 'name': 'depth', 'type': 'int', 'min': 2,
+             'value': plugin_config('waterfall', 'depth')},
+        ]},
+    ]
+
+    def ini_attributes(self):
+        super().ini_attributes()
+        self.waterfall: Waterfall = None
+        self.output_pool: FramePool = None
+        self._start_time = 0.
+        self._sample_axis = None
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings, the waterfall
+        being cleared if they change the meaning of its rows
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSpectrum.commit_settings
+        """
+        group = param.parent().name() if param.parent() is not None else None
+        if group != 'telemetry' and \
+                param.name() not in ('acquired', 'dropped', 'resolution', 'record_length'):
+            self.waterfall = None
+        if group == 'waterfall':
+            return  # read when the waterfall is rebuilt
+        super().commit_settings(param)
+
+    def add_rows(self, rows: np.ndarray, sample_axis: Axis, units: str = 'V',
+                 spacing: float = 0.):
+        """ Add frames of shape (nframes, len(self.channels), npts) to the waterfall and emit it
+
+        Parameters
+        ----------
+        rows: ndarray
+        sample_axis: Axis
+            the axis of the npts samples of a frame, either time or frequency
+        units: str
+            the units of the frames
+        spacing: float
+            the time in s between the captures of two consecutive frames, if known
+        """
+        now = time.perf_counter()
+        if self.waterfall is None or self.waterfall.frame_shape != rows.shape[1:]:
+            self.waterfall = Waterfall(self.settings['waterfall', 'depth'], rows.shape[1:])
+            self._start_time = now
+        for ind, row in enumerate(rows):
+            self.waterfall.add(row, now - self._start_time + ind * spacing)
+        frames = self.waterfall.frames(out=self.get_output())
+        capture_axis = Axis('capture time', units='s', data=self.waterfall.times().copy(),
+                            index=0)
+        self.dte_signal.emit(DataToExport('Redpitaya_dte', data=[
+            DataFromPlugins(name='Waterfall', data=list(frames),
+                            dim='Data2D', units=units, labels=self.acq_config.labels,
+                            axes=[capture_axis, sample_axis])]))
+        self.telemetry.mark('emit')
+
+    def get_output(self) -> np.ndarray:
+        """ Get an array from the pool the waterfall is copied into for its emission
+
+        The ring buffer of the waterfall is overwritten by the next rows while the emitted data may
+        still be in use. Its frames are rather copied into preallocated arrays handed out in turn,
+        see FramePool.
+        """
+        shape = (self.waterfall.rows.shape[0], self.waterfall.depth, self.waterfall.rows.shape[2])
+        if self.output_pool is None or self.output_pool.shape != shape:
+            self.output_pool = FramePool(shape, dtype=self.waterfall.rows.dtype,
+                                         max_size=plugin_config('waterfall', 'outputs'))
+        return self.output_pool.get()
+
+    def get_sample_axis(self) -> Axis:
+        """ The axis of the samples of the rows, rebuilt only after a change of the settings"""
+        config = self.acq_config
+        key = (config, self.settings['waterfall', 'content'], self.spectrum)
+        if self._sample_axis is None or self._sample_axis[0] != key:
+            if key[1] == 'Spectra':
+                axis = Axis('frequency', units='Hz', offset=0., scaling=self.spectrum.frequency_step,
+                            size=self.spectrum.frequencies.size, index=1)
+            else:
+                axis = config.get_time_axis(index=1)
+            self._sample_axis = (key, axis)
+        return self._sample_axis[1]
+
+    def emit_frame(self, data_array: np.ndarray):
+        self.add_rows(data_array[np.newaxis], self.get_sample_axis())
+
+    def emit_segments(self, record: np.ndarray):
+        config = self.acq_config
+        segments = split_segments(record, config.nsegments, config.period, config.nsamples)
+        self.add_rows(np.swapaxes(segments, 0, 1), self.get_sample_axis(),
+                      spacing=config.period * config.sampling_period)
+
+    def emit_batch(self, batch: np.ndarray):
+        self.add_rows(batch, self.get_sample_axis())
+
+    def emit_spectrum(self, spectrum: PowerSpectrum):
+        power, units = self.get_power(spectrum)
+        self.add_rows(power[np.newaxis], self.get_sample_axis(), units=units)
+
+    def grab(self, Naverage=1):
+        """ Acquire and add to the waterfall either Naverage frames or their averaged spectra
+
+        See Also
+        --------
+        DAQ_1DViewer_RedPitayaSpectrum.grab, DAQ_1DViewer_RedPitayaSCPI.grab
+        """
+        if self.settings['waterfall', 'content'] == 'Spectra':
+            super().grab(Naverage)
+        else:
+            DAQ_1DViewer_RedPitayaSCPI.grab(self, Naverage)
+
+
+if __name__ == '__main__':
+    main(__file__)
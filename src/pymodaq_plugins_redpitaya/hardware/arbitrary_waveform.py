@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Arbitrary waveforms of the fast generator: synthesis of one period at the AWG table length,
+quantization to the DAC resolution and upload, skipped when the channel already holds the same
+waveform.
+"""
+import ast
+import hashlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import TERMINATION
+
+AWG_LENGTH = 16384  # number of samples of the arbitrary waveform table of a channel
+DAC_BITS = 14
+WAVEFORMS = ('Chirp', 'Pulse train', 'Expression')
+UPLOAD_FORMATS = ('ASCII', 'BIN')
+
+# names available to the expressions, evaluated on the phase t in [0, 1[ of the period
+EXPRESSION_NAMESPACE = {name: getattr(np, name) for name in
+                        ('sin', 'cos', 'tan', 'exp', 'log', 'sqrt', 'abs', 'sign', 'tanh',
+                         'arctan', 'where', 'clip', 'mod', 'floor', 'minimum', 'maximum', 'pi')}
+# syntax allowed in the expressions: arithmetic, comparisons and calls of the names above only
+EXPRESSION_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name,
+                    ast.Constant, ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv,
+                    ast.Mod, ast.Pow, ast.USub, ast.UAdd, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+def phase_axis(npts: int = AWG_LENGTH) -> np.ndarray:
+    """ The phases in [0, 1[ of the samples of a period"""
+    return np.arange(npts) / npts
+
+
+def chirp(start_cycles: float, stop_cycles: float, npts: int = AWG_LENGTH) -> np.ndarray:
+    """ Sine whose frequency goes linearly from start_cycles to stop_cycles cycles per period"""
+    t = phase_axis(npts)
+    return np.sin(2 * np.pi * (start_cycles * t + (stop_cycles - start_cycles) * t ** 2 / 2))
+
+
+def pulse_train(npulses: int, dutycycle: float, npts: int = AWG_LENGTH) -> np.ndarray:
+    """ npulses rectangular pulses per period, high (1) during dutycycle of each pulse, 0 otherwise"""
+    return (np.mod(phase_axis(npts) * npulses, 1.) < dutycycle).astype(np.float64)
+
+
+def parse_expression(text: str) -> ast.Expression:
+    """ Parse an expression, checking it only uses the syntax of EXPRESSION_NODES, the names of
+    EXPRESSION_NAMESPACE and t and numeric constants, the latter being made floats
+
+    Raises
+    ------
+    ValueError: if the expression is not valid or uses anything else
+    """
+    try:
+        tree = ast.parse(text.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f'Invalid waveform expression {text!r}: {e.msg}') from e
+    for node in ast.walk(tree):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise ValueError(f'{type(node).__name__} is not allowed in a waveform expression')
+        if isinstance(node, ast.Name) and node.id != 't' and node.id not in EXPRESSION_NAMESPACE:
+            raise ValueError(f'Unknown name {node.id!r} in the waveform expression {text!r}')
+        if isinstance(node, ast.Call) and (node.keywords or not isinstance(node.func, ast.Name)):
+            raise ValueError(f'Only positional calls of functions are allowed in {text!r}')
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f'Only numbers are allowed in {text!r}, not {node.value!r}')
+            node.value = float(node.value)  # no arbitrary precision integer power
+    return tree
+
+
+def expression(text: str, npts: int = AWG_LENGTH) -> np.ndarray:
+    """ Waveform evaluated from a numpy expression of the phase t in [0, 1[, for instance
+    'sin(2 * pi * t) + 0.3 * sin(6 * pi * t)'
+
+    The expression is checked by parse_expression before its evaluation, so that only arithmetic
+    on t and the functions of EXPRESSION_NAMESPACE can be run.
+
+    Raises
+    ------
+    ValueError: if the expression is not allowed, cannot be evaluated or does not give npts
+    finite values
+    """
+    code = compile(parse_expression(text), '<waveform expression>', 'eval')
+    t = phase_axis(npts)
+    try:
+        with np.errstate(all='ignore'):  # non finite values are rejected below
+            values = eval(code, {'__builtins__': {}}, dict(EXPRESSION_NAMESPACE, t=t))
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), t.shape)
+    except Exception as e:
+        raise ValueError(f'Invalid waveform expression {text!r}: {e}') from e
+    if not np.all(np.isfinite(values)):
+        raise ValueError(f'The waveform expression {text!r} gives non finite values')
+    return values
+
+
+def quantize(waveform: np.ndarray, bits: int = DAC_BITS) -> np.ndarray:
+    """ Clip a waveform to [-1, 1] and round it to the levels of a DAC of the given resolution
+
+    Returns
+    -------
+    ndarray: read-only float32 array
+    """
+    levels = 2 ** (bits - 1) - 1
+    quantized = (np.round(np.clip(waveform, -1., 1.) * levels) / levels).astype(np.float32)
+    quantized.flags.writeable = False
+    return quantized
+
+
+def waveform_hash(waveform: np.ndarray) -> str:
+    """ Digest of the content of a quantized waveform"""
+    return hashlib.blake2b(np.ascontiguousarray(waveform).tobytes(), digest_size=16).hexdigest()
+
+
+def encode_upload(channel: int, waveform: np.ndarray, upload_format: str = 'ASCII') -> bytes:
+    """ The command loading a quantized waveform in the table of a generator channel
+
+    In BIN format the samples are sent as a SCPI definite length block of big endian float32,
+    avoiding their string formatting, in ASCII format as comma separated values
+    """
+    command = f'SOUR{channel:d}:TRAC:DATA:DATA '.encode()
+    if upload_format == 'BIN':
+        payload = waveform.astype('>f4').tobytes()
+        length = str(len(payload)).encode()
+        return command + b'#' + str(len(length)).encode() + length + payload
+    return command + ','.join(np.char.mod('%.5f', waveform)).encode()
+
+
+class WaveformLoader:
+    """ Upload arbitrary waveforms to the generator channels, keeping the hash of their content
+
+    A waveform already loaded on a channel is not sent again, so that switching back and forth
+    between waveforms during a scan only costs the changed uploads. The hashes have to be
+    invalidated when the board may have lost its tables, for instance after a reconnection.
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    upload_format: str
+        one of UPLOAD_FORMATS
+    """
+
+    def __init__(self, controller: RedPitayaScpi, upload_format: str = 'ASCII'):
+        self.controller = controller
+        self.upload_format = upload_format
+        self.loaded: Dict[int, str] = {}  # hash of the waveform loaded on each channel
+        self.uploads = 0
+
+    def load(self, channel: int, waveform: np.ndarray) -> bool:
+        """ Quantize a waveform and upload it to the table of channel if not already loaded
+
+        The channel outputs its table once its shape is set to ARBITRARY
+
+        Returns
+        -------
+        bool: True if the waveform has been uploaded
+        """
+        waveform = quantize(waveform)
+        digest = waveform_hash(waveform)
+        if self.loaded.get(channel) == digest:
+            return False
+        self.controller.write_bytes(encode_upload(channel, waveform, self.upload_format) +
+                                    TERMINATION.encode())
+        self.loaded[channel] = digest
+        self.uploads += 1
+        return True
+
+    def invalidate(self, channel: Optional[int] = None):
+        """ Forget the waveform loaded on channel, or on all channels if None"""
+        if channel is None:
+            self.loaded = {}
+        else:
+            self.loaded.pop(channel, None)
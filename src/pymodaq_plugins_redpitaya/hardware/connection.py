@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Creation of the SCPI connections to the Redpitaya boards.
+"""
+import socket
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from pyvisa import constants
+from pyvisa.errors import VisaIOError
+from pymeasure.adapters import VISAAdapter
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+from pymodaq_utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_redpitaya.utils import Config
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import TERMINATION_LENGTH
+from pymodaq_plugins_redpitaya.hardware.settings_cache import ScpiWriteCache
+from pymodaq_plugins_redpitaya.hardware.simulator import get_simulator
+
+logger = set_logger(get_module_name(__file__))
+
+# errors raised by a lost or desynchronised connection
+CONNECTION_ERRORS = (OSError, VisaIOError)
+
+
+def set_nodelay(controller: RedPitayaScpi) -> bool:
+    """ Disable the Nagle algorithm on the socket of the controller
+
+    The acquisition sequence is made of several short commands without answer (ACQ:START,
+    ACQ:TRig...) followed by a query. With the Nagle algorithm enabled, the query is delayed until
+    the previous segments are acknowledged, which costs up to the delayed acknowledgement time of
+    the server (about 40 ms) per frame.
+
+    Returns
+    -------
+    bool: True if the option could be set
+    """
+    connection = controller.adapter.connection
+    try:
+        connection.set_visa_attribute(constants.VI_ATTR_TCPIP_NODELAY, constants.VI_TRUE)
+        return True
+    except Exception:
+        pass
+    try:  # pyvisa-py does not implement the attribute setter, use its socket directly
+        session = connection.visalib.sessions[connection.session]
+        session.interface.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return True
+    except Exception as e:
+        logger.warning(f'Could not disable the Nagle algorithm on the Redpitaya connection: {e}')
+        return False
+
+
+class SharedRedPitayaScpi(RedPitayaScpi):
+    """ RedPitayaScpi whose communications are protected by a lock, to be used from several threads
+
+    Single writes, reads and queries of the instrument are atomic. Sequences that have to be atomic
+    as a whole, for instance the queries of the channels properties or the binary transfers,
+    should be enclosed in a ``with controller.lock:`` block, the lock being reentrant.
+
+    The connection can be checked with ping and reopened with reconnect, the controller object
+    being kept so that all its users benefit from the new connection. Each reconnection increments
+    generation, telling the users that the board configuration may have been lost. Reconnections
+    are serialized by reconnect_lock, the communication lock being only held during each attempt.
+    A user writing the board configuration without going through the caches of the others calls
+    invalidate, which increments generation too.
+
+    The state of the generator channels is cached once for all the users of the controller, see
+    generator_cache.
+
+    The number of written commands and of sent and received bytes are counted, for the telemetry.
+    """
+
+    def __init__(self, ip_address: str, port: int = 5000, **kwargs):
+        self.lock = threading.RLock()
+        self.reconnect_lock = threading.RLock()
+        self.resource_name = f"TCPIP::{ip_address}::{port}::SOCKET"
+        self.generation = 0
+        self.generator_caches: Dict[int, ScpiWriteCache] = {}
+        self.last_activity = time.perf_counter()
+        self.commands = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        super().__init__(ip_address=ip_address, port=port, **kwargs)
+
+    def write(self, command: str, **kwargs):
+        with self.lock:
+            super().write(command, **kwargs)
+            self.commands += 1
+            self.bytes_sent += len(command) + TERMINATION_LENGTH
+
+    def write_bytes(self, content: bytes, **kwargs):
+        with self.lock:
+            super().write_bytes(content, **kwargs)
+            self.commands += 1
+            self.bytes_sent += len(content)
+
+    def read(self, **kwargs) -> str:
+        with self.lock:
+            answer = super().read(**kwargs)
+            self.last_activity = time.perf_counter()
+            self.bytes_received += len(answer) + TERMINATION_LENGTH
+            return answer
+
+    def read_bytes(self, count: int, **kwargs) -> bytes:
+        with self.lock:
+            answer = super().read_bytes(count, **kwargs)
+            self.last_activity = time.perf_counter()
+            self.bytes_received += len(answer)
+            return answer
+
+    def ask(self, command: str, query_delay=None) -> str:
+        with self.lock:
+            return super().ask(command, query_delay)
+
+    def ping(self) -> bool:
+        """ Check that the board answers to an identification query"""
+        try:
+            return bool(self.ask('*IDN?'))
+        except CONNECTION_ERRORS:
+            return False
+
+    def is_idle(self, interval: float) -> bool:
+        """ True if nothing has been read from the board for more than interval seconds"""
+        return time.perf_counter() - self.last_activity > interval
+
+    def reopen(self):
+        """ Close the connection and open a new one"""
+        with self.lock:
+            try:
+                self.adapter.close()
+            except Exception:
+                pass
+            self.adapter = VISAAdapter(self.resource_name, read_termination='\r\n',
+                                       write_termination='\r\n')
+            set_nodelay(self)
+
+    def generator_cache(self, channel: int) -> ScpiWriteCache:
+        """ The state of the fast generator channel as last written by any user of the controller"""
+        with self.lock:
+            if channel not in self.generator_caches:
+                self.generator_caches[channel] = ScpiWriteCache(self.analog_out[channel])
+            return self.generator_caches[channel]
+
+    def invalidate(self):
+        """ Tell the users of the controller that the board configuration has been changed behind
+        their back, so that their ConnectionKeeper restores it before their next communication"""
+        with self.reconnect_lock:
+            self.generation += 1
+
+    def reconnect(self, attempts: int = 5, delay: float = 0.5, backoff: float = 2.,
+                  max_delay: float = 10., sleep: Callable[[float], bool] = None) -> bool:
+        """ Reopen the connection until the board answers, with an exponential backoff
+
+        Parameters
+        ----------
+        attempts: int
+            maximum number of connection attempts
+        delay: float
+            time to wait in s after the first failed attempt
+        backoff: float
+            factor applied to the delay after each failed attempt
+        max_delay: float
+            maximum time to wait in s between two attempts
+        sleep: callable
+            function waiting for a given duration and returning False if the reconnection should
+            be aborted, for instance TriggerWaiter.sleep. Defaults to time.sleep
+
+        Returns
+        -------
+        bool: True if the connection has been restored
+        """
+        with self.reconnect_lock:
+            for attempt in range(attempts):
+                try:
+                    with self.lock:  # not held while waiting, so that other users are not frozen
+                        self.reopen()
+                        if self.ping():
+                            self.generation += 1
+                            logger.info(f'Reconnected to {self.resource_name} after '
+                                        f'{attempt + 1} attempt(s)')
+                            return True
+                except CONNECTION_ERRORS as e:
+                    logger.warning(f'Reconnection to {self.resource_name} failed: {e}')
+                if attempt < attempts - 1:
+                    if sleep is None:
+                        time.sleep(delay)
+                    elif sleep(delay) is False:
+                        return False
+                    delay = min(delay * backoff, max_delay)
+            return False
+
+
+def create_controller(ip_address: str, port: int) -> SharedRedPitayaScpi:
+    """ Open a SCPI connection to the board at ip_address:port
+
+    If the simulator is enabled in the config, the connection is made to the local simulated board
+    instead.
+    """
+    if Config()('simulator', 'enabled'):
+        ip_address, port = get_simulator().address
+    controller = SharedRedPitayaScpi(ip_address=ip_address, port=port)
+    set_nodelay(controller)
+    return controller
+
+
+class ConnectionRegistry:
+    """ Share a single SCPI connection per board between the plugins
+
+    The SCPI server of the board serves a single client at a time, so the plugins (viewers and
+    actuators) addressing the same board have to share the same connection. Each call to acquire
+    should be balanced by a call to release, the connection being closed by the last release.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._controllers: Dict[Tuple[str, int], SharedRedPitayaScpi] = {}
+        self._counts: Dict[Tuple[str, int], int] = {}
+
+    def acquire(self, ip_address: str, port: int) -> SharedRedPitayaScpi:
+        """ Get the controller of the board at ip_address:port, opening the connection if needed"""
+        key = (ip_address, int(port))
+        with self._lock:
+            if key not in self._controllers:
+                self._controllers[key] = create_controller(ip_address, int(port))
+                self._counts[key] = 0
+            self._counts[key] += 1
+            return self._controllers[key]
+
+    def release(self, controller: SharedRedPitayaScpi):
+        """ Release a controller obtained from acquire, closing its connection if no longer used"""
+        with self._lock:
+            for key, shared in self._controllers.items():
+                if shared is controller:
+                    break
+            else:
+                return
+            self._counts[key] -= 1
+            if self._counts[key] > 0:
+                return
+            del self._controllers[key]
+            del self._counts[key]
+        try:
+            with controller.lock:
+                controller.adapter.close()
+        except Exception as e:
+            logger.warning(f'Error while closing the connection to the Redpitaya {key}: {e}')
+
+    def count(self, ip_address: str, port: int) -> int:
+        """ Number of users of the connection to the board at ip_address:port"""
+        with self._lock:
+            return self._counts.get((ip_address, int(port)), 0)
+
+
+registry = ConnectionRegistry()
+
+
+def acquire_controller(ip_address: str, port: int) -> SharedRedPitayaScpi:
+    """ Get the shared controller of the board at ip_address:port
+
+    See Also
+    --------
+    ConnectionRegistry.acquire
+    """
+    return registry.acquire(ip_address, port)
+
+
+def release_controller(controller: SharedRedPitayaScpi):
+    """ Release a shared controller obtained from acquire_controller
+
+    See Also
+    --------
+    ConnectionRegistry.release
+    """
+    registry.release(controller)
+
+
+class ConnectionKeeper:
+    """ Keep the connection of a plugin to its board alive and its configuration up to date
+
+    Parameters
+    ----------
+    controller: SharedRedPitayaScpi
+    restore: callable
+        function writing the configuration of the plugin to the board, called after a reconnection,
+        including a reconnection made by another user of the controller
+    health_check: float
+        the board is pinged before a communication if nothing has been read from it for more than
+        health_check seconds, 0 to disable
+    attempts: int
+    delay: float
+    max_delay: float
+    sleep: callable
+        see SharedRedPitayaScpi.reconnect
+    """
+
+    def __init__(self, controller: SharedRedPitayaScpi, restore: Callable[[], None],
+                 health_check: float = 5., attempts: int = 5, delay: float = 0.5,
+                 max_delay: float = 10., sleep: Callable[[float], bool] = None):
+        self.controller = controller
+        self.restore = restore
+        self.health_check = health_check
+        self.attempts = attempts
+        self.delay = delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.generation = controller.generation
+
+    def recover(self) -> bool:
+        """ Reconnect to the board, unless already done by another user, and restore the
+        configuration
+
+        Returns
+        -------
+        bool: True if the connection has been restored
+        """
+        with self.controller.reconnect_lock:
+            if self.controller.generation == self.generation and \
+                    not self.controller.reconnect(self.attempts, self.delay,
+                                                  max_delay=self.max_delay, sleep=self.sleep):
+                return False
+        self.generation = self.controller.generation
+        self.restore()
+        return True
+
+    def check(self) -> bool:
+        """ Ping the board if idle and restore the configuration if the connection has been reopened
+
+        Returns
+        -------
+        bool: True if the connection is alive
+        """
+        if self.health_check and self.controller.is_idle(self.health_check) and \
+                not self.controller.ping():
+            return self.recover()
+        if self.controller.generation != self.generation:
+            self.generation = self.controller.generation
+            self.restore()
+        return True
+
+    def call(self, function: Callable, *args, **kwargs):
+        """ Call function, recovering the connection and calling it again once if it failed
+
+        Raises
+        ------
+        ConnectionError: if the connection could not be restored or the second call failed too
+        """
+        if not self.check():
+            raise ConnectionError(f'Lost the connection to {self.controller.resource_name}')
+        try:
+            return function(*args, **kwargs)
+        except CONNECTION_ERRORS as e:
+            logger.warning(f'Communication with {self.controller.resource_name} failed: {e}')
+            if not self.recover():
+                raise ConnectionError(f'Could not reconnect to '
+                                      f'{self.controller.resource_name}') from e
+        try:
+            return function(*args, **kwargs)
+        except CONNECTION_ERRORS as e:
+            raise ConnectionError(f'Communication with {self.controller.resource_name} failed '
+                                  f'again after a reconnection: {e}') from e
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+In-process feedback loop between the fast analog inputs and the fast generator of a board: each
+iteration acquires a frame, reduces it to the measured value, computes the PID output and writes
+it to the generator over the shared controller, without any round trip through the dashboard.
+"""
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from pymodaq_utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_redpitaya.hardware.connection import SharedRedPitayaScpi
+from pymodaq_plugins_redpitaya.hardware.multi_board import BoardAcquisition
+from pymodaq_plugins_redpitaya.hardware.scan_table import AMPLITUDE_LIMITS, OFFSET_LIMITS
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig
+
+logger = set_logger(get_module_name(__file__))
+
+REDUCTIONS = ('mean', 'rms', 'peak to peak', 'max', 'min')
+# generator properties the loop can drive and their SCPI command
+FAST_PID_OUTPUTS = {'offset': 'SOUR{channel:d}:VOLT:OFFS {value:.5f}',
+                    'amplitude': 'SOUR{channel:d}:VOLT {value:.5f}'}
+# and their (min, max) values in V
+FAST_PID_LIMITS = {'offset': OFFSET_LIMITS, 'amplitude': AMPLITUDE_LIMITS}
+
+
+def reduce_frame(frame: np.ndarray, reduction: str = 'mean') -> float:
+    """ Reduce the samples of a frame (last axis) to a single measured value
+
+    Parameters
+    ----------
+    frame: ndarray
+    reduction: str
+        one of REDUCTIONS
+    """
+    if reduction == 'mean':
+        return float(np.mean(frame))
+    elif reduction == 'rms':
+        return float(np.sqrt(np.mean(np.square(frame))))
+    elif reduction == 'peak to peak':
+        return float(np.ptp(frame))
+    elif reduction == 'max':
+        return float(np.max(frame))
+    elif reduction == 'min':
+        return float(np.min(frame))
+    raise ValueError(f'Unknown reduction {reduction!r}, choose in {REDUCTIONS}')
+
+
+class DiscretePID:
+    """ Positional PID controller, the integral term being clamped to the output limits
+
+    The derivative acts on the measurement rather than on the error, so that a setpoint change
+    does not kick the output.
+
+    Parameters
+    ----------
+    kp, ki, kd: float
+        the gains, ki in 1/s and kd in s
+    setpoint: float
+    limits: tuple of float or None
+        (min, max) output limits, None for no limit
+    """
+
+    def __init__(self, kp: float = 1., ki: float = 0., kd: float = 0., setpoint: float = 0.,
+                 limits: Tuple[Optional[float], Optional[float]] = (None, None)):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.setpoint = setpoint
+        self.limits = limits
+        self.integral = 0.
+        self.last_measurement: Optional[float] = None
+
+    def clamp(self, value: float) -> float:
+        low, high = self.limits
+        if low is not None and value < low:
+            return low
+        if high is not None and value > high:
+            return high
+        return value
+
+    def reset(self, output: float = 0.):
+        """ Restart the controller from output, for a bumpless transfer"""
+        self.integral = self.clamp(output)
+        self.last_measurement = None
+
+    def __call__(self, measurement: float, dt: float) -> float:
+        """ The output for measurement, dt (in s) after the previous call"""
+        error = self.setpoint - measurement
+        self.integral = self.clamp(self.integral + self.ki * error * dt)
+        derivative = 0. if self.last_measurement is None or dt <= 0 else \
+            (measurement - self.last_measurement) / dt
+        self.last_measurement = measurement
+        return self.clamp(self.kp * error + self.integral - self.kd * derivative)
+
+
+class FastPIDLoop:
+    """ Feedback loop run on its own thread, from an input channel to a generator property
+
+    Each iteration arms the board, waits for the trigger, reads the input channel, reduces the
+    frame to the measured value and writes the output of the PID to the generator. The loop rate
+    is thus close to the acquisition rate, limited by the frame duration and the SCPI latency.
+    The acquisition settings and the generator are written directly, so the state cached by the
+    plugins of the same board is not updated while the loop runs. Once stopped, the loop records
+    its last output in the generator cache of the controller and invalidates the controller, so
+    that each plugin writes again its own configuration before its next communication, the
+    actuator of the driven channel keeping the output of the loop.
+
+    Parameters
+    ----------
+    controller: SharedRedPitayaScpi
+    config: AcquisitionConfig
+        the acquisition of the input, the first of its channels being the measured one
+    pid: DiscretePID
+    reduction: str
+        one of REDUCTIONS
+    output: str
+        one of FAST_PID_OUTPUTS
+    channel: int
+        the generator channel driven by the loop
+    period: float
+        minimum duration in s of an iteration, 0 to run as fast as possible
+    connection: dict
+        keyword arguments of the ConnectionKeeper of the board
+    """
+
+    def __init__(self, controller: SharedRedPitayaScpi, config: AcquisitionConfig,
+                 pid: DiscretePID, reduction: str = 'mean', output: str = 'offset',
+                 channel: int = 1, period: float = 0., **connection):
+        if output not in FAST_PID_OUTPUTS:
+            raise ValueError(f'Unknown output {output!r}, choose in {tuple(FAST_PID_OUTPUTS)}')
+        reduce_frame(np.zeros(1), reduction)  # validate the reduction before starting
+        self.board = BoardAcquisition(controller, **connection)
+        self.config = config
+        self.pid = pid
+        self.reduction = reduction
+        self.output = output
+        self.channel = channel
+        self.period = period
+        self.frame = np.empty(config.shape)
+        self.measurement = float('nan')
+        self.value = float('nan')  # last value written to the generator
+        self.iterations = 0
+        self.error: Optional[Exception] = None  # the exception that stopped the loop
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.
+        self._stopped: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def rate(self) -> float:
+        """ Mean number of iterations per second of the current or last run"""
+        end = time.perf_counter() if self._stopped is None else self._stopped
+        duration = end - self._started
+        return self.iterations / duration if self._started and duration > 0 else 0.
+
+    def configure(self, level: float = 0., average: bool = True):
+        """ Write the acquisition settings of the input to the board"""
+        self.board.configure(self.config, level, average)
+
+    def write_output(self, value: float):
+        """ Write value, clamped to the limits of the output, to the generator"""
+        low, high = FAST_PID_LIMITS[self.output]
+        value = min(max(value, low), high)
+        self.board.controller.write(
+            FAST_PID_OUTPUTS[self.output].format(channel=self.channel, value=value))
+        self.value = value
+
+    def step(self, dt: float) -> bool:
+        """ Run one iteration: acquire, reduce, compute and write the output
+
+        Returns
+        -------
+        bool: False if the acquisition has been cancelled
+        """
+        if not self.board.connection.check():
+            raise ConnectionError(f'Lost the connection to {self.board.name}')
+        self.board.arm()
+        if not self.board.trigger_waiter.sleep(self.config.wait_time):
+            return False
+        self.board.set_trigger(self.config.trigger_source)
+        if not self.board.read(self.config, self.frame):
+            return False
+        self.measurement = reduce_frame(self.frame[0], self.reduction)
+        self.write_output(self.pid(self.measurement, dt))
+        self.iterations += 1
+        return True
+
+    def run(self):
+        last = time.perf_counter()
+        try:
+            while True:
+                now = time.perf_counter()
+                if not self.step(now - last):
+                    break
+                last = now
+                remaining = self.period - (time.perf_counter() - now)
+                if remaining > 0 and not self.board.trigger_waiter.sleep(remaining):
+                    break
+        except Exception as e:
+            self.error = e
+            logger.exception(f'Fast PID loop stopped: {e}')
+        finally:
+            self._stopped = time.perf_counter()
+
+    def start(self, output: Optional[float] = None):
+        """ Start the loop thread, the PID restarting from output (defaults to its last value)"""
+        if self.running:
+            return
+        if output is None:
+            output = 0. if np.isnan(self.value) else self.value
+        self.pid.reset(output)
+        self.error = None
+        self.iterations = 0
+        self.board.trigger_waiter.reset()
+        self._started = time.perf_counter()
+        self._stopped = None
+        self._thread = threading.Thread(target=self.run, name='redpitaya_fast_pid', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.):
+        """ Stop the loop, interrupting the current acquisition, and wait for its thread
+
+        The configuration cached by the other users of the controller being stale, they are told
+        to restore it, the generator cache of the driven channel being given the last output.
+        """
+        self.board.trigger_waiter.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        controller = self.board.controller
+        try:
+            controller.acquisition_stop()
+        finally:
+            if self.channel in controller.generator_caches and not np.isnan(self.value):
+                controller.generator_caches[self.channel].update(self.output, self.value)
+            controller.invalidate()
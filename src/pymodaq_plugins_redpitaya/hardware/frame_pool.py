@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Reusable frame arrays, so that the emission of a frame does not allocate a new buffer each time.
+"""
+from typing import List, Sequence
+
+import numpy as np
+
+
+class FramePool:
+    """ Pool of preallocated C-contiguous frames handed out in turn
+
+    A frame handed out by get belongs to its caller, then to the consumers of the data emitted
+    from it, until max_size - 1 other frames have been handed out: get always returns the least
+    recently handed out frame. The ownership does not depend on the references the consumers
+    keep, so a consumer holding the data of a frame for longer than the acquisition of max_size - 1
+    other frames should copy it.
+
+    Parameters
+    ----------
+    shape: sequence of int
+        The shape of a frame, for instance (nchannels, nsamples)
+    dtype: numpy dtype
+    max_size: int
+        number of frames in the pool, allocated on their first use
+    """
+
+    def __init__(self, shape: Sequence[int], dtype=np.float32, max_size: int = 8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.max_size = max(max_size, 1)
+        self.frames: List[np.ndarray] = []
+        self.generation = 0  # number of frames handed out
+
+    def get(self) -> np.ndarray:
+        """ Get the least recently handed out frame, its content being undefined"""
+        index = self.generation % self.max_size
+        if index == len(self.frames):
+            self.frames.append(np.empty(self.shape, dtype=self.dtype))
+        self.generation += 1
+        return self.frames[index]
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Concurrent acquisition of several boards: each step of the acquisition sequence is run on all the
+boards at once from a thread pool, so that the duration of an acquisition is about the one of the
+slowest board instead of the sum over the boards.
+"""
+import concurrent.futures
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pymodaq_utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_redpitaya.hardware.connection import (SharedRedPitayaScpi, ConnectionKeeper,
+                                                           CONNECTION_ERRORS)
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import get_channels_data
+from pymodaq_plugins_redpitaya.hardware.settings_cache import ScpiWriteCache, AcquisitionConfig
+from pymodaq_plugins_redpitaya.hardware.trigger import TriggerWaiter
+
+logger = set_logger(get_module_name(__file__))
+
+
+def parse_endpoints(text: str, default_port: int = 5000) -> List[Tuple[str, int]]:
+    """ Parse comma separated 'ip_address[:port]' endpoints
+
+    Raises
+    ------
+    ValueError: if there is no endpoint or a port is not an integer
+    """
+    endpoints = []
+    for item in text.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        ip_address, _, port = item.partition(':')
+        endpoints.append((ip_address.strip(), int(port) if port else default_port))
+    if not endpoints:
+        raise ValueError('No board endpoint given')
+    return endpoints
+
+
+class BoardAcquisition:
+    """ The acquisition sequence of one of the boards of a multi-board acquisition
+
+    Parameters
+    ----------
+    controller: SharedRedPitayaScpi
+    connection: dict
+        keyword arguments of the ConnectionKeeper of the board, see the connection section of the
+        config
+    """
+
+    def __init__(self, controller: SharedRedPitayaScpi, **connection):
+        self.controller = controller
+        self.acq_settings = ScpiWriteCache(controller)
+        self.trigger_waiter = TriggerWaiter(controller)
+        self.connection = ConnectionKeeper(controller, self.restore_configuration,
+                                           sleep=self.trigger_waiter.sleep, **connection)
+        self.buffer_length = controller.buffer_length
+
+    @property
+    def name(self) -> str:
+        return self.controller.resource_name
+
+    def restore_configuration(self):
+        """ Write again the acquisition configuration after a reconnection"""
+        self.controller.acquisition_reset()
+        self.acq_settings.replay()
+
+    def configure(self, config: AcquisitionConfig, level: float, average: bool):
+        """ Write the acquisition settings that changed, the trigger delay included"""
+        self.acq_settings.set('acq_format', config.acq_format)
+        self.acq_settings.set('acq_units', 'VOLTS')
+        self.acq_settings.set('acq_trigger_level', level)
+        self.acq_settings.set('decimation', config.decimation)
+        self.acq_settings.set('average_skipped_samples', average)
+        self.acq_settings.set('acq_trigger_delay_samples', config.trigger_delay(self.buffer_length))
+
+    def arm(self):
+        self.controller.acquisition_start()
+
+    def set_trigger(self, source: str):
+        # not cached: setting the source arms the trigger, the board disables it once fired
+        self.controller.acq_trigger_source = source
+
+    def read(self, config: AcquisitionConfig, out: np.ndarray) -> bool:
+        """ Wait for the trigger and the buffer filling, then read the enabled channels into out
+
+        Returns
+        -------
+        bool: False if the wait has been cancelled
+
+        Raises
+        ------
+        TriggerTimeout if the acquisition did not complete within the timeout of config
+        """
+        if not self.trigger_waiter.wait(config.wait_time, config.timeout):
+            return False
+        with self.controller.lock:
+            get_channels_data(self.controller, config.channels, config.nsamples,
+                              config.acq_format, out=out)
+        return True
+
+    def stop(self):
+        self.trigger_waiter.cancel()
+        self.controller.acquisition_stop()
+
+
+class MultiBoardAcquisition:
+    """ Synchronous acquisition of several boards, each step being run on all of them concurrently
+
+    All the boards are armed, then all their triggers are set, before waiting for any of them, so
+    that a trigger shared by the boards (external trigger or daisy chain) is caught by all of
+    them. Each frame being read relative to the trigger of its board, the frames of the boards are
+    then aligned on the trigger.
+
+    Parameters
+    ----------
+    boards: sequence of BoardAcquisition
+    """
+
+    def __init__(self, boards: Sequence[BoardAcquisition]):
+        self.boards = list(boards)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.boards),
+                                           thread_name_prefix='redpitaya_board')
+
+    def __len__(self):
+        return len(self.boards)
+
+    def run(self, function: Callable, *args) -> list:
+        """ Call function(board, *args) for all the boards concurrently
+
+        Returns
+        -------
+        list: the results in the order of the boards
+
+        See Also
+        --------
+        wait
+        """
+        return self.wait([self.executor.submit(function, board, *args) for board in self.boards])
+
+    def wait(self, futures: List[Future]) -> list:
+        """ Wait for the calls made on the boards and get their results
+
+        If one of them fails, the waits of the others are cancelled
+
+        Raises
+        ------
+        the first exception raised by one of the calls, once all of them returned
+        """
+        done, pending = concurrent.futures.wait(futures, return_when=FIRST_EXCEPTION)
+        if pending:
+            self.cancel()
+            concurrent.futures.wait(pending)
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+        return [future.result() for future in futures]
+
+    def reset(self):
+        """ Clear a previous cancellation, to be called before a new acquisition"""
+        for board in self.boards:
+            board.trigger_waiter.reset()
+
+    def cancel(self):
+        """ Interrupt the current waits of all the boards, thread safe"""
+        for board in self.boards:
+            board.trigger_waiter.cancel()
+
+    def configure(self, config: AcquisitionConfig, level: float, average: bool):
+        self.run(BoardAcquisition.configure, config, level, average)
+
+    def _acquire(self, config: AcquisitionConfig, out: np.ndarray) -> bool:
+        self.run(BoardAcquisition.arm)
+        if not self.boards[0].trigger_waiter.sleep(config.wait_time):  # pretrigger samples
+            return False
+        self.run(BoardAcquisition.set_trigger, config.trigger_source)
+        return all(self.wait([self.executor.submit(board.read, config, frame)
+                              for board, frame in zip(self.boards, out)]))
+
+    def acquire(self, config: AcquisitionConfig, out: Optional[np.ndarray] = None) -> \
+            Optional[np.ndarray]:
+        """ Acquire a frame on each board, the acquisition being done again once if the
+        communication with a board failed and could be restored
+
+        Parameters
+        ----------
+        config: AcquisitionConfig
+        out: ndarray
+            optional array of shape (len(self), len(config.channels), nsamples) to be filled
+
+        Returns
+        -------
+        ndarray: the frames of the boards, None if cancelled
+
+        Raises
+        ------
+        ConnectionError if the connection to a board could not be restored or the acquisition
+        failed again
+        TriggerTimeout if a board did not complete its acquisition in time
+        """
+        if out is None:
+            out = np.empty((len(self),) + config.shape)
+        self.run(self.check_connection)
+        try:
+            return out if self._acquire(config, out) else None
+        except CONNECTION_ERRORS as e:
+            logger.warning(f'Multi-board acquisition failed: {e}')
+            self.reset()
+            self.run(self.check_connection, True)
+        try:
+            return out if self._acquire(config, out) else None
+        except CONNECTION_ERRORS as e:
+            raise ConnectionError(f'Multi-board acquisition failed again after a reconnection: '
+                                  f'{e}') from e
+
+    @staticmethod
+    def check_connection(board: BoardAcquisition, ping: bool = False):
+        """ Check the connection of board, pinging it if asked, and restore it if needed
+
+        Raises
+        ------
+        ConnectionError if the connection could not be restored
+        """
+        if ping and not board.controller.ping():
+            alive = board.connection.recover()
+        else:
+            alive = board.connection.check()
+        if not alive:
+            raise ConnectionError(f'Lost the connection to {board.name}')
+
+    def stop(self):
+        self.cancel()
+        self.run(BoardAcquisition.stop)
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=True)
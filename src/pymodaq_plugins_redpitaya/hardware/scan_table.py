@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Tables of generator targets stepped through by index, so that a scan writes each point with the
+minimum of SCPI commands instead of a full move and read back cycle per point.
+"""
+from pathlib import Path
+from typing import Tuple, Union
+
+import numpy as np
+
+from pymodaq_plugins_redpitaya.processing import frequency_grid
+
+# output limits of the fast generator channels, as validated by the pymeasure driver if its
+# version has the analog outputs, the ones of the STEMlab 125-14 otherwise
+try:
+    from pymeasure.instruments.redpitaya.redpitaya_scpi import AnalogOutputFastChannel
+    FREQUENCY_LIMITS = tuple(AnalogOutputFastChannel.FREQUENCIES)  # in Hz
+    AMPLITUDE_LIMITS = tuple(AnalogOutputFastChannel.AMPLITUDES)  # in V, the offset included
+    OFFSET_LIMITS = tuple(AnalogOutputFastChannel.OFFSETS)  # in V
+except ImportError:
+    FREQUENCY_LIMITS = (1e-6, 50e6)
+    AMPLITUDE_LIMITS = (0., 1.)
+    OFFSET_LIMITS = (-1., 1.)
+
+
+class ScanTable:
+    """ Precomputed (frequency, amplitude) targets of a generator channel, validated at once
+
+    Parameters
+    ----------
+    frequencies: array like
+        in Hz
+    amplitudes: array like
+        in V, broadcast against frequencies
+    offset: float
+        The offset in V of the generator output, adding to the amplitudes
+
+    Raises
+    ------
+    ValueError: if the table is empty or some targets are out of the generator limits
+    """
+
+    def __init__(self, frequencies, amplitudes, offset: float = 0.):
+        frequencies, amplitudes = np.broadcast_arrays(np.asarray(frequencies, dtype=np.float64),
+                                                      np.asarray(amplitudes, dtype=np.float64))
+        self.targets = np.stack((frequencies.ravel(), amplitudes.ravel()), axis=-1)
+        self.targets.flags.writeable = False
+        if len(self) == 0:
+            raise ValueError('The scan table is empty')
+        invalid = ~np.isfinite(self.targets).all(axis=-1) | \
+            (self.frequencies < FREQUENCY_LIMITS[0]) | (self.frequencies > FREQUENCY_LIMITS[1]) | \
+            (self.amplitudes < AMPLITUDE_LIMITS[0]) | \
+            (self.amplitudes + abs(offset) > AMPLITUDE_LIMITS[1])
+        if invalid.any():
+            index = int(np.argmax(invalid))
+            raise ValueError(f'{np.count_nonzero(invalid)} targets of the scan table are out of the '
+                             f'generator limits, the first one at index {index}: '
+                             f'{self.frequencies[index]} Hz, {self.amplitudes[index]} V with an '
+                             f'offset of {offset} V')
+
+    def __len__(self):
+        return self.targets.shape[0]
+
+    def __getitem__(self, index: int) -> Tuple[float, float]:
+        """ The (frequency, amplitude) target of index as python floats"""
+        frequency, amplitude = self.targets[index]
+        return float(frequency), float(amplitude)
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return self.targets[:, 0]
+
+    @property
+    def amplitudes(self) -> np.ndarray:
+        return self.targets[:, 1]
+
+    @classmethod
+    def from_grid(cls, start: float, stop: float, npts: int, mode: str = 'LINEAR',
+                  amplitude_start: float = 0.1, amplitude_stop: float = 0.1,
+                  offset: float = 0.) -> 'ScanTable':
+        """ Table of npts frequencies from start to stop, log spaced if mode is 'LOG', the amplitude
+        varying linearly from amplitude_start to amplitude_stop"""
+        frequencies = frequency_grid(start, stop, npts, mode)
+        if stop < start:
+            frequencies = frequencies[::-1]
+        return cls(frequencies, np.linspace(amplitude_start, amplitude_stop, npts), offset)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], offset: float = 0.) -> 'ScanTable':
+        """ Table read from a text file of comma separated frequency (Hz), amplitude (V) rows
+
+        Lines starting with # are ignored
+        """
+        targets = np.loadtxt(path, delimiter=',', ndmin=2, usecols=(0, 1))
+        return cls(targets[:, 0], targets[:, 1], offset)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Low level readout of the fast analog inputs buffer through the SCPI server.
+
+The pymeasure driver parses the data returned by ``ACQ:SOUR<n>:DATA...?`` from a string
+(ASCII format). The functions below also handle the binary block (BIN format) directly into a
+numpy array, without any string conversion.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+
+ACQ_FORMATS = ('BIN', 'ASCII')
+
+# dtype of the binary block returned by the board depending on the acquisition units
+BIN_DTYPES = {'VOLTS': np.dtype('>f4'),
+              'RAW': np.dtype('>i2')}
+
+TERMINATION = '\r\n'
+TERMINATION_LENGTH = len(TERMINATION)  # the binary block is followed by the '\r\n' termination
+
+
+def request_data(controller: RedPitayaScpi, channel: int, npts: int):
+    """ Send the query for the npts oldest points of the given fast analog input channel
+
+    The answer has to be read afterwards using read_data
+    """
+    controller.write(f'ACQ:SOUR{channel:d}:DATA:OLD:N? {npts:d}')
+
+
+def read_ascii(controller: RedPitayaScpi, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Read a buffer answer formatted as '{v1,v2,...}'
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    out: ndarray
+        optional 1D array in which the data will be written
+
+    Returns
+    -------
+    ndarray: the read data (out if specified)
+    """
+    data = np.fromstring(controller.read().strip('{}'), sep=',')
+    if out is None:
+        return data
+    out[:] = data
+    return out
+
+
+def read_binary(controller: RedPitayaScpi, out: Optional[np.ndarray] = None,
+                units: str = 'VOLTS') -> np.ndarray:
+    """ Read a buffer answer formatted as a SCPI definite length binary block: #<n><length><data>
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    out: ndarray
+        optional 1D array in which the data will be written (cast to its dtype)
+    units: str
+        the acquisition units, either 'VOLTS' (float32 data) or 'RAW' (int16 data)
+
+    Returns
+    -------
+    ndarray: the read data (out if specified)
+    """
+    header = controller.read_bytes(2)
+    if header[:1] != b'#':
+        raise IOError(f'Invalid binary block header from the Redpitaya: {header}')
+    length = int(controller.read_bytes(int(header[1:2])))
+    payload = controller.read_bytes(length + TERMINATION_LENGTH)
+    data = np.frombuffer(payload, dtype=BIN_DTYPES[units], count=length // BIN_DTYPES[units].itemsize)
+    if out is None:
+        return data.astype(np.float64)
+    out[:] = data
+    return out
+
+
+def read_data(controller: RedPitayaScpi, acq_format: str = 'BIN',
+              out: Optional[np.ndarray] = None, units: str = 'VOLTS') -> np.ndarray:
+    """ Read the answer of a previous request_data depending on the acquisition format"""
+    if acq_format == 'BIN':
+        return read_binary(controller, out=out, units=units)
+    else:
+        return read_ascii(controller, out=out)
+
+
+def get_channel_data(controller: RedPitayaScpi, channel: int, npts: int, acq_format: str = 'BIN',
+                     out: Optional[np.ndarray] = None, units: str = 'VOLTS') -> np.ndarray:
+    """ Request and read the npts oldest points of a fast analog input channel
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    channel: int
+        the fast analog input channel, 1 or 2
+    npts: int
+        The number of points to read
+    acq_format: str
+        The acquisition format the board has been set to, one of ACQ_FORMATS
+    out: ndarray
+        optional 1D array in which the data will be written
+    units: str
+        the acquisition units, either 'VOLTS' or 'RAW'
+
+    Returns
+    -------
+    ndarray: the read data
+    """
+    request_data(controller, channel, npts)
+    return read_data(controller, acq_format, out=out, units=units)
+
+
+def get_channels_data(controller: RedPitayaScpi, channels: Sequence[int], npts: int,
+                      acq_format: str = 'BIN', out: Optional[np.ndarray] = None,
+                      units: str = 'VOLTS') -> np.ndarray:
+    """ Request and read several fast analog input channels in a single pipelined exchange
+
+    All the queries are sent at once, then the answers are read in order, so that only one
+    request/response round trip is paid whatever the number of channels.
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    channels: sequence of int
+        the fast analog input channels to read, for instance (1, 2)
+    npts: int
+        The number of points to read per channel
+    acq_format: str
+        The acquisition format the board has been set to, one of ACQ_FORMATS
+    out: ndarray
+        optional array of shape (len(channels), npts) in which the data will be written
+    units: str
+        the acquisition units, either 'VOLTS' or 'RAW'
+
+    Returns
+    -------
+    ndarray: the read data with shape (len(channels), npts)
+    """
+    if out is None:
+        out = np.empty((len(channels), npts))
+    controller.write(TERMINATION.join([f'ACQ:SOUR{channel:d}:DATA:OLD:N? {npts:d}'
+                                       for channel in channels]))
+    for ind in range(len(channels)):
+        read_data(controller, acq_format, out=out[ind], units=units)
+    return out
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Caches avoiding to query or write again the board configuration that did not change.
+"""
+from typing import Any, Dict, List, Optional
+
+from pymodaq_data import Axis
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+
+class ScpiWriteCache:
+    """ Write the properties of a pymeasure instrument (or channel) only when their value changed
+
+    The cache has to be invalidated when the board configuration is modified by other means, for
+    instance after a reset.
+
+    Parameters
+    ----------
+    target: object
+        the instrument or channel whose properties are written, for instance a RedPitayaScpi
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.values: Dict[str, Any] = {}
+
+    def set(self, name: str, value: Any) -> bool:
+        """ Write value to the property name if different from the last written one
+
+        Returns
+        -------
+        bool: True if the value has been written
+        """
+        if name in self.values and self.values[name] == value:
+            return False
+        setattr(self.target, name, value)
+        self.values[name] = value
+        return True
+
+    def update(self, name: str, value: Any):
+        """ Record value as the one of the property name, written to the target by other means"""
+        self.values[name] = value
+
+    def invalidate(self, name: Optional[str] = None):
+        """ Forget the last written value of name, or of all properties if None"""
+        if name is None:
+            self.values = {}
+        else:
+            self.values.pop(name, None)
+
+    def replay(self):
+        """ Write again all the cached values, in the order they were first written"""
+        for name, value in self.values.items():
+            setattr(self.target, name, value)
+
+
+class AcquisitionConfig:
+    """ Snapshot of the acquisition settings and of the quantities derived from them
+
+    Built once when the settings change, so that the acquisition of each frame does not have to
+    read the parameter tree nor recompute the time axis.
+
+    Parameters
+    ----------
+    nsamples: int
+    decimation: int
+    channels: list of int
+        the enabled fast analog inputs
+    acq_format: str
+        'BIN' or 'ASCII'
+    trigger_source: str
+    center_trigger: bool
+    timeout: float
+        maximum time to wait for an acquisition in s, 0 means no timeout
+    clock: float
+        The board clock in Hz
+    nsegments: int
+        number of segments of nsamples samples of a segmented acquisition, 1 otherwise
+    period: int
+        number of samples between the starts of two segments, defaults to nsamples
+    """
+
+    def __init__(self, nsamples: int, decimation: int, channels: List[int], acq_format: str,
+                 trigger_source: str, center_trigger: bool, timeout: float,
+                 clock: float = RedPitayaScpi.CLOCK, nsegments: int = 1,
+                 period: Optional[int] = None):
+        self.nsamples = nsamples
+        self.decimation = decimation
+        self.channels = list(channels)
+        self.acq_format = acq_format
+        self.trigger_source = trigger_source
+        self.center_trigger = center_trigger
+        self.timeout = timeout
+        self.clock = clock
+        self.nsegments = nsegments
+        self.period = nsamples if period is None else period
+
+        self.sampling_period = decimation / clock
+        self.wait_time = nsamples * self.sampling_period
+        # the whole record read from the board, holding all the segments
+        self.record_length = (nsegments - 1) * self.period + nsamples
+        self.record_shape = (len(self.channels), self.record_length)
+        # start of the (first) frame relative to the trigger, the whole record being centred
+        self.offset = -self.record_length * self.sampling_period / 2 if center_trigger else 0.
+        self.shape = (len(self.channels), nsamples)
+        self.labels = [f'IN{channel}' for channel in self.channels]
+        self.time_axis = self.get_time_axis()
+
+    @property
+    def segmented(self) -> bool:
+        return self.nsegments > 1
+
+    def trigger_delay(self, buffer_length: int) -> int:
+        """ The trigger delay in samples placing the trigger at the centre of the record if asked,
+        at its start otherwise"""
+        delay = buffer_length // 2
+        if self.center_trigger:
+            delay -= self.record_length // 2
+        return delay
+
+    def get_time_axis(self, index: int = 0) -> Axis:
+        return Axis('time', units='s', offset=self.offset, scaling=self.sampling_period,
+                    size=self.nsamples, index=index)
+
+    def get_segment_axis(self, index: int = 0) -> Axis:
+        """ The start times of the segments relative to the first one"""
+        return Axis('segments', units='s', offset=0., scaling=self.period * self.sampling_period,
+                    size=self.nsegments, index=index)
@@ -0,0 +1,405 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Local SCPI server simulating a Redpitaya board, to run the plugins, tests and benchmarks without
+hardware.
+
+The simulator answers the acquisition and generator commands used by the plugins, arbitrary
+waveform uploads included, in ASCII or as a binary block. The fast analog inputs return synthetic
+waveforms: either a fixed sine, the signal of the first generator output (as if OUT1 was wired to
+the input), the same signal through a first order low pass filter, or noise only. The latency per command and the bandwidth of the link can be configured.
+
+usage: python -m pymodaq_plugins_redpitaya.hardware.simulator [--port 5000] [--latency 0.001]
+"""
+import argparse
+import re
+import socketserver
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from pymodaq_plugins_redpitaya.utils import Config
+
+INPUT_WAVEFORMS = ('sine', 'loopback', 'filtered', 'noise')
+RAW_SCALING = 8192  # ADC counts per volt in RAW units
+
+GENERATOR_DEFAULTS = {'OUTPUT:STATE': 'OFF', 'FUNC': 'SINE', 'VOLT': '1.0', 'VOLT:OFFS': '0.0',
+                      'PHAS': '0.0', 'FREQ:FIX': '1000.0', 'DCYC': '0.5', 'TRIG:SOUR': 'INT',
+                      'SWEEP:STATE': 'OFF', 'SWEEP:MODE': 'LINEAR', 'SWEEP:FREQ:START': '1000.0',
+                      'SWEEP:FREQ:STOP': '10000.0', 'SWEEP:TIME': '1000000', 'SWEEP:DIR': 'NORMAL'}
+
+_GENERATOR_COMMAND = re.compile(r'^(SOUR|OUTPUT)([12]):(\S+?)(\?)?(?:\s+(.*))?$')
+_BLOCK_COMMAND = re.compile(rb'^\S+ #[1-9]')  # command followed by a definite length binary block
+
+
+class SimulatedBoard:
+    """ State of a simulated board and answers to the SCPI commands
+
+    Parameters
+    ----------
+    inputs: tuple of str
+        the waveforms of IN1 and IN2, each one of INPUT_WAVEFORMS
+    frequency: float
+        frequency in Hz of the 'sine' waveform
+    amplitude: float
+        amplitude in V of the 'sine' waveform
+    cutoff: float
+        cutoff frequency in Hz of the low pass filter of the 'filtered' waveform
+    noise: float
+        standard deviation in V of the noise added to the inputs
+    """
+    CLOCK = 125e6
+    BUFFER_LENGTH = 16384
+
+    def __init__(self, inputs: Tuple[str, str] = ('loopback', 'filtered'), frequency: float = 1e3,
+                 amplitude: float = 0.5, cutoff: float = 1e4, noise: float = 0.01):
+        for waveform in inputs:
+            if waveform not in INPUT_WAVEFORMS:
+                raise ValueError(f'Unknown input waveform {waveform}, choose in {INPUT_WAVEFORMS}')
+        self.inputs = tuple(inputs)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self.cutoff = cutoff
+        self.noise = noise
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng()
+        self.reset_acquisition()
+        self.reset_generator()
+
+    def reset_acquisition(self):
+        self.decimation = 1
+        self.average = 'OFF'
+        self.units = 'VOLTS'
+        self.acq_format = 'ASCII'
+        self.trigger_level = 0.
+        self.trigger_delay = 0
+        self.running = False
+        self.trigger_time: Optional[float] = None
+
+    def reset_generator(self):
+        self.generator: Dict[int, Dict[str, str]] = {ch: dict(GENERATOR_DEFAULTS) for ch in (1, 2)}
+        # arbitrary waveform table of each channel
+        self.arbitrary: Dict[int, np.ndarray] = {ch: np.zeros((1,)) for ch in (1, 2)}
+
+    @property
+    def sampling_period(self) -> float:
+        return self.decimation / self.CLOCK
+
+    @property
+    def fill_time(self) -> float:
+        """ Time in s to fill the buffer after the trigger"""
+        return (self.BUFFER_LENGTH / 2 + self.trigger_delay) * self.sampling_period
+
+    def trigger_fired(self) -> bool:
+        return self.trigger_time is not None
+
+    def buffer_filled(self) -> bool:
+        return self.trigger_fired() and time.perf_counter() - self.trigger_time >= self.fill_time
+
+    def arm(self, source: str):
+        """ Arm the trigger, any source other than DISABLED fires immediately in the simulation"""
+        if source == 'DISABLED' or not self.running:
+            return
+        self.trigger_time = time.perf_counter()
+
+    def time_axis(self, npts: int) -> np.ndarray:
+        """ Times relative to the trigger of the npts oldest samples of the buffer"""
+        return (self.trigger_delay - self.BUFFER_LENGTH / 2 + np.arange(npts)) * self.sampling_period
+
+    def generator_phase(self, channel: int, time_axis: np.ndarray) -> np.ndarray:
+        """ Phase in rad of the generator of channel, sweeping from the trigger if enabled"""
+        state = self.generator[channel]
+        phase = np.deg2rad(float(state['PHAS']))
+        if state['SWEEP:STATE'] != 'ON':
+            return 2 * np.pi * float(state['FREQ:FIX']) * time_axis + phase
+        start = float(state['SWEEP:FREQ:START'])
+        stop = float(state['SWEEP:FREQ:STOP'])
+        duration = float(state['SWEEP:TIME']) * 1e-6
+        sweep_time = np.clip(time_axis, 0., duration)
+        if state['SWEEP:MODE'] == 'LOG' and start > 0 and stop != start:
+            ratio = np.log(stop / start)
+            sweep_phase = start * duration / ratio * np.expm1(ratio * sweep_time / duration)
+        else:
+            sweep_phase = start * sweep_time + (stop - start) * sweep_time ** 2 / (2 * duration)
+        sweep_phase = sweep_phase + start * np.minimum(time_axis, 0.) + \
+            stop * np.maximum(time_axis - duration, 0.)
+        return 2 * np.pi * sweep_phase + phase
+
+    def generator_output(self, channel: int, time_axis: np.ndarray) -> np.ndarray:
+        """ Signal in V of the generator output channel at the given times"""
+        state = self.generator[channel]
+        if state['OUTPUT:STATE'] != 'ON':
+            return np.zeros(time_axis.shape)
+        shape = state['FUNC']
+        cycle = (self.generator_phase(channel, time_axis) / (2 * np.pi)) % 1.
+        if shape == 'SINE':
+            wave = np.sin(2 * np.pi * cycle)
+        elif shape == 'SQUARE':
+            wave = np.where(cycle < 0.5, 1., -1.)
+        elif shape == 'TRIANGLE':
+            wave = 1 - 4 * np.abs(cycle - 0.5)
+        elif shape == 'SAWU':
+            wave = 2 * cycle - 1
+        elif shape == 'SAWD':
+            wave = 1 - 2 * cycle
+        elif shape == 'PWM':
+            wave = np.where(cycle < float(state['DCYC']), 1., -1.)
+        elif shape == 'ARBITRARY':
+            table = self.arbitrary[channel]
+            wave = table[(cycle * table.size).astype(int) % table.size]
+        elif shape == 'DC_NEG':
+            wave = -np.ones(time_axis.shape)
+        else:
+            wave = np.ones(time_axis.shape)
+        return float(state['VOLT']) * wave + float(state['VOLT:OFFS'])
+
+    def low_pass(self, signal: np.ndarray) -> np.ndarray:
+        """ First order low pass filter of the signal, applied in the Fourier domain"""
+        frequencies = np.fft.rfftfreq(signal.size, self.sampling_period)
+        return np.fft.irfft(np.fft.rfft(signal) / (1 + 1j * frequencies / self.cutoff),
+                            n=signal.size)
+
+    def input_signal(self, channel: int, npts: int) -> np.ndarray:
+        """ Signal in V of the fast analog input channel for the npts oldest samples"""
+        time_axis = self.time_axis(npts)
+        waveform = self.inputs[channel - 1]
+        if waveform == 'sine':
+            signal = self.amplitude * np.sin(2 * np.pi * self.frequency * time_axis)
+        elif waveform == 'noise':
+            signal = np.zeros((npts,))
+        else:
+            signal = self.generator_output(1, time_axis)
+            if waveform == 'filtered':
+                signal = self.low_pass(signal)
+        if self.noise:
+            signal = signal + self.rng.normal(0., self.noise, npts)
+        return signal
+
+    def get_data(self, channel: int, npts: int) -> bytes:
+        """ The buffer data of channel as sent by the board, in the current format and units"""
+        signal = self.input_signal(channel, min(npts, self.BUFFER_LENGTH))
+        if self.units == 'RAW':
+            data = np.clip(np.round(signal * RAW_SCALING), -RAW_SCALING, RAW_SCALING - 1)
+            data = data.astype('>i2')
+        else:
+            data = signal.astype('>f4')
+        if self.acq_format == 'BIN':
+            payload = data.tobytes()
+            length = str(len(payload)).encode()
+            return b'#' + str(len(length)).encode() + length + payload
+        if self.units == 'RAW':
+            return ('{' + ','.join(str(value) for value in data) + '}').encode()
+        return ('{' + ','.join(f'{value:.6f}' for value in data) + '}').encode()
+
+    def handle(self, command: str) -> Optional[bytes]:
+        """ Apply a SCPI command and get its answer, None if the command has no answer"""
+        with self.lock:
+            return self._handle(command.strip())
+
+    def handle_block(self, command: str, payload: bytes):
+        """ Apply a command whose argument is a binary block, the arbitrary waveform tables being
+        sent as big endian float32"""
+        match = re.match(r'^SOUR([12]):TRAC:DATA:DATA$', command, re.IGNORECASE)
+        if match is not None:
+            with self.lock:
+                self.arbitrary[int(match.group(1))] = np.frombuffer(payload, dtype='>f4').astype(
+                    np.float64)
+
+    def _handle(self, command: str) -> Optional[bytes]:
+        name, _, argument = command.partition(' ')
+        name = name.upper()
+        argument = argument.strip()
+
+        if name == '*IDN?':
+            return b'REDPITAYA,INSTR2020,0,SIMULATOR'
+        elif name == 'SYST:BRD:NAME?':
+            return b'STEMlab 125-14 simulator'
+        elif name == 'ACQ:START':
+            self.running = True
+            self.trigger_time = None
+        elif name == 'ACQ:STOP':
+            self.running = False
+        elif name == 'ACQ:RST':
+            self.reset_acquisition()
+        elif name == 'ACQ:DEC':
+            self.decimation = int(argument)
+        elif name == 'ACQ:DEC?':
+            return str(self.decimation).encode()
+        elif name == 'ACQ:AVG':
+            self.average = argument.upper()
+        elif name == 'ACQ:AVG?':
+            return self.average.encode()
+        elif name == 'ACQ:DATA:UNITS':
+            self.units = argument.upper()
+        elif name == 'ACQ:DATA:UNITS?':
+            return self.units.encode()
+        elif name == 'ACQ:DATA:FORMAT':
+            self.acq_format = argument.upper()
+        elif name == 'ACQ:BUF:SIZE?':
+            return str(self.BUFFER_LENGTH).encode()
+        elif name == 'ACQ:TRIG':
+            self.arm(argument.upper())
+        elif name == 'ACQ:TRIG:STAT?':
+            return b'TD' if self.trigger_fired() else b'WAIT'
+        elif name == 'ACQ:TRIG:FILL?':
+            return b'1' if self.buffer_filled() else b'0'
+        elif name == 'ACQ:TRIG:DLY':
+            self.trigger_delay = int(float(argument))
+        elif name == 'ACQ:TRIG:DLY?':
+            return str(self.trigger_delay).encode()
+        elif name == 'ACQ:TRIG:LEV':
+            self.trigger_level = float(argument)
+        elif name == 'ACQ:TRIG:LEV?':
+            return f'{self.trigger_level:f}'.encode()
+        elif name == 'ACQ:TPOS?':
+            return str(self.BUFFER_LENGTH // 2).encode()
+        elif re.match(r'^ACQ:SOUR[12]:DATA:OLD:N\?$', name):
+            return self.get_data(int(name[8]), int(float(argument)))
+        elif re.match(r'^ACQ:SOUR[12]:DATA\?$', name):
+            return self.get_data(int(name[8]), self.BUFFER_LENGTH)
+        elif name == 'GEN:RST':
+            self.reset_generator()
+        else:
+            return self._handle_generator(command)
+        return None
+
+    def _handle_generator(self, command: str) -> Optional[bytes]:
+        match = _GENERATOR_COMMAND.match(command)
+        if match is None:
+            return None
+        prefix, channel, key, query, argument = match.groups()
+        channel = int(channel)
+        key = key.upper()
+        if prefix.upper() == 'OUTPUT':
+            key = 'OUTPUT:' + key
+        if key == 'TRIG:INT':  # the simulated sweeps start at the acquisition trigger
+            return None
+        if key == 'TRAC:DATA:DATA':
+            if query:
+                return ('{' + ','.join(f'{value:.5f}' for value in self.arbitrary[channel]) +
+                        '}').encode()
+            self.arbitrary[channel] = np.fromstring(argument, sep=',')
+            return None
+        if query:
+            return self.generator[channel].get(key, '0').encode()
+        if argument is not None:
+            self.generator[channel][key] = argument.strip().upper()
+        return None
+
+
+class SimulatorHandler(socketserver.StreamRequestHandler):
+    """ Serve the SCPI commands of a client, one per line, or followed by a binary block"""
+    disable_nagle_algorithm = True
+
+    def read_block(self, line: bytes) -> Tuple[str, bytes]:
+        """ Split a command whose argument is a definite length binary block, reading the rest of
+        the block if it holds newlines"""
+        command, _, block = line.partition(b' #')
+        start = 1 + int(block[:1])
+        length = int(block[1:start])
+        missing = start + length + 2 - len(block)  # the block is followed by '\r\n'
+        if missing > 0:
+            block += self.rfile.read(missing)
+        return command.decode().strip(), block[start:start + length]
+
+    def handle(self):
+        for line in self.rfile:
+            if _BLOCK_COMMAND.match(line):
+                self.server.board.handle_block(*self.read_block(line))
+                continue
+            command = line.decode().strip()
+            if not command:
+                continue
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            answer = self.server.board.handle(command)
+            if answer is not None:
+                if self.server.bandwidth:
+                    time.sleep(len(answer) / self.server.bandwidth)
+                self.wfile.write(answer + b'\r\n')
+
+
+class RedPitayaSimulator(socketserver.ThreadingTCPServer):
+    """ Local SCPI server simulating a Redpitaya board
+
+    Parameters
+    ----------
+    host: str
+    port: int
+        0 to pick a free port
+    latency: float
+        time in s to process each command
+    bandwidth: float
+        throughput in bytes/s of the answers, 0 for no limitation
+    board_options:
+        see SimulatedBoard
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.,
+                 bandwidth: float = 0., **board_options):
+        super().__init__((host, port), SimulatorHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.board = SimulatedBoard(**board_options)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[:2]
+
+    def start(self) -> 'RedPitayaSimulator':
+        """ Serve the clients from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+_simulator: Optional[RedPitayaSimulator] = None
+_simulator_lock = threading.Lock()
+
+
+def get_simulator() -> RedPitayaSimulator:
+    """ Get the simulator configured from the [simulator] section of the config, started once"""
+    global _simulator
+    with _simulator_lock:
+        if _simulator is None:
+            config = Config()
+            _simulator = RedPitayaSimulator(
+                port=config('simulator', 'port'), latency=config('simulator', 'latency'),
+                bandwidth=config('simulator', 'bandwidth') * 1e6,
+                inputs=(config('simulator', 'in1'), config('simulator', 'in2')),
+                frequency=config('simulator', 'frequency'),
+                amplitude=config('simulator', 'amplitude'),
+                cutoff=config('simulator', 'cutoff'), noise=config('simulator', 'noise')).start()
+        return _simulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0., help='latency per command in s')
+    parser.add_argument('--bandwidth', type=float, default=0., help='bandwidth in MB/s, 0: unlimited')
+    parser.add_argument('--in1', choices=INPUT_WAVEFORMS, default='loopback')
+    parser.add_argument('--in2', choices=INPUT_WAVEFORMS, default='filtered')
+    args = parser.parse_args()
+    server = RedPitayaSimulator(args.host, args.port, latency=args.latency,
+                                bandwidth=args.bandwidth * 1e6, inputs=(args.in1, args.in2))
+    print(f'Redpitaya simulator listening on {args.host}:{server.address[1]}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
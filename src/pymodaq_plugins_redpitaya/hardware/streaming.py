@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Continuous acquisition: a background thread keeps arming the board and reading the buffer into
+a ring of preallocated frames, while the consumer publishes the latest frame or the batch of
+frames acquired since its last call.
+"""
+import threading
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    """ Fixed size ring of preallocated numpy frames shared by one producer and one consumer
+
+    The producer fills the array returned by write_slot in place then calls commit. A frame that
+    has been acquired but is never returned to the consumer (overwritten because the consumer was
+    too slow, or skipped when only the latest frame is published) is counted as dropped.
+
+    Parameters
+    ----------
+    depth: int
+        The number of frames in the ring (at least 2)
+    shape: sequence of int
+        The shape of a single frame, for instance (nchannels, nsamples)
+    dtype: numpy dtype
+    """
+
+    def __init__(self, depth: int, shape: Sequence[int], dtype=np.float64):
+        if depth < 2:
+            raise ValueError('The ring buffer depth should be at least 2')
+        self.frames = np.zeros((depth,) + tuple(shape), dtype=dtype)
+        self._condition = threading.Condition()
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return self.frames.shape[0]
+
+    @property
+    def acquired(self) -> int:
+        """ The total number of committed frames"""
+        return self._written
+
+    @property
+    def available(self) -> int:
+        """ The number of frames not yet returned to the consumer"""
+        with self._condition:
+            return self._written - self._read
+
+    def write_slot(self) -> np.ndarray:
+        """ Get the frame to be filled by the producer
+
+        If the ring is full, the oldest unread frame is dropped so that the slot is never one the
+        consumer may be reading
+        """
+        with self._condition:
+            if self._written - self._read >= self.depth - 1:
+                self.dropped += 1
+                self._read += 1
+            return self.frames[self._written % self.depth]
+
+    def commit(self):
+        """ Make the frame previously returned by write_slot available to the consumer"""
+        with self._condition:
+            self._written += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """ Wait for at least one unread frame, return False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._written > self._read, timeout)
+
+    def pop_latest(self, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """ Get a copy of the most recent frame, the older unread ones are dropped
+
+        Parameters
+        ----------
+        out: ndarray
+            optional array of the frame shape the frame is copied into
+        """
+        with self._condition:
+            if self._written == self._read:
+                return None
+            self.dropped += self._written - self._read - 1
+            self._read = self._written
+            frame = self.frames[(self._written - 1) % self.depth]
+            if out is None:
+                return frame.copy()
+            np.copyto(out, frame)
+            return out
+
+    def pop_batch(self, max_frames: Optional[int] = None) -> Optional[np.ndarray]:
+        """ Get a copy of the unread frames, oldest first, with shape (nframes,) + frame shape
+
+        Parameters
+        ----------
+        max_frames: int
+            optional maximum number of frames to return, the newer ones are kept for the next call
+        """
+        with self._condition:
+            if self._written == self._read:
+                return None
+            stop = self._written if max_frames is None else min(self._written,
+                                                                self._read + max_frames)
+            batch = self.frames[np.arange(self._read, stop) % self.depth]
+            self._read = stop
+            return batch
+
+
+class StreamingAcquisition(threading.Thread):
+    """ Producer thread filling a FrameRingBuffer
+
+    Parameters
+    ----------
+    ring: FrameRingBuffer
+    grab_frame: callable
+        called with the frame to fill in place, should return True if the frame is valid and False
+        otherwise (cancelled or timed out acquisition)
+    on_stop: callable
+        optional callable used by stop to interrupt a pending grab_frame call
+    """
+
+    def __init__(self, ring: FrameRingBuffer, grab_frame: Callable[[np.ndarray], bool],
+                 on_stop: Callable[[], None] = None):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.grab_frame = grab_frame
+        self.on_stop = on_stop
+        self.error: Exception = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                if self.grab_frame(self.ring.write_slot()):
+                    self.ring.commit()
+        except Exception as e:
+            self.error = e
+
+    def stop(self, timeout: float = None):
+        """ Stop the producer and wait for the thread to finish"""
+        self._stop_event.set()
+        if self.on_stop is not None:
+            self.on_stop()
+        if self.is_alive():
+            self.join(timeout)
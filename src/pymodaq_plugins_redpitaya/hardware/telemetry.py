@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Timing telemetry of the acquisitions, collected without attaching a profiler.
+"""
+import csv
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+# stages of an acquisition, each one measured from the end of the previous one
+STAGES = ('arm', 'trigger', 'filled', 'transfer', 'emit')
+# traffic counters of SharedRedPitayaScpi
+COUNTERS = ('commands', 'bytes_sent', 'bytes_received')
+
+
+class FrameTelemetry:
+    """ Rolling statistics of the stage durations and of the SCPI traffic of the emitted frames
+
+    A record is opened by begin and closed by end. In between, mark(stage) adds the time elapsed
+    since the previous mark to the duration of stage, so that a record covering several
+    acquisitions (Naverage > 1) accumulates the time spent in each stage. Only the records that
+    reached the emit stage are kept, the cancelled or timed out ones are discarded.
+
+    When disabled, begin does not open any record and mark returns after a single test, so that
+    the instrumentation of the acquisition costs almost nothing.
+
+    Parameters
+    ----------
+    controller: SharedRedPitayaScpi
+        the controller whose traffic counters are read at the start and end of each record. As
+        the controller is shared, the traffic of the other plugins of the board is included
+    window: int
+        number of records kept for the statistics and the export
+    """
+
+    def __init__(self, controller=None, window: int = 100):
+        self.controller = controller
+        self.enabled = False
+        self.records: deque = deque(maxlen=window)
+        self._start: Optional[float] = None
+        self._last: Optional[float] = None
+        self._timestamp = 0.
+        self._durations: Dict[str, float] = {}
+        self._counters: Tuple[int, ...] = ()
+
+    @property
+    def window(self) -> int:
+        return self.records.maxlen
+
+    @window.setter
+    def window(self, window: int):
+        self.records = deque(self.records, maxlen=window)
+
+    def read_counters(self) -> Tuple[int, ...]:
+        return tuple(getattr(self.controller, counter, 0) for counter in COUNTERS)
+
+    def begin(self):
+        """ Open a new record, discarding the current one if any"""
+        if not self.enabled:
+            return
+        self._timestamp = time.time()
+        self._start = self._last = time.perf_counter()
+        self._durations = {}
+        self._counters = self.read_counters()
+
+    def mark(self, stage: str):
+        """ Add the time elapsed since the previous mark to the duration of stage"""
+        if self._last is None:
+            return
+        now = time.perf_counter()
+        self._durations[stage] = self._durations.get(stage, 0.) + now - self._last
+        self._last = now
+
+    def cancel(self):
+        """ Discard the current record"""
+        self._start = self._last = None
+
+    def end(self) -> bool:
+        """ Close the current record, kept only if its frame has been emitted
+
+        Returns
+        -------
+        bool: True if the record has been kept
+        """
+        if self._last is None:
+            return False
+        emitted = 'emit' in self._durations
+        if emitted:
+            record = dict(timestamp=self._timestamp, total=self._last - self._start)
+            record.update((stage, self._durations.get(stage, 0.)) for stage in STAGES)
+            record.update(zip(COUNTERS, np.subtract(self.read_counters(), self._counters).tolist()))
+            self.records.append(record)
+        self.cancel()
+        return emitted
+
+    def reset(self):
+        self.records.clear()
+        self.cancel()
+
+    def statistics(self) -> Dict[str, float]:
+        """ Statistics over the kept records
+
+        Returns
+        -------
+        dict: the rate of the records in Hz, the mean and 90th percentile of the total duration and
+        the mean of each stage duration in ms, and the mean SCPI traffic per record
+        """
+        if not self.records:
+            return {}
+        totals = np.array([record['total'] for record in self.records])
+        statistics = dict(total=1000 * totals.mean(), total_p90=1000 * np.percentile(totals, 90))
+        for stage in STAGES:
+            statistics[stage] = 1000 * np.mean([record[stage] for record in self.records])
+        for counter in COUNTERS:
+            statistics[counter] = float(np.mean([record[counter] for record in self.records]))
+        span = self.records[-1]['timestamp'] - self.records[0]['timestamp']
+        statistics['rate'] = (len(self.records) - 1) / span if span > 0 else 0.
+        return statistics
+
+    def export(self, path: Union[str, Path]) -> Path:
+        """ Write the kept records to path, as JSON if its suffix is .json, as CSV otherwise
+
+        The durations are in s and the timestamps in s since the epoch
+        """
+        path = Path(path)
+        records: List[dict] = list(self.records)
+        if path.suffix.lower() == '.json':
+            path.write_text(json.dumps(records, indent=2))
+        else:
+            with path.open('w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=('timestamp', 'total') + STAGES + COUNTERS)
+                writer.writeheader()
+                writer.writerows(records)
+        return path
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Wait for the end of an acquisition (trigger fired then buffer filled) without blocking polling
+loops nor processing any Qt event from the acquisition thread.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+
+class TriggerTimeout(Exception):
+    """ Raised when the acquisition did not complete within the asked timeout
+
+    Not an OSError as the builtin TimeoutError: the board answered, so this should not be taken
+    for a communication failure to recover from.
+    """
+    pass
+
+
+class TriggerWaiter:
+    """ Poll the trigger and buffer status of the board with an adaptive interval
+
+    The first poll interval is a fraction of the expected acquisition time, then it grows
+    geometrically up to max_interval, so that fast acquisitions are detected with a low latency
+    while long waits (for instance on a slow external trigger) do not flood the board with status
+    queries. Waits can be cancelled from any thread using cancel().
+
+    Parameters
+    ----------
+    controller: RedPitayaScpi
+    min_interval: float
+        The minimum poll interval in s
+    max_interval: float
+        The maximum poll interval in s
+    backoff: float
+        the growth factor of the poll interval after each unsuccessful poll
+    """
+
+    def __init__(self, controller: RedPitayaScpi, min_interval: float = 0.5e-3,
+                 max_interval: float = 50e-3, backoff: float = 1.5):
+        self.controller = controller
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """ Interrupt the current (and next) waits, thread safe"""
+        self._cancel_event.set()
+
+    def reset(self):
+        """ Clear a previous cancellation, to be called before arming a new acquisition"""
+        self._cancel_event.clear()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def sleep(self, duration: float) -> bool:
+        """ Sleep for duration (in s) unless cancelled
+
+        Returns
+        -------
+        bool: False if the wait has been cancelled
+        """
+        return not self._cancel_event.wait(duration)
+
+    def _poll(self, condition: Callable[[], bool], interval: float,
+              deadline: Optional[float]) -> bool:
+        while not condition():
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TriggerTimeout('The Redpitaya acquisition did not complete in time')
+            if self._cancel_event.wait(interval):
+                return False
+            interval = min(interval * self.backoff, self.max_interval)
+        return True
+
+    def wait(self, wait_time: float, timeout: Optional[float] = None) -> bool:
+        """ Wait for the trigger to be fired and then for the buffer to be filled
+
+        Parameters
+        ----------
+        wait_time: float
+            The expected acquisition time (in s) used to size the poll interval
+        timeout: float
+            Optional maximum time to wait (in s). None or 0 means no timeout
+
+        Returns
+        -------
+        bool: True if the acquisition is complete, False if the wait has been cancelled
+
+        Raises
+        ------
+        TriggerTimeout if the acquisition did not complete within timeout
+        """
+        deadline = time.perf_counter() + timeout if timeout else None
+        interval = min(max(wait_time / 4, self.min_interval), self.max_interval)
+        if not self._poll(lambda: self.controller.acq_trigger_status, interval, deadline):
+            return False
+        return self._poll(lambda: self.controller.acq_buffer_filled, interval, deadline)
@@ -0,0 +1,239 @@
+from typing import List
+
+import numpy as np
+from qtpy import QtCore
+
+from pymodaq.extensions.pid.utils import PIDModelGeneric, main
+from pymodaq.utils.data import DataToExport, DataCalculated, DataToActuators, DataActuator
+from pymodaq_utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_redpitaya.utils import Config
+from pymodaq_plugins_redpitaya.hardware.connection import acquire_controller, release_controller
+from pymodaq_plugins_redpitaya.hardware.fast_pid import (REDUCTIONS, FAST_PID_LIMITS,
+                                                         FAST_PID_OUTPUTS, DiscretePID,
+                                                         FastPIDLoop, reduce_frame)
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig
+
+logger = set_logger(get_module_name(__file__))
+plugin_config = Config()
+
+
+class PIDModelRedPitaya(PIDModelGeneric):
+    """ Stabilize a reduction (mean, rms...) of a fast input of a Red Pitaya with its fast generator
+
+    The dashboard loop grabs the RedPitaya detector, reduces the data labelled as the input and
+    moves the RedPitaya actuator (offset or amplitude axis) to the absolute output of the PID.
+
+    The fast path runs the same loop within the process instead: each iteration acquires a frame
+    of the input, reduces it and writes the generator over the connection shared with the
+    plugins, so that the loop rate approaches the acquisition rate. It uses the gains, limits and
+    setpoint of the PID settings and replaces the dashboard loop, which only displays its state
+    while it runs. The grabs of the viewers of the same board should be stopped meanwhile. Once
+    the fast path is stopped, the plugins of the board write again their own configuration before
+    their next communication, the actuator keeping the last output of the fast path.
+
+    The output limits of the PID are the range of the generator property driven by the fast path.
+    """
+    limits = dict(max=dict(state=True, value=FAST_PID_LIMITS[plugin_config('pid', 'output')][1]),
+                  min=dict(state=True, value=FAST_PID_LIMITS[plugin_config('pid', 'output')][0]),)
+    konstants = dict(kp=0.1, ki=10., kd=0.)
+
+    Nsetpoints = 1  # number of setpoints
+    setpoint_ini = [0.]  # number and values of initial setpoints
+    setpoints_names = ['Input']  # number and names of setpoints
+
+    # names of actuator's and detector's control modules involved in the PID
+    actuators_name = [plugin_config('pid', 'actuator')]
+    detectors_name = [plugin_config('pid', 'detector')]
+
+    params = [
+        {'title': 'Input label:', 'name': 'label', 'type': 'str',
+         'value': plugin_config('pid', 'label'),
+         'tip': 'Label of the detector data to be reduced, the first channel if not found'},
+        {'title': 'Reduction:', 'name': 'reduction', 'type': 'list', 'limits': list(REDUCTIONS),
+         'value': plugin_config('pid', 'reduction')},
+        {'title': 'Fast path:', 'name': 'fast_path', 'type': 'group', 'children': [
+            {'title': 'Running:', 'name': 'running', 'type': 'led_push', 'value': False,
+             'tip': 'Run the loop within the process instead of the dashboard'},
+            {'title': 'IP Address:', 'name': 'ip_address', 'type': 'str',
+             'value': plugin_config('ip_address')},
+            {'title': 'Port:', 'name': 'port', 'type': 'int', 'value': plugin_config('port')},
+            {'title': 'Input:', 'name': 'input', 'type': 'list', 'limits': {'IN1': 1, 'IN2': 2},
+             'value': plugin_config('pid', 'input')},
+            {'title': 'Nsamples:', 'name': 'nsamples', 'type': 'int', 'min': 1,
+             'value': plugin_config('pid', 'nsamples')},
+            {'title': 'Decimation:', 'name': 'decimation', 'type': 'list',
+             'limits': [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384,
+                        32768, 65536], 'value': plugin_config('pid', 'decimation')},
+            {'title': 'Output:', 'name': 'output', 'type': 'list',
+             'limits': list(FAST_PID_OUTPUTS), 'value': plugin_config('pid', 'output')},
+            {'title': 'Channel:', 'name': 'channel', 'type': 'list', 'limits': {'1': 1, '2': 2},
+             'value': plugin_config('pid', 'channel')},
+            {'title': 'Min period (ms):', 'name': 'period', 'type': 'float', 'min': 0.,
+             'value': plugin_config('pid', 'period'),
+             'tip': 'Minimum duration of an iteration, 0 to run as fast as possible'},
+            {'title': 'Loop rate (Hz):', 'name': 'rate', 'type': 'float', 'value': 0.,
+             'readonly': True},
+            {'title': 'Measurement:', 'name': 'measurement', 'type': 'float', 'value': 0.,
+             'readonly': True},
+            {'title': 'Output value:', 'name': 'value', 'type': 'float', 'value': 0.,
+             'readonly': True},
+        ]},
+    ]
+
+    def __init__(self, pid_controller):
+        super().__init__(pid_controller)
+        self.fast_loop: FastPIDLoop = None
+        self.timer = QtCore.QTimer()
+        self.timer.setInterval(plugin_config('pid', 'refresh'))
+        self.timer.timeout.connect(self.update_fast_status)
+
+    def update_settings(self, param):
+        """
+        Get a parameter instance whose value has been modified by a user on the UI
+        Parameters
+        ----------
+        param: (Parameter) instance of Parameter object
+        """
+        if param.name() == 'running':
+            if param.value():
+                self.start_fast_path()
+            else:
+                self.stop_fast_path()
+        elif param.name() == 'output':
+            self.apply_limits()
+        elif param.name() == 'reduction' and self.fast_loop is not None:
+            self.fast_loop.reduction = param.value()
+        elif param.name() == 'period' and self.fast_loop is not None:
+            self.fast_loop.period = param.value() / 1000
+
+    def apply_limits(self):
+        """ Limit the PID output to the range of the generator property driven by the fast path"""
+        low, high = FAST_PID_LIMITS[self.settings['fast_path', 'output']]
+        self.limits = dict(max=dict(state=True, value=high), min=dict(state=True, value=low))
+        super().apply_limits()
+
+    def ini_model(self):
+        super().ini_model()
+        pid_settings = self.pid_controller.settings.child('main_settings', 'pid_settings')
+        pid_settings.sigTreeStateChanged.connect(self.update_fast_pid)
+        for setpoint in self.pid_controller.setpoints_sb:
+            setpoint.valueChanged.connect(self.update_fast_pid)
+
+    def get_pid(self) -> DiscretePID:
+        """ A PID with the gains, limits and setpoint of the PID settings"""
+        pid = DiscretePID()
+        self.set_pid_parameters(pid)
+        return pid
+
+    def set_pid_parameters(self, pid: DiscretePID):
+        settings = self.pid_controller.settings.child('main_settings', 'pid_settings')
+        pid.kp = settings['pid_constants', 'kp']
+        pid.ki = settings['pid_constants', 'ki']
+        pid.kd = settings['pid_constants', 'kd']
+        pid.limits = tuple(settings['output_limits', f'output_limit_{limit}']
+                           if settings['output_limits', f'output_limit_{limit}_enabled'] else None
+                           for limit in ('min', 'max'))
+        pid.setpoint = self.pid_controller.setpoints[0]
+
+    def update_fast_pid(self, *args):
+        """ Apply the changes of the PID settings or setpoint to the running fast path"""
+        if self.fast_loop is not None:
+            self.set_pid_parameters(self.fast_loop.pid)
+
+    def start_fast_path(self):
+        """ Connect to the board and start the in-process loop from the current output"""
+        settings = self.settings.child('fast_path')
+        controller = acquire_controller(settings['ip_address'], settings['port'])
+        config = AcquisitionConfig(nsamples=settings['nsamples'],
+                                   decimation=settings['decimation'],
+                                   channels=[settings['input']], acq_format='BIN',
+                                   trigger_source='NOW', center_trigger=False,
+                                   timeout=plugin_config('trigger', 'timeout'),
+                                   clock=controller.CLOCK)
+        try:
+            self.fast_loop = FastPIDLoop(controller, config, self.get_pid(),
+                                         self.settings['reduction'], settings['output'],
+                                         settings['channel'], settings['period'] / 1000,
+                                         **plugin_config('connection'))
+            self.fast_loop.configure()
+        except Exception as e:
+            logger.exception(f'Could not start the fast path: {e}')
+            self.fast_loop = None
+            release_controller(controller)
+            settings.child('running').setValue(False)
+            return
+        self.fast_loop.start(self.curr_output[0])
+        self.timer.start()
+
+    def stop_fast_path(self):
+        if self.fast_loop is None:
+            return
+        self.timer.stop()
+        self.fast_loop.stop()
+        self.update_fast_status()
+        self.curr_output = [self.fast_loop.value]
+        release_controller(self.fast_loop.board.controller)
+        self.fast_loop = None
+
+    def update_fast_status(self):
+        """ Display the state of the fast path, unchecking it if its loop stopped on an error"""
+        settings = self.settings.child('fast_path')
+        settings.child('rate').setValue(self.fast_loop.rate)
+        settings.child('measurement').setValue(self.fast_loop.measurement)
+        settings.child('value').setValue(self.fast_loop.value)
+        if not self.fast_loop.running and settings['running']:
+            settings.child('running').setValue(False)
+
+    def reduce(self, measurements: DataToExport) -> float:
+        """ Reduce the data labelled as the input, or the first channel if there is none"""
+        label = self.settings['label']
+        for dwa in measurements:
+            if label in dwa.labels:
+                return reduce_frame(dwa[dwa.labels.index(label)], self.settings['reduction'])
+        return reduce_frame(measurements[0][0], self.settings['reduction'])
+
+    def convert_input(self, measurements: DataToExport):
+        """
+        Convert the measurements in the units to be fed to the PID (same dimensionality as the setpoint)
+        Parameters
+        ----------
+        measurements: DataToExport
+            Data from the declared detectors from which the model extract a value of the same units as the setpoint
+
+        Returns
+        -------
+        DataToExport: the converted input, the measurement of the fast path while it runs
+
+        """
+        if self.fast_loop is not None:
+            value = self.fast_loop.measurement
+        else:
+            value = self.reduce(measurements)
+        return DataToExport('inputs', data=[DataCalculated('pid inputs',
+                                                           data=[np.array([value])])])
+
+    def convert_output(self, outputs: List[float], **kwargs):
+        """
+        Convert the output of the PID in units to be fed into the actuator
+        Parameters
+        ----------
+        outputs: List of float
+            output value from the PID from which the model extract a value of the same units as the actuator
+
+        Returns
+        -------
+        DataToActuators: the absolute target of the actuator, a null relative move while the fast
+        path runs
+
+        """
+        if self.fast_loop is not None:
+            return DataToActuators('pid', mode='rel',
+                                   data=[DataActuator(self.actuators_name[0], data=0.)])
+        self.curr_output = outputs
+        return DataToActuators('pid', mode='abs',
+                               data=[DataActuator(self.actuators_name[0], data=outputs[0])])
+
+
+if __name__ == '__main__':
+    main("RedPitayaPID.xml")  # some preset configured with the RedPitaya actuator and detector
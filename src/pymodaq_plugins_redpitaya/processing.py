@@ -0,0 +1,532 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+
+Vectorized processing of the frames acquired from the fast analog inputs.
+"""
+from functools import lru_cache
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+MIN_FREQUENCY_SAMPLES = 4  # the spectrum should have a bin on each side of a non DC peak
+
+
+class FrameAccumulator:
+    """ Sum frames in place into a preallocated float64 array
+
+    Parameters
+    ----------
+    shape: sequence of int
+        The shape of a frame, for instance (nchannels, nsamples)
+    """
+
+    def __init__(self, shape: Sequence[int]):
+        self.sum = np.zeros(tuple(shape), dtype=np.float64)
+        self.frame = np.empty(tuple(shape), dtype=np.float64)  # scratch frame to acquire into
+        self.count = 0
+
+    @property
+    def shape(self):
+        return self.sum.shape
+
+    def reset(self):
+        self.sum[...] = 0.
+        self.count = 0
+
+    def add(self, frame: np.ndarray):
+        np.add(self.sum, frame, out=self.sum)
+        self.count += 1
+
+    def mean(self) -> np.ndarray:
+        """ Get a new array with the average of the accumulated frames"""
+        return self.sum / max(self.count, 1)
+
+
+class ExponentialAverage:
+    """ Running exponential average: average = alpha * frame + (1 - alpha) * average
+
+    Parameters
+    ----------
+    alpha: float
+        The weight in ]0, 1] of the new frame, 1 means no averaging
+    """
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.average: Optional[np.ndarray] = None
+
+    def reset(self):
+        self.average = None
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """ Add a frame to the running average and return a copy of the current average"""
+        if self.average is None or self.average.shape != frame.shape:
+            self.average = np.array(frame, dtype=np.float64)
+        else:
+            self.average += self.alpha * (frame - self.average)
+        return self.average.copy()
+
+
+def split_segments(record: np.ndarray, nsegments: int, period: int, nsamples: int) -> np.ndarray:
+    """ View a record as nsegments segments of nsamples samples starting every period samples
+
+    No data is copied, the segments overlapping if period < nsamples. The view is read-only.
+
+    Parameters
+    ----------
+    record: ndarray
+        array of shape (..., npts) with npts >= (nsegments - 1) * period + nsamples
+    nsegments: int
+    period: int
+    nsamples: int
+
+    Returns
+    -------
+    ndarray: view of shape (..., nsegments, nsamples)
+    """
+    if record.shape[-1] < (nsegments - 1) * period + nsamples:
+        raise ValueError(f'A record of {record.shape[-1]} samples cannot hold {nsegments} segments '
+                         f'of {nsamples} samples every {period} samples')
+    return np.lib.stride_tricks.as_strided(
+        record, shape=record.shape[:-1] + (nsegments, nsamples),
+        strides=record.strides[:-1] + (period * record.strides[-1], record.strides[-1]),
+        writeable=False)
+
+
+def minmax_envelope(data: np.ndarray, width: int) -> np.ndarray:
+    """ Decimate data for display, keeping the minimum and maximum of each of width bins
+
+    The minimum and maximum of a bin are interleaved, so that a curve through them draws the
+    envelope of the signal, peaks included, with about 2 * width points.
+
+    Parameters
+    ----------
+    data: ndarray
+        array of shape (..., npts)
+    width: int
+        the target number of bins, for instance the width of the plot in pixels
+
+    Returns
+    -------
+    ndarray: array of shape (..., 2 * nbins) with nbins = ceil(npts / ceil(npts / width))
+    """
+    npts = data.shape[-1]
+    bin_size = -(-npts // max(width, 1))
+    starts = np.arange(0, npts, bin_size)
+    envelope = np.empty(data.shape[:-1] + (starts.size, 2), dtype=data.dtype)
+    np.minimum.reduceat(data, starts, axis=-1, out=envelope[..., 0])
+    np.maximum.reduceat(data, starts, axis=-1, out=envelope[..., 1])
+    return envelope.reshape(data.shape[:-1] + (2 * starts.size,))
+
+
+MEASUREMENTS = ('mean', 'rms', 'peak_to_peak', 'frequency')
+
+
+def dominant_frequency(data: np.ndarray, sampling_period: float) -> np.ndarray:
+    """ Frequency in Hz of the highest peak of the spectrum of data along its last axis
+
+    The data is Hann windowed and its mean removed. The peak position is refined by a parabolic
+    interpolation of the log magnitude around the maximum bin, the DC bin being excluded.
+
+    Parameters
+    ----------
+    data: ndarray
+        array of shape (..., npts)
+    sampling_period: float
+        in s
+
+    Returns
+    -------
+    ndarray: the frequencies with shape data.shape[:-1], NaN if npts < MIN_FREQUENCY_SAMPLES
+    """
+    npts = data.shape[-1]
+    if npts < MIN_FREQUENCY_SAMPLES:
+        return np.full(data.shape[:-1], np.nan)
+    signal = data - data.mean(axis=-1, keepdims=True)
+    magnitude = np.abs(np.fft.rfft(signal * np.hanning(npts), axis=-1))
+    peak = np.argmax(magnitude[..., 1:-1], axis=-1)[..., np.newaxis] + 1
+    left, center, right = (np.log(np.take_along_axis(magnitude, peak + shift, axis=-1)[..., 0] +
+                                  1e-30) for shift in (-1, 0, 1))
+    curvature = left - 2 * center + right
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.)
+    return (peak[..., 0] + delta) / (npts * sampling_period)
+
+
+def measurements(data: np.ndarray, sampling_period: float) -> dict:
+    """ Scalar figures of merit of the frames in data along its last axis
+
+    Parameters
+    ----------
+    data: ndarray
+        array of shape (..., npts), for instance (nchannels, nsamples)
+    sampling_period: float
+        in s
+
+    Returns
+    -------
+    dict: arrays of shape data.shape[:-1] for each of MEASUREMENTS: the mean, the RMS value (DC
+    included) and the peak to peak amplitude in the data units, the dominant frequency in Hz
+    """
+    return dict(mean=data.mean(axis=-1),
+                rms=np.sqrt(np.mean(np.square(data, dtype=np.float64), axis=-1)),
+                peak_to_peak=np.ptp(data, axis=-1),
+                frequency=dominant_frequency(data, sampling_period))
+
+
+def analytic_signal(data: np.ndarray, axis: int = -1) -> np.ndarray:
+    """ Analytic signal of real data along axis, computed with a FFT (same as scipy.signal.hilbert)"""
+    npts = data.shape[axis]
+    spectrum = np.fft.fft(data, axis=axis)
+    weights = np.zeros(npts)
+    weights[0] = 1.
+    if npts % 2 == 0:
+        weights[npts // 2] = 1.
+        weights[1:npts // 2] = 2.
+    else:
+        weights[1:(npts + 1) // 2] = 2.
+    shape = [1] * data.ndim
+    shape[axis] = npts
+    return np.fft.ifft(spectrum * weights.reshape(shape), axis=axis)
+
+
+def frequency_grid(start: float, stop: float, npts: int, mode: str = 'LINEAR') -> np.ndarray:
+    """ Frequencies at which a sweep from start to stop is sampled, log spaced if mode is 'LOG'"""
+    low, high = sorted((start, stop))
+    if mode == 'LOG':
+        return np.geomspace(max(low, 1e-12), high, npts)
+    return np.linspace(low, high, npts)
+
+
+class FrequencyResponse:
+    """ Transfer function response/reference measured from frequency sweeps, averaged in place
+
+    Each sweep record is split in segments, short enough for the frequency to be considered
+    constant. Within a segment the transfer function is the projection of the analytic response
+    signal on the analytic reference one, and the frequency is the mean phase velocity of the
+    reference. The segment values are then interpolated on the fixed frequency grid and summed, so
+    that sweeps of different timings can be averaged.
+
+    Parameters
+    ----------
+    frequencies: ndarray
+        The increasing frequency grid of the response in Hz
+    nsegments: int
+        The number of segments a record is split into
+    threshold: float
+        Segments whose reference power is below threshold times the maximum one are discarded
+        (parts of the record where the generator is off)
+    """
+
+    def __init__(self, frequencies: np.ndarray, nsegments: int, threshold: float = 0.01):
+        self.frequencies = np.asarray(frequencies, dtype=np.float64)
+        self.nsegments = nsegments
+        self.threshold = threshold
+        self.sum = np.zeros(self.frequencies.shape, dtype=np.complex128)
+        self.counts = np.zeros(self.frequencies.shape, dtype=np.int64)
+        self.count = 0
+
+    def reset(self):
+        self.sum[...] = 0.
+        self.counts[...] = 0
+        self.count = 0
+
+    def segments_response(self, reference: np.ndarray, response: np.ndarray,
+                          sampling_period: float):
+        """ Frequencies and complex transfer function of each segment of a record
+
+        Returns
+        -------
+        frequencies: ndarray
+            sorted frequencies of the valid segments in Hz
+        transfer: ndarray
+            complex transfer function at these frequencies
+        """
+        seg_length = reference.shape[-1] // self.nsegments
+        if seg_length < 2:
+            raise ValueError(f'Not enough samples to split the record in {self.nsegments} segments')
+        npts = seg_length * self.nsegments
+        signals = analytic_signal(np.stack((reference, response)).astype(np.float64))
+        signals = signals[:, :npts].reshape(2, self.nsegments, seg_length)
+        ref, resp = signals
+
+        power = np.mean(np.abs(ref) ** 2, axis=-1)
+        transfer = np.mean(resp * ref.conj(), axis=-1) / np.where(power > 0, power, 1.)
+        phase_steps = np.angle(ref[:, 1:] * ref[:, :-1].conj())
+        frequencies = np.mean(phase_steps, axis=-1) / (2 * np.pi * sampling_period)
+
+        valid = (power >= self.threshold * power.max()) & (frequencies > 0)
+        order = np.argsort(frequencies[valid])
+        return frequencies[valid][order], transfer[valid][order]
+
+    def add(self, reference: np.ndarray, response: np.ndarray, sampling_period: float):
+        """ Demodulate a sweep record and add its transfer function to the sum"""
+        frequencies, transfer = self.segments_response(reference, response, sampling_period)
+        if frequencies.size == 0:
+            return
+        transfer = (np.interp(self.frequencies, frequencies, transfer.real, left=np.nan,
+                              right=np.nan) +
+                    1j * np.interp(self.frequencies, frequencies, transfer.imag, left=np.nan,
+                                   right=np.nan))
+        valid = np.isfinite(transfer)
+        np.add(self.sum, transfer, out=self.sum, where=valid)
+        self.counts += valid
+        self.count += 1
+
+    def mean(self) -> np.ndarray:
+        """ Get the averaged complex transfer function, NaN where no sweep covered the frequency"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.counts > 0, self.sum / self.counts, np.nan)
+
+    def magnitude_phase(self):
+        """ Get the averaged magnitude in dB and the phase in degrees of the transfer function"""
+        transfer = self.mean()
+        with np.errstate(divide='ignore'):
+            return 20 * np.log10(np.abs(transfer)), np.angle(transfer, deg=True)
+
+
+WINDOWS = {'Hann': np.hanning, 'Hamming': np.hamming, 'Blackman': np.blackman,
+           'Rectangular': np.ones}
+
+
+class PowerSpectrum:
+    """ One-sided power spectra of frames, averaged with the Welch method
+
+    Each frame is split into overlapping segments, whose mean is removed before being windowed.
+    The squared magnitude of their rFFT is summed over the segments and over the frames added
+    since the last reset. The window, frequencies and scaling factors are computed once.
+
+    Parameters
+    ----------
+    nsamples: int
+        The number of samples of a frame
+    sampling_period: float
+        in s
+    window: str
+        one of WINDOWS
+    segment_length: int
+        The number of samples of a segment, 0 (or more than nsamples) for the whole frame
+    overlap: float
+        The overlap in [0, 1[ of two consecutive segments, as a fraction of segment_length
+    """
+
+    def __init__(self, nsamples: int, sampling_period: float, window: str = 'Hann',
+                 segment_length: int = 0, overlap: float = 0.5):
+        self.segment_length = segment_length if 0 < segment_length <= nsamples else nsamples
+        self.step = max(int(round(self.segment_length * (1 - overlap))), 1)
+        self.nsegments = (nsamples - self.segment_length) // self.step + 1
+        self.window = WINDOWS[window](self.segment_length)
+        self.frequencies = np.fft.rfftfreq(self.segment_length, sampling_period)
+        self.frequency_step = 1 / (self.segment_length * sampling_period)
+
+        one_sided = np.full(self.frequencies.shape, 2.)
+        one_sided[0] = 1.
+        if self.segment_length % 2 == 0:
+            one_sided[-1] = 1.
+        self.scales = dict(density=one_sided * sampling_period / np.sum(self.window ** 2),
+                           spectrum=one_sided / np.sum(self.window) ** 2)
+        self.sum: Optional[np.ndarray] = None
+        self.count = 0
+
+    def reset(self):
+        self.sum = None
+        self.count = 0
+
+    def add(self, frames: np.ndarray):
+        """ Add the spectra of frames of shape (..., nchannels, nsamples)"""
+        segments = split_segments(frames, self.nsegments, self.step, self.segment_length)
+        segments = (segments - segments.mean(axis=-1, keepdims=True)) * self.window
+        power = np.square(np.abs(np.fft.rfft(segments, axis=-1))).sum(axis=-2)
+        power = power.reshape((-1,) + power.shape[-2:])
+        if self.sum is None:
+            self.sum = power.sum(axis=0)
+        else:
+            self.sum += power.sum(axis=0)
+        self.count += power.shape[0]
+
+    def mean(self, scaling: str = 'density') -> np.ndarray:
+        """ Get the averaged spectra of shape (nchannels, nfrequencies)
+
+        Parameters
+        ----------
+        scaling: str
+            'density' for a power spectral density in V²/Hz, 'spectrum' for a power spectrum in V²
+        """
+        return self.sum * (self.scales[scaling] / (max(self.count, 1) * self.nsegments))
+
+
+class Waterfall:
+    """ History of the last depth frames, in a fixed preallocated array updated in place
+
+    Each frame is written twice, in the rows index and index + depth of an array of 2 * depth
+    rows, so that the last frames are always a contiguous slice in chronological order: they can
+    be emitted as a view, without copy nor reordering.
+
+    Parameters
+    ----------
+    depth: int
+        The number of frames kept
+    shape: sequence of int
+        The shape of a frame (nchannels, npts)
+    dtype: numpy dtype
+    """
+
+    def __init__(self, depth: int, shape: Sequence[int], dtype=np.float32):
+        nchannels, npts = shape
+        self.depth = depth
+        self.rows = np.zeros((nchannels, 2 * depth, npts), dtype=dtype)
+        self.timestamps = np.zeros((2 * depth,))
+        self.count = 0
+
+    @property
+    def frame_shape(self):
+        return self.rows.shape[0], self.rows.shape[2]
+
+    def reset(self):
+        self.count = 0
+
+    def add(self, frame: np.ndarray, timestamp: float):
+        """ Add a frame of shape (nchannels, npts), the oldest one being overwritten if full"""
+        index = self.count % self.depth
+        self.rows[:, index] = frame
+        self.rows[:, index + self.depth] = frame
+        self.timestamps[index] = self.timestamps[index + self.depth] = timestamp
+        self.count += 1
+
+    def _slice(self) -> slice:
+        stop = (self.count - 1) % self.depth + self.depth + 1
+        return slice(stop - min(self.count, self.depth), stop)
+
+    def frames(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """ View of the kept frames, oldest first, with shape (nchannels, nframes, npts)
+
+        If out, an array of shape (nchannels, depth, npts), is given, the frames are copied into
+        its first nframes rows and this part of out is returned instead
+        """
+        frames = self.rows[:, self._slice()]
+        if out is None:
+            return frames
+        out = out[:, :frames.shape[1]]
+        np.copyto(out, frames)
+        return out
+
+    def times(self) -> np.ndarray:
+        """ View of the timestamps of the kept frames, oldest first"""
+        return self.timestamps[self._slice()]
+
+
+LOCKIN_OUTPUTS = ('X', 'Y', 'R', 'theta')
+
+
+@lru_cache(maxsize=32)
+def lockin_reference(frequency: float, phase: float, nsamples: int, sampling_period: float,
+                     time_constant: float = 0., order: int = 1) -> np.ndarray:
+    """ Demodulation table of a lock-in: the reference quadratures weighted by its low pass filter
+
+    The reference is sin(2 pi frequency t + phase) with t = k * sampling_period. The weights are
+    the impulse response of order cascaded first order filters of the given time constant, taken
+    at the last sample and normalized to a unit sum, or uniform for a zero time constant. Tables
+    are cached, so that stepping back and forth between frequencies does not recompute them.
+
+    Returns
+    -------
+    ndarray: read-only array of shape (nsamples, 2) such that data @ table gives the X and Y
+    components, in the data units, of the data at the reference frequency
+    """
+    times = np.arange(nsamples) * sampling_period
+    if time_constant > 0:
+        age = (times[-1] - times) / time_constant
+        weights = age ** (order - 1) * np.exp(-age)
+    else:
+        weights = np.ones(nsamples)
+    weights *= 2 / weights.sum()
+    reference_phase = 2 * np.pi * frequency * times + np.deg2rad(phase)
+    table = np.stack((weights * np.sin(reference_phase), weights * np.cos(reference_phase)),
+                     axis=-1)
+    table.flags.writeable = False
+    return table
+
+
+class LockIn:
+    """ Digital lock-in amplifier demodulating frames at a known reference frequency
+
+    The frames are projected on the in-phase and quadrature references through the cached tables
+    of lockin_reference, the low pass filter being applied within each frame as the frames are
+    not contiguous: a frame should last several time constants. For a signal
+    A sin(2 pi frequency t + phi), X = A cos(phi - phase) and Y = A sin(phi - phase). The complex
+    outputs X + iY are averaged over the frames added since the last reset.
+
+    Parameters
+    ----------
+    frequency: float
+        The reference frequency in Hz
+    sampling_period: float
+        in s
+    phase: float
+        The reference phase in degrees, at the time 0 of the frames
+    time_constant: float
+        in s, 0 to average the products uniformly over each frame
+    order: int
+        The number of cascaded first order filters, 6 dB/octave each
+    """
+
+    def __init__(self, frequency: float, sampling_period: float, phase: float = 0.,
+                 time_constant: float = 0., order: int = 1):
+        self.frequency = frequency
+        self.sampling_period = sampling_period
+        self.phase = phase
+        self.time_constant = time_constant
+        self.order = order
+        self.sum: Optional[np.ndarray] = None
+        self.count = 0
+
+    def reset(self):
+        self.sum = None
+        self.count = 0
+
+    def demodulate(self, frames: np.ndarray, starts: Union[float, np.ndarray] = 0.) -> np.ndarray:
+        """ Complex outputs X + iY of frames of shape (..., nsamples)
+
+        Parameters
+        ----------
+        frames: ndarray
+        starts: float or ndarray
+            The time in s of the first sample of the frames, broadcastable to frames.shape[:-1]
+
+        Returns
+        -------
+        ndarray: complex array of shape frames.shape[:-1]
+        """
+        table = lockin_reference(self.frequency, self.phase, frames.shape[-1],
+                                 self.sampling_period, self.time_constant, self.order)
+        components = frames @ table
+        outputs = components[..., 0] + 1j * components[..., 1]
+        if np.any(starts):
+            outputs *= np.exp(-2j * np.pi * self.frequency * np.asarray(starts))
+        return outputs
+
+    def add(self, frames: np.ndarray, starts: Union[float, np.ndarray] = 0.):
+        """ Add the outputs of frames of shape (..., nchannels, nsamples)
+
+        See Also
+        --------
+        demodulate
+        """
+        outputs = self.demodulate(frames, starts)
+        outputs = outputs.reshape((-1, outputs.shape[-1]))
+        if self.sum is None:
+            self.sum = outputs.sum(axis=0)
+        else:
+            self.sum += outputs.sum(axis=0)
+        self.count += outputs.shape[0]
+
+    def mean(self) -> np.ndarray:
+        """ Get the averaged complex outputs X + iY of shape (nchannels,)"""
+        return self.sum / max(self.count, 1)
+
+    def outputs(self) -> dict:
+        """ Get the averaged outputs of each of LOCKIN_OUTPUTS, theta being in degrees"""
+        outputs = self.mean()
+        return dict(X=outputs.real, Y=outputs.imag, R=np.abs(outputs),
+                    theta=np.angle(outputs, deg=True))
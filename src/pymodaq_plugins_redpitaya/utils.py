@@ -4,13 +4,36 @@ Created the 31/08/2023
 
 @author: Sebastien Weber
 """
+import copy
 from pathlib import Path
 
+import toml
+
 from pymodaq_utils.config import BaseConfig, USER
 
 
+def complete_config(template: dict, config: dict):
+    """ Add to config, at any depth, the entries of template it is missing"""
+    for key, value in template.items():
+        if key not in config:
+            config[key] = copy.deepcopy(value)
+        elif isinstance(value, dict) and isinstance(config[key], dict):
+            complete_config(value, config[key])
+
+
 class Config(BaseConfig):
     """Main class to deal with configuration values for this plugin"""
     config_template_path = Path(__file__).parent.joinpath('resources/config_template.toml')
     config_name = f"config_{__package__.split('pymodaq_plugins_')[1]}"
 
+    def load(self):
+        """ Load the configuration files, completed with the entries of the template they miss
+
+        pymodaq_utils stops merging the template into the existing sections of the configuration
+        once an entry has been added, so the entries added to these sections by a new version of
+        the plugin could be missing.
+        """
+        super().load()
+        with self._lock.write_lock():
+            complete_config(toml.load(self.config_template_path), self._config)
+
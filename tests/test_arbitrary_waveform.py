@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.arbitrary_waveform import (
+    AWG_LENGTH, UPLOAD_FORMATS, WaveformLoader, chirp, pulse_train, expression, quantize,
+    encode_upload)
+from pymodaq_plugins_redpitaya.hardware.connection import SharedRedPitayaScpi
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+def test_synthesis():
+    assert chirp(1, 1).shape == (AWG_LENGTH,)
+    assert np.allclose(chirp(2, 2, npts=8), np.sin(2 * np.pi * 2 * np.arange(8) / 8))
+    assert np.array_equal(pulse_train(2, 0.25, npts=8), [1, 0, 0, 0, 1, 0, 0, 0])
+    assert np.allclose(expression('2 * t', npts=4), [0, 0.5, 1, 1.5])
+    assert np.allclose(expression('0.5', npts=4), 0.5)
+    assert np.allclose(expression('where(t < 0.5, 2 ** 2, -1)', npts=4), [4, 4, -1, -1])
+    for text in ('oops(', '__import__("os")', 'log(t)', 'np.sin(t)', '().__class__', 'sin(x=t)',
+                 't[0]', '"t"', 'lambda: 0', '9 ** 9 ** 9'):
+        with pytest.raises(ValueError):
+            expression(text)
+
+
+def test_quantize():
+    quantized = quantize(np.array([-2., 0.3, 1e-5, 2.]))
+    assert quantized.dtype == np.float32
+    assert not quantized.flags.writeable
+    assert quantized[0] == -1 and quantized[-1] == 1 and quantized[2] == 0
+    assert abs(quantized[1] - 0.3) < 1 / 8191
+
+
+def test_encode():
+    waveform = quantize(np.array([1., -1.]))
+    assert encode_upload(2, waveform, 'ASCII') == b'SOUR2:TRAC:DATA:DATA 1.00000,-1.00000'
+    assert encode_upload(1, waveform, 'BIN') == b'SOUR1:TRAC:DATA:DATA #18' + \
+        waveform.astype('>f4').tobytes()
+
+
+@pytest.mark.parametrize('upload_format', UPLOAD_FORMATS)
+def test_loader(upload_format):
+    server = RedPitayaSimulator().start()
+    controller = SharedRedPitayaScpi('127.0.0.1', server.address[1])
+    try:
+        loader = WaveformLoader(controller, upload_format)
+        waveform = chirp(1, 20)
+        assert loader.load(1, waveform)
+        assert not loader.load(1, waveform)
+        assert loader.load(2, waveform)
+        assert controller.ask('*IDN?')  # the uploads have been processed
+        assert np.allclose(server.board.arbitrary[1], quantize(waveform), atol=1e-5)
+        assert loader.uploads == 2
+
+        loader.invalidate(1)
+        assert loader.load(1, waveform)
+        assert loader.load(1, pulse_train(3, 0.5))
+
+        controller.write('SOUR1:FUNC ARBITRARY')
+        controller.write('OUTPUT1:STATE ON')
+        controller.write('SOUR1:FREQ:FIX 1000')
+        controller.write('SOUR1:VOLT 0.5')
+        assert controller.ask('*IDN?')
+        output = server.board.generator_output(1, np.array([0., 0.2e-3, 0.4e-3]))
+        assert np.allclose(output, [0.5, 0., 0.5])
+    finally:
+        controller.adapter.close()
+        server.stop()
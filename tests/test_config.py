@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import atexit
+
+import toml
+
+from pymodaq_utils import config as config_module
+from pymodaq_utils.singleton import Singleton
+
+from pymodaq_plugins_redpitaya.utils import Config, complete_config
+
+# configuration created by the first version of the plugin
+BASELINE_CONFIG = """
+title = 'this is the configuration file of the redpitaya plugin'
+ip_address = '10.42.0.77'
+port = 5000
+
+[sampling]
+decimation = 8
+nsamples = 1234
+
+[trigger]
+source = 'CH1_PE'
+level = 0.0
+center_trigger = true
+
+[generator]
+gen_trigger = 'INT'
+enabling = false
+amplitude = 0.05
+frequency = 1000
+shape = 'SINE'
+offset = 0
+phase = 0
+cycle = 0.5
+channel = 1
+sweep_modes ='LINEAR'
+sweep_start_frequency = 10
+sweep_stop_frequency = 1e6
+time = 1e6
+direction = 'NORMAL'
+"""
+
+
+def paths(template: dict, prefix=()):
+    for key, value in template.items():
+        if isinstance(value, dict):
+            yield from paths(value, prefix + (key,))
+        else:
+            yield prefix + (key,)
+
+
+def test_complete_config():
+    config = {'a': 1, 'b': {'c': 2}}
+    complete_config({'a': 0, 'b': {'c': 0, 'd': 3}, 'e': {'f': 4}}, config)
+    assert config == {'a': 1, 'b': {'c': 2, 'd': 3}, 'e': {'f': 4}}
+
+
+def test_baseline_config(tmp_path, monkeypatch):
+    """ All the entries of the template are available from a configuration of the first version"""
+    def get_set_config_dir(config_name='config', user=False):
+        path = tmp_path / ('user' if user else 'system')
+        path.mkdir(exist_ok=True)
+        return path
+
+    monkeypatch.setattr(config_module, 'get_set_config_dir', get_set_config_dir)
+    get_set_config_dir().joinpath(f'{Config.config_name}.toml').write_text(BASELINE_CONFIG)
+
+    class BaselineConfig(Config):  # not the singleton instance used by the plugins
+        _allow_direct_call = True
+
+    config = BaselineConfig()
+    try:
+        atexit.unregister(config.save)
+        for path in paths(toml.load(Config.config_template_path)):
+            config(*path)
+        assert config('sampling', 'nsamples') == 1234  # the existing entries are kept
+        assert config('trigger', 'timeout') == 10.
+    finally:
+        Singleton.unregister(BaselineConfig)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import threading
+
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware import connection
+from pymodaq_plugins_redpitaya.hardware.connection import (ConnectionRegistry, ConnectionKeeper,
+                                                           SharedRedPitayaScpi)
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+class FakeAdapter:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeController:
+    def __init__(self, ip_address, port):
+        self.address = (ip_address, port)
+        self.adapter = FakeAdapter()
+        self.lock = connection.threading.RLock()
+        self.reconnect_lock = connection.threading.RLock()
+
+
+def test_registry(monkeypatch):
+    monkeypatch.setattr(connection, 'create_controller', FakeController)
+    registry = ConnectionRegistry()
+
+    controller = registry.acquire('10.0.0.1', 5000)
+    assert registry.acquire('10.0.0.1', '5000') is controller
+    other = registry.acquire('10.0.0.2', 5000)
+    assert other is not controller
+    assert registry.count('10.0.0.1', 5000) == 2
+
+    registry.release(controller)
+    assert not controller.adapter.closed
+    registry.release(controller)
+    assert controller.adapter.closed
+    assert registry.count('10.0.0.1', 5000) == 0
+    registry.release(controller)  # already closed, ignored
+    assert registry.acquire('10.0.0.1', 5000) is not controller
+    assert registry.count('10.0.0.2', 5000) == 1
+
+
+class FlakyController(FakeController):
+    """ Controller whose connection is lost until reconnected"""
+
+    def __init__(self):
+        super().__init__('10.0.0.1', 5000)
+        self.resource_name = 'TCPIP::10.0.0.1::5000::SOCKET'
+        self.generation = 0
+        self.alive = True
+        self.reconnections = 0
+
+    def is_idle(self, interval):
+        return False
+
+    def ping(self):
+        return self.alive
+
+    def reconnect(self, attempts, delay, max_delay=10., sleep=None):
+        self.reconnections += 1
+        self.alive = True
+        self.generation += 1
+        return True
+
+    def query(self):
+        if not self.alive:
+            raise ConnectionResetError('lost')
+        return 'ok'
+
+
+def test_connection_keeper():
+    controller = FlakyController()
+    restored = []
+    keeper = ConnectionKeeper(controller, lambda: restored.append(True))
+    other = ConnectionKeeper(controller, lambda: restored.append(False))
+    assert keeper.call(controller.query) == 'ok'
+
+    controller.alive = False
+    assert keeper.call(controller.query) == 'ok'
+    assert controller.reconnections == 1
+    assert restored == [True]
+
+    other.generation = 0  # the other user lost the connection before the reconnection
+    assert other.recover()
+    assert controller.reconnections == 1  # already reconnected, only the configuration is restored
+    assert restored == [True, False]
+
+    def broken():
+        raise ConnectionResetError('lost')
+
+    with pytest.raises(ConnectionError):  # failing again after the reconnection
+        keeper.call(broken)
+    assert controller.reconnections == 2
+
+
+def test_reconnect_releases_lock():
+    """ Other users can communicate while a reconnection waits between its attempts"""
+    server = RedPitayaSimulator().start()
+    controller = SharedRedPitayaScpi('127.0.0.1', server.address[1])
+    server.stop()
+    acquired = []
+
+    def sleep(duration):
+        thread = threading.Thread(target=lambda: acquired.append(
+            controller.lock.acquire(timeout=1.) and controller.lock.release() is None))
+        thread.start()
+        thread.join()
+        return True
+
+    assert not controller.reconnect(attempts=2, delay=0.01, sleep=sleep)
+    assert acquired == [True]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.connection import (ConnectionKeeper, SharedRedPitayaScpi,
+                                                           set_nodelay)
+from pymodaq_plugins_redpitaya.hardware.fast_pid import (REDUCTIONS, DiscretePID, FastPIDLoop,
+                                                         reduce_frame)
+from pymodaq_plugins_redpitaya.hardware.scan_table import AMPLITUDE_LIMITS
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig, ScpiWriteCache
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+def test_reduce_frame():
+    frame = np.array([-1., 1., 3., 1.])
+    assert [reduce_frame(frame, reduction) for reduction in REDUCTIONS] == \
+        [1., np.sqrt(3.), 4., 3., -1.]
+    with pytest.raises(ValueError):
+        reduce_frame(frame, 'median')
+
+
+def test_discrete_pid():
+    pid = DiscretePID(kp=2., ki=10., setpoint=1., limits=(-1., 1.))
+    assert pid(0.5, 0.1) == 1.  # 2 * 0.5 + 0.5 clamped
+    assert pid.integral == 0.5
+    for ind in range(10):
+        pid(-10., 0.1)
+    assert pid.integral == 1.  # no windup beyond the limits
+    assert pid(1., 0.1) == 1.
+
+    pid = DiscretePID(kp=0., kd=1., setpoint=5.)
+    assert pid(0., 0.1) == 0.
+    pid.setpoint = 10.
+    assert pid(0.5, 0.1) == -5.  # derivative on the measurement only
+    pid.reset(0.2)
+    assert pid.integral == 0.2 and pid.last_measurement is None
+
+
+def test_loop():
+    server = RedPitayaSimulator(inputs=('loopback', 'noise'), noise=1e-3).start()
+    controller = SharedRedPitayaScpi('127.0.0.1', server.address[1])
+    set_nodelay(controller)
+    try:
+        controller.write('SOUR1:VOLT 0')
+        controller.write('OUTPUT1:STATE ON')
+        config = AcquisitionConfig(nsamples=256, decimation=8, channels=[1], acq_format='BIN',
+                                   trigger_source='NOW', center_trigger=False, timeout=1.)
+        loop = FastPIDLoop(controller, config, DiscretePID(kp=0.2, ki=200., setpoint=0.3,
+                                                           limits=(-1., 1.)))
+        loop.configure()
+        loop.start()
+        time.sleep(0.5)
+        loop.stop()
+        assert not loop.running and loop.error is None
+        assert loop.iterations > 100 and loop.rate > 0
+        assert abs(loop.measurement - 0.3) < 0.01
+        assert float(controller.ask('SOUR1:VOLT:OFFS?')) == pytest.approx(loop.value, abs=1e-4)
+
+        with pytest.raises(ValueError):
+            FastPIDLoop(controller, config, DiscretePID(), output='phase')
+    finally:
+        controller.adapter.close()
+        server.stop()
+
+
+def test_caches_restored():
+    """ The settings of a viewer, overwritten by the loop behind its cache, reach the board again
+    before its next acquisition"""
+    server = RedPitayaSimulator().start()
+    controller = SharedRedPitayaScpi('127.0.0.1', server.address[1])
+    set_nodelay(controller)
+    try:
+        acq_settings = ScpiWriteCache(controller)  # as held by a viewer
+        connection = ConnectionKeeper(controller, acq_settings.replay, health_check=0.)
+        acq_settings.set('decimation', 64)
+        generator = ScpiWriteCache(SimpleNamespace())  # as held by the actuator of the channel
+        controller.generator_caches[1] = generator
+        generator.set('amplitude', 0.5)
+        config = AcquisitionConfig(nsamples=256, decimation=8, channels=[1], acq_format='BIN',
+                                   trigger_source='NOW', center_trigger=False, timeout=1.)
+        # driving the amplitude far below its range, the written output is clamped to its minimum
+        loop = FastPIDLoop(controller, config, DiscretePID(kp=100., setpoint=-1.),
+                           output='amplitude')
+        loop.configure()
+        loop.start()
+        time.sleep(0.1)
+        loop.stop()
+        assert controller.decimation == 8
+        minimum = AMPLITUDE_LIMITS[0]
+        assert loop.value == minimum and float(controller.ask('SOUR1:VOLT?')) == minimum
+        assert generator.values['amplitude'] == minimum  # the actuator keeps the loop output
+
+        assert connection.check()
+        assert controller.decimation == 64
+        acq_settings.set('decimation', 16)
+        assert controller.decimation == 16
+    finally:
+        controller.adapter.close()
+        server.stop()
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+
+from pymodaq_plugins_redpitaya.hardware.frame_pool import FramePool
+
+
+def test_recycling():
+    pool = FramePool((2, 10), max_size=3)
+    frame = pool.get()
+    assert frame.dtype == np.float32
+    assert frame.flags['C_CONTIGUOUS']
+    frames = [frame, pool.get(), pool.get()]
+    assert len(pool.frames) == 3 and pool.generation == 3
+    assert pool.get() is frames[0]  # handed out in turn
+    assert pool.get() is frames[1]
+    assert len(pool.frames) == 3
+
+
+def test_held_frame():
+    """ A frame still held by a consumer is not written before max_size - 1 other frames"""
+    pool = FramePool((2, 10), max_size=4)
+    frame = pool.get()
+    frame[:] = 1.
+    views = list(frame)  # as wrapped by the emitted data
+    del frame
+    for ind in range(3):
+        other = pool.get()
+        assert not any(np.shares_memory(other, view) for view in views)
+        other[:] = 2.
+    assert all(np.all(view == 1.) for view in views)
+    assert np.shares_memory(pool.get(), views[0])
+
+
+def test_released_frame():
+    """ Dropping the references to a frame does not hand it out before its turn"""
+    pool = FramePool((5,), max_size=2)
+    first = pool.get()
+    frame_id = id(first)
+    del first
+    assert id(pool.get()) != frame_id
+    assert id(pool.get()) == frame_id
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+redpitaya_scpi = pytest.importorskip('pymeasure.instruments.redpitaya.redpitaya_scpi')
+if not hasattr(redpitaya_scpi, 'AnalogOutputFastChannel'):
+    pytest.skip('the generator needs the pymeasure version with analog outputs',
+                allow_module_level=True)
+
+from pymodaq.utils.data import DataActuator
+
+from pymodaq_plugins_redpitaya.daq_move_plugins.daq_move_RedpitayaSCPI import \
+    DAQ_Move_RedpitayaSCPI
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+@pytest.fixture
+def move():
+    server = RedPitayaSimulator().start()
+    plugin = DAQ_Move_RedpitayaSCPI()
+    plugin.emit_status = lambda status: None
+    plugin.settings.child('ip_address').setValue(server.address[0])
+    plugin.settings.child('port').setValue(server.address[1])
+    plugin.ini_stage()
+    plugin.board = server.board
+    yield plugin
+    plugin.close()
+    server.stop()
+
+
+def read_commands(plugin, nreads: int) -> int:
+    """ Number of commands sent to the board by nreads reads of the actuator value"""
+    commands = plugin.controller.commands
+    for ind in range(nreads):
+        plugin.get_actuator_value()
+    return plugin.controller.commands - commands
+
+
+@pytest.mark.parametrize('policy, queries, external_value', [('Always', 5, 0.4),
+                                                             ('On settle', 1, 0.3),
+                                                             ('Never', 0, 0.3)])
+def test_readback(move, policy, queries, external_value):
+    move.settings.child('readback').setValue(policy)
+    assert move.axis_name == 'amplitude'
+    move.move_abs(DataActuator(data=0.3, units='V'))
+    assert read_commands(move, 5) == queries
+    assert move.get_actuator_value().value() == pytest.approx(0.3)
+
+    with move.board.lock:  # changed by another client of the board
+        move.board.generator[1]['VOLT'] = '0.4'
+    assert move.get_actuator_value().value() == pytest.approx(external_value)
+
+    move.move_abs(DataActuator(data=0.2, units='V'))  # confirmed again after a write
+    assert read_commands(move, 2) == min(queries, 2)
+    assert float(move.board.generator[1]['VOLT']) == pytest.approx(0.2)
+
+
+def test_readback_unknown(move):
+    move.settings.child('readback').setValue('Never')
+    move.generator_settings.invalidate('amplitude')
+    assert read_commands(move, 3) == 1  # queried once, the value being unknown
+    assert move.get_actuator_value().value() == pytest.approx(1.)  # the board default
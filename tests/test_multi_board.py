@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import time
+
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.connection import SharedRedPitayaScpi
+from pymodaq_plugins_redpitaya.hardware.multi_board import (BoardAcquisition,
+                                                            MultiBoardAcquisition,
+                                                            parse_endpoints)
+from pymodaq_plugins_redpitaya.hardware.settings_cache import AcquisitionConfig
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+from pymodaq_plugins_redpitaya.hardware.trigger import TriggerTimeout
+
+
+def test_parse_endpoints():
+    assert parse_endpoints('10.42.0.77:5001, 10.42.0.78,') == [('10.42.0.77', 5001),
+                                                                ('10.42.0.78', 5000)]
+    for text in ('', ' , ', '10.42.0.77:port'):
+        with pytest.raises(ValueError):
+            parse_endpoints(text)
+
+
+@pytest.fixture
+def boards():
+    servers = [RedPitayaSimulator(inputs=('sine', 'noise'), frequency=1e5, amplitude=amplitude,
+                                  noise=0., latency=1e-3).start() for amplitude in (0.2, 0.5)]
+    controllers = [SharedRedPitayaScpi('127.0.0.1', server.address[1]) for server in servers]
+    acquisition = MultiBoardAcquisition([BoardAcquisition(controller)
+                                         for controller in controllers])
+    yield acquisition
+    acquisition.close()
+    for controller, server in zip(controllers, servers):
+        controller.adapter.close()
+        server.stop()
+
+
+def test_acquisition(boards):
+    config = AcquisitionConfig(nsamples=1000, decimation=8, channels=[1, 2], acq_format='BIN',
+                               trigger_source='CH1_PE', center_trigger=True, timeout=1.)
+    boards.configure(config, 0., True)
+    assert [board.controller.decimation for board in boards.boards] == [8, 8]
+
+    frames = boards.acquire(config)
+    assert frames.shape == (2, 2, 1000)
+    assert np.allclose(np.max(frames[:, 0], axis=-1), [0.2, 0.5], atol=1e-2)
+    assert np.allclose(frames[:, 1], 0)
+
+    out = np.zeros((2,) + config.shape, dtype=np.float32)
+    assert boards.acquire(config, out=out) is out
+
+    boards.cancel()
+    assert boards.acquire(config) is None
+    boards.reset()
+    assert boards.acquire(config) is not None
+
+
+def test_trigger_timeout(boards):
+    """ A missing trigger is raised at once, without being taken for a connection failure"""
+    config = AcquisitionConfig(nsamples=1000, decimation=8, channels=[1], acq_format='BIN',
+                               trigger_source='DISABLED', center_trigger=False, timeout=0.2)
+    boards.configure(config, 0., True)
+    generations = [board.controller.generation for board in boards.boards]
+    start = time.perf_counter()
+    with pytest.raises(TriggerTimeout):
+        boards.acquire(config)
+    assert time.perf_counter() - start < 0.4  # a single wait, not one more after a reconnection
+    assert [board.controller.generation for board in boards.boards] == generations
+
+
+def test_failing_again(boards, monkeypatch):
+    """ A communication failing again after the recovery is raised as a ConnectionError"""
+    config = AcquisitionConfig(nsamples=1000, decimation=8, channels=[1], acq_format='BIN',
+                               trigger_source='NOW', center_trigger=False, timeout=1.)
+    boards.configure(config, 0., True)
+    attempts = []
+
+    def arm(board):
+        attempts.append(board)
+        raise OSError('broken pipe')
+
+    monkeypatch.setattr(BoardAcquisition, 'arm', arm)
+    with pytest.raises(ConnectionError, match='again'):
+        boards.acquire(config)
+    assert len(attempts) == 4  # both boards, before and after the recovery
+
+
+def test_concurrency(boards):
+    """ The boards being handled concurrently, an acquisition lasts about as long as on one board"""
+    config = AcquisitionConfig(nsamples=1000, decimation=8, channels=[1], acq_format='BIN',
+                               trigger_source='NOW', center_trigger=False, timeout=1.)
+    boards.configure(config, 0., True)
+    single = MultiBoardAcquisition(boards.boards[:1])
+    try:
+        durations = []
+        for acquisition in (single, boards):
+            start = time.perf_counter()
+            for ind in range(10):
+                acquisition.acquire(config)
+            durations.append(time.perf_counter() - start)
+    finally:
+        single.close()
+    assert durations[1] < 1.5 * durations[0]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.processing import (FrameAccumulator, ExponentialAverage,
+                                                   FrequencyResponse, frequency_grid, split_segments,
+                                                   minmax_envelope, measurements, PowerSpectrum,
+                                                   Waterfall, LockIn, lockin_reference)
+
+
+def test_accumulator():
+    accumulator = FrameAccumulator((2, 10))
+    for ind in range(4):
+        accumulator.add(np.full((2, 10), ind, dtype=np.float32))
+    assert accumulator.count == 4
+    assert np.allclose(accumulator.mean(), 1.5)
+    accumulator.reset()
+    assert accumulator.count == 0
+    assert np.all(accumulator.sum == 0)
+
+
+def test_split_segments():
+    record = np.arange(2 * 100, dtype=np.float64).reshape((2, 100))
+    segments = split_segments(record, 4, 25, 20)
+    assert segments.shape == (2, 4, 20)
+    assert np.shares_memory(segments, record)
+    assert np.array_equal(segments[1, 2], record[1, 50:70])
+    overlapping = split_segments(record, 3, 10, 40)
+    assert np.array_equal(overlapping[0, 2], record[0, 20:60])
+    with pytest.raises(ValueError):
+        split_segments(record, 5, 25, 20)
+
+
+def test_minmax_envelope():
+    data = np.random.default_rng(0).normal(size=(2, 1003)).astype(np.float32)
+    envelope = minmax_envelope(data, 100)
+    assert envelope.shape == (2, 2 * 92)  # bins of 11 samples, the last one of 2
+    assert envelope.dtype == np.float32
+    assert np.array_equal(envelope[:, 0], data[:, :11].min(axis=-1))
+    assert np.array_equal(envelope[:, 1], data[:, :11].max(axis=-1))
+    assert np.array_equal(envelope[:, -1], data[:, 1001:].max(axis=-1))
+    assert envelope.max() == data.max() and envelope.min() == data.min()
+
+
+def test_measurements():
+    sampling_period = 64 / 125e6
+    time = np.arange(4096) * sampling_period
+    data = np.stack((0.5 * np.sin(2 * np.pi * 1e5 * time) + 0.1,
+                     np.where(np.sin(2 * np.pi * 12345. * time) > 0, 1., -1.)))
+    values = measurements(data[np.newaxis], sampling_period)
+    assert values['mean'].shape == (1, 2)
+    assert np.allclose(values['mean'][0, 0], 0.1, atol=1e-3)
+    assert np.allclose(values['rms'][0], [np.sqrt(0.125 + 0.01), 1.], rtol=1e-2)
+    assert np.allclose(values['peak_to_peak'][0], [1., 2.], rtol=1e-3)
+    assert np.allclose(values['frequency'][0], [1e5, 12345.], rtol=1e-3)
+
+    for npts in range(1, 4):  # too short to have a peak out of the DC bin
+        values = measurements(data[np.newaxis, :, :npts], sampling_period)
+        assert values['frequency'].shape == (1, 2) and np.all(np.isnan(values['frequency']))
+    assert np.all(np.isfinite(measurements(data[:, :4], sampling_period)['frequency']))
+
+
+def test_power_spectrum():
+    sampling_period = 64 / 125e6
+    time = np.arange(4096) * sampling_period
+    rng = np.random.default_rng(0)
+    frames = np.stack((0.5 * np.sin(2 * np.pi * 1e5 * time), rng.normal(0., 0.1, time.size)))
+    spectrum = PowerSpectrum(4096, sampling_period, 'Hann', segment_length=1024, overlap=0.5)
+    assert spectrum.nsegments == 7
+    assert spectrum.frequencies.size == 513
+    spectrum.add(frames)
+    spectrum.add(np.stack((frames, frames)))
+    assert spectrum.count == 3
+    density = spectrum.mean('density')
+    assert density.shape == (2, 513)
+    assert abs(spectrum.frequencies[np.argmax(density[0])] - 1e5) <= spectrum.frequency_step
+    # Parseval: the integral of the density is the variance of the noise
+    assert np.isclose(density[1].sum() * spectrum.frequency_step, 0.01, rtol=0.05)
+    spectrum.reset()
+    assert spectrum.count == 0
+
+
+def test_waterfall():
+    waterfall = Waterfall(3, (2, 4))
+    for ind in range(5):
+        waterfall.add(np.full((2, 4), ind), float(ind))
+        frames = waterfall.frames()
+        assert frames.shape == (2, min(ind + 1, 3), 4)
+        assert np.shares_memory(frames, waterfall.rows)
+        assert np.array_equal(frames[1, :, 0], waterfall.times())
+        assert waterfall.times()[-1] == ind
+    assert np.array_equal(waterfall.times(), [2, 3, 4])
+    assert waterfall.rows.shape == (2, 6, 4)
+
+    out = np.zeros((2, 3, 4))
+    frames = waterfall.frames(out=out)
+    assert np.shares_memory(frames, out) and not np.shares_memory(frames, waterfall.rows)
+    assert np.array_equal(frames, waterfall.frames())
+    waterfall.reset()
+    waterfall.add(np.full((2, 4), 5), 5.)
+    frames = waterfall.frames(out=out)
+    assert frames.shape == (2, 1, 4) and np.all(frames == 5)
+
+
+def test_exponential_average():
+    average = ExponentialAverage(alpha=0.5)
+    assert np.allclose(average.update(np.ones((3,))), 1)
+    result = average.update(np.zeros((3,)))
+    assert np.allclose(result, 0.5)
+    result[:] = 10  # the returned array is a copy
+    assert np.allclose(average.update(np.zeros((3,))), 0.25)
+
+
+def test_frequency_response():
+    sampling_period = 1e-6
+    time = np.arange(16384) * sampling_period
+    frequency = np.linspace(1e3, 1e5, time.size)
+    phase = 2 * np.pi * np.cumsum(frequency) * sampling_period
+    reference = np.sin(phase)
+    response = 0.5 * np.sin(phase - np.pi / 4)  # -6 dB, -45 deg at all frequencies
+
+    frequencies = frequency_grid(5e3, 9e4, 20, 'LOG')
+    assert np.isclose(frequencies[0], 5e3) and np.isclose(frequencies[-1], 9e4)
+    bode = FrequencyResponse(frequencies, 128)
+    for ind in range(2):
+        bode.add(reference, response, sampling_period)
+    assert bode.count == 2
+    magnitude, phase_deg = bode.magnitude_phase()
+    assert np.allclose(magnitude, 20 * np.log10(0.5), atol=0.1)
+    assert np.allclose(phase_deg, -45, atol=1)
+
+    outside = FrequencyResponse(frequency_grid(2e5, 3e5, 5), 128)
+    outside.add(reference, response, sampling_period)
+    assert np.all(np.isnan(outside.mean()))
+
+
+def test_lockin():
+    sampling_period = 1e-6
+    time = np.arange(5000) * sampling_period
+    signal = 0.3 * np.sin(2 * np.pi * 1e4 * time + np.deg2rad(30)) + 0.1
+    frames = np.stack((signal, 2 * signal)).astype(np.float32)
+
+    lockin = LockIn(1e4, sampling_period, phase=10.)
+    lockin.add(frames)
+    outputs = lockin.outputs()
+    assert np.allclose(outputs['R'], [0.3, 0.6], rtol=1e-3)
+    assert np.allclose(outputs['theta'], 20, atol=0.1)
+    assert np.allclose(outputs['X'], outputs['R'] * np.cos(np.deg2rad(20)), rtol=1e-3)
+
+    filtered = LockIn(1e4, sampling_period, time_constant=5e-4, order=3)
+    filtered.add(frames[np.newaxis].repeat(3, axis=0))
+    assert filtered.count == 3
+    assert np.allclose(filtered.outputs()['R'], [0.3, 0.6], rtol=1e-2)
+
+    start = -1.23e-3  # frames starting before the trigger
+    shifted = LockIn(1e4, sampling_period, phase=10.)
+    shifted.add(0.3 * np.sin(2 * np.pi * 1e4 * (time + start) + np.deg2rad(30))[np.newaxis],
+                start)
+    assert np.allclose(shifted.outputs()['theta'], 20, atol=0.1)
+
+
+def test_lockin_reference_cache():
+    table = lockin_reference(1e3, 0., 100, 1e-6)
+    assert table.shape == (100, 2)
+    assert not table.flags.writeable
+    assert lockin_reference(1e3, 0., 100, 1e-6) is table
+    assert lockin_reference(2e3, 0., 100, 1e-6) is not table
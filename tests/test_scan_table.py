@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.scan_table import ScanTable
+
+
+def test_grid():
+    table = ScanTable.from_grid(1e3, 1e5, 3, 'LOG', 0.1, 0.3)
+    assert len(table) == 3
+    assert np.allclose(table.frequencies, [1e3, 1e4, 1e5])
+    assert np.allclose(table.amplitudes, [0.1, 0.2, 0.3])
+    assert table[1] == pytest.approx((1e4, 0.2))
+    assert isinstance(table[1][0], float)
+
+    decreasing = ScanTable.from_grid(1e5, 1e3, 3, 'LINEAR')
+    assert decreasing.frequencies[0] == 1e5
+
+
+def test_validation():
+    with pytest.raises(ValueError, match='2 targets'):
+        ScanTable([1e3, 60e6, 1e3], [0.5, 0.5, 1.2])
+    with pytest.raises(ValueError, match='index 1'):
+        ScanTable([1e3, 1e3], [0.5, 0.8], offset=0.3)
+    with pytest.raises(ValueError):
+        ScanTable([], 0.1)
+    assert len(ScanTable([1e3, 2e3], 0.1)) == 2
+
+
+def test_load(tmp_path):
+    path = tmp_path / 'table.csv'
+    path.write_text('# frequency, amplitude\n1000, 0.1\n2000, 0.2\n')
+    table = ScanTable.load(path)
+    assert np.allclose(table.targets, [[1e3, 0.1], [2e3, 0.2]])
+    path.write_text('1000, 0.1\n')
+    assert len(ScanTable.load(path)) == 1
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import get_channel_data, get_channels_data
+
+
+class FakeController:
+    """ Mimic the write/read/read_bytes interface of a pymeasure Instrument"""
+
+    def __init__(self, answer: bytes):
+        self.answer = answer
+        self.written = []
+
+    def write(self, command: str):
+        self.written.append(command)
+
+    def read(self) -> str:
+        return self.answer.decode().strip()
+
+    def read_bytes(self, count: int) -> bytes:
+        chunk, self.answer = self.answer[:count], self.answer[count:]
+        return chunk
+
+
+def binary_block(data: np.ndarray) -> bytes:
+    payload = data.astype('>f4').tobytes()
+    length = str(len(payload)).encode()
+    return b'#' + str(len(length)).encode() + length + payload + b'\r\n'
+
+
+@pytest.mark.parametrize('acq_format', ('BIN', 'ASCII'))
+def test_get_channel_data(acq_format):
+    data = np.linspace(-1, 1, 101)
+    if acq_format == 'BIN':
+        controller = FakeController(binary_block(data))
+    else:
+        controller = FakeController(('{' + ','.join(f'{val:.6f}' for val in data) + '}\r\n').encode())
+
+    read = get_channel_data(controller, 2, 101, acq_format)
+    assert controller.written == ['ACQ:SOUR2:DATA:OLD:N? 101']
+    assert read.shape == (101,)
+    assert np.allclose(read, data, atol=1e-6)
+
+
+def test_binary_in_place():
+    data = np.linspace(-1, 1, 11)
+    out = np.zeros((11,), dtype=np.float32)
+    read = get_channel_data(FakeController(binary_block(data)), 1, 11, 'BIN', out=out)
+    assert read is out
+    assert np.allclose(out, data)
+
+
+def test_binary_bad_header():
+    with pytest.raises(IOError):
+        get_channel_data(FakeController(b'{1,2}\r\n'), 1, 2, 'BIN')
+
+
+def test_channels_pipelined():
+    data = np.stack((np.linspace(-1, 1, 21), np.linspace(1, -1, 21)))
+    controller = FakeController(binary_block(data[0]) + binary_block(data[1]))
+    read = get_channels_data(controller, (1, 2), 21, 'BIN')
+    assert controller.written == ['ACQ:SOUR1:DATA:OLD:N? 21\r\nACQ:SOUR2:DATA:OLD:N? 21']
+    assert read.shape == (2, 21)
+    assert np.allclose(read, data)
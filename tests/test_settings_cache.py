@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+
+from pymodaq_plugins_redpitaya.hardware.settings_cache import ScpiWriteCache, AcquisitionConfig
+
+
+class FakeTarget:
+    def __init__(self):
+        self.writes = []
+
+    def __setattr__(self, key, value):
+        if key != 'writes':
+            self.writes.append((key, value))
+        super().__setattr__(key, value)
+
+
+def test_write_cache():
+    target = FakeTarget()
+    cache = ScpiWriteCache(target)
+    assert cache.set('decimation', 8)
+    assert not cache.set('decimation', 8)
+    assert cache.set('decimation', 16)
+    assert cache.set('acq_format', 'BIN')
+    assert target.writes == [('decimation', 8), ('decimation', 16), ('acq_format', 'BIN')]
+
+    cache.replay()
+    assert target.writes[-2:] == [('decimation', 16), ('acq_format', 'BIN')]
+
+    cache.invalidate('decimation')
+    assert cache.set('decimation', 16)
+    cache.invalidate()
+    assert cache.values == {}
+
+
+def test_acquisition_config():
+    config = AcquisitionConfig(nsamples=1000, decimation=8, channels=[2], acq_format='BIN',
+                               trigger_source='NOW', center_trigger=True, timeout=0., clock=125e6)
+    assert config.shape == (1, 1000)
+    assert config.labels == ['IN2']
+    assert np.isclose(config.wait_time, 1000 * 8 / 125e6)
+    assert np.isclose(config.time_axis.get_data()[0], -config.wait_time / 2)
+    assert config.time_axis.size == 1000
+
+
+def test_segmented_config():
+    config = AcquisitionConfig(nsamples=100, decimation=8, channels=[1, 2], acq_format='BIN',
+                               trigger_source='NOW', center_trigger=False, timeout=0., clock=125e6,
+                               nsegments=5, period=150)
+    assert config.segmented
+    assert config.record_length == 4 * 150 + 100
+    assert config.record_shape == (2, 700)
+    assert config.shape == (2, 100)
+    assert np.isclose(config.get_segment_axis().get_data()[1], 150 * 8 / 125e6)
+    assert config.trigger_delay(16384) == 8192
+
+    centred = AcquisitionConfig(nsamples=100, decimation=8, channels=[1], acq_format='BIN',
+                                trigger_source='NOW', center_trigger=True, timeout=0.,
+                                clock=125e6, nsegments=5, period=150)
+    assert centred.trigger_delay(16384) == 8192 - 350  # the whole record is centred
+    assert np.isclose(centred.offset, -350 * 8 / 125e6)
+    assert not AcquisitionConfig(nsamples=100, decimation=8, channels=[1], acq_format='BIN',
+                                 trigger_source='NOW', center_trigger=False,
+                                 timeout=0.).segmented
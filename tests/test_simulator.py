@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import time
+
+import numpy as np
+import pytest
+
+from pymeasure.instruments.redpitaya.redpitaya_scpi import RedPitayaScpi
+
+from pymodaq_plugins_redpitaya.hardware.scpi_transfer import get_channels_data
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator, SimulatedBoard
+
+
+@pytest.fixture
+def simulator():
+    server = RedPitayaSimulator(inputs=('sine', 'noise'), frequency=1e5, amplitude=0.5,
+                                noise=0.).start()
+    controller = RedPitayaScpi(ip_address='127.0.0.1', port=server.address[1])
+    yield server, controller
+    controller.adapter.close()
+    server.stop()
+
+
+def test_acquisition(simulator):
+    server, controller = simulator
+    controller.decimation = 8
+    assert controller.decimation == 8
+    assert controller.buffer_length == SimulatedBoard.BUFFER_LENGTH
+
+    controller.acquisition_start()
+    assert not controller.acq_trigger_status
+    controller.acq_trigger_source = 'CH1_PE'
+    assert controller.acq_trigger_status
+    time.sleep(SimulatedBoard.BUFFER_LENGTH * 8 / SimulatedBoard.CLOCK)
+    assert controller.acq_buffer_filled
+
+    data = {}
+    for acq_format in ('ASCII', 'BIN'):
+        controller.acq_format = acq_format
+        data[acq_format] = get_channels_data(controller, (1, 2), 1000, acq_format)
+    assert data['BIN'].shape == (2, 1000)
+    assert np.allclose(data['ASCII'], data['BIN'], atol=1e-5)
+    assert np.isclose(np.max(data['BIN'][0]), 0.5, atol=1e-2)
+    assert np.allclose(data['BIN'][1], 0)
+
+
+def test_generator():
+    board = SimulatedBoard(inputs=('loopback', 'filtered'), noise=0.)
+    for command in ('OUTPUT1:STATE ON', 'SOUR1:FUNC SQUARE', 'SOUR1:VOLT 0.2',
+                    'SOUR1:FREQ:FIX 1000'):
+        assert board.handle(command) is None
+    assert board.handle('SOUR1:VOLT?') == b'0.2'
+    board.handle('ACQ:DEC 1024')
+    signal = board.input_signal(1, 1000)
+    assert np.allclose(np.unique(np.round(signal, 6)), [-0.2, 0.2])
+    board.handle('GEN:RST')
+    assert board.handle('OUTPUT1:STATE?') == b'OFF'
+    assert np.allclose(board.input_signal(2, 1000), 0)
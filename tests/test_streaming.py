@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import numpy as np
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.streaming import FrameRingBuffer, StreamingAcquisition
+
+
+def fill(ring: FrameRingBuffer, nframes: int, start: int = 0):
+    for ind in range(start, start + nframes):
+        ring.write_slot()[:] = ind
+        ring.commit()
+
+
+def test_ring_batch():
+    ring = FrameRingBuffer(4, (2, 10))
+    fill(ring, 3)
+    batch = ring.pop_batch()
+    assert batch.shape == (3, 2, 10)
+    assert np.all(batch[:, 0, 0] == [0, 1, 2])
+    assert ring.dropped == 0
+    assert ring.pop_batch() is None
+
+
+def test_ring_overflow():
+    ring = FrameRingBuffer(4, (2, 10))
+    fill(ring, 10)
+    batch = ring.pop_batch()
+    assert np.all(batch[:, 0, 0] == [7, 8, 9])
+    assert ring.acquired == 10
+    assert ring.dropped == 7
+
+
+def test_ring_latest():
+    ring = FrameRingBuffer(4, (1, 5))
+    fill(ring, 3)
+    assert np.all(ring.pop_latest() == 2)
+    assert ring.dropped == 2
+    fill(ring, 1, start=3)
+    out = np.zeros((1, 5), dtype=np.float32)
+    assert ring.pop_latest(out=out) is out
+    assert np.all(out == 3)
+    assert not ring.wait(0.01)
+
+
+def test_ring_depth():
+    with pytest.raises(ValueError):
+        FrameRingBuffer(1, (1, 5))
+
+
+def test_streaming_thread():
+    ring = FrameRingBuffer(8, (1, 5))
+
+    def grab_frame(frame: np.ndarray) -> bool:
+        frame[:] = ring.acquired
+        return True
+
+    streaming = StreamingAcquisition(ring, grab_frame)
+    streaming.start()
+    assert ring.wait(1)
+    streaming.stop(1)
+    assert not streaming.is_alive()
+    assert streaming.error is None
+    assert ring.acquired > 0
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+redpitaya_scpi = pytest.importorskip('pymeasure.instruments.redpitaya.redpitaya_scpi')
+if not hasattr(redpitaya_scpi, 'AnalogOutputFastChannel'):
+    pytest.skip('the generator needs the pymeasure version with analog outputs',
+                allow_module_level=True)
+
+from pymodaq_plugins_redpitaya.daq_viewer_plugins.plugins_1D.daq_1Dviewer_Sweep import \
+    DAQ_1DViewer_Sweep
+from pymodaq_plugins_redpitaya.hardware.simulator import RedPitayaSimulator
+
+
+def record_commands(plugin):
+    """ Record the commands written to the board by the plugin"""
+    commands = []
+    write = plugin.controller.write
+
+    def recording_write(command, **kwargs):
+        commands.append(command)
+        write(command, **kwargs)
+    plugin.controller.write = recording_write
+    return commands
+
+
+def generator_commands(commands):
+    return [command for command in commands if command.startswith(('SOUR', 'OUTPUT', 'GEN'))]
+
+
+def status_messages(plugin):
+    return [status.attribute[0] for status in plugin.statuses if status.command == 'Update_Status']
+
+
+def set_setting(plugin, *path, value):
+    param = plugin.settings.child(*path)
+    param.setValue(value)
+    plugin.commit_settings(param)
+
+
+@pytest.fixture
+def sweep():
+    server = RedPitayaSimulator().start()
+    plugin = DAQ_1DViewer_Sweep()
+    plugin.statuses = []
+    plugin.emitted = []
+    plugin.emit_status = plugin.statuses.append
+    plugin.settings.child('ip_address').setValue(server.address[0])
+    plugin.settings.child('port').setValue(server.address[1])
+    plugin.ini_detector()
+    plugin.board = server.board
+    plugin.dte_signal.connect(plugin.emitted.append)
+    yield plugin
+    plugin.close()
+    server.stop()
+
+
+def test_sweep_window(sweep):
+    set_setting(sweep, 'sampling', 'in2', value=True)
+    set_setting(sweep, 'sampling', 'nsamples', value=16384)
+    set_setting(sweep, 'response', 'enabled', value=True)
+    set_setting(sweep, 'output', 'sweep_time', value=1000000)  # 1 s, longer than the record
+    sweep.grab_data()
+    assert not sweep.emitted
+    assert 'sweep lasts' in status_messages(sweep)[-1]
+
+    set_setting(sweep, 'output', 'sweep_time', value=50)
+    sweep.grab_data()
+    assert len(sweep.emitted) == 1
+    assert [data.name for data in sweep.emitted[0]] == ['Magnitude', 'Phase']
+
+
+def test_session_reused(sweep):
+    set_setting(sweep, 'sampling', 'nsamples', value=1024)
+    set_setting(sweep, 'output', 'verify_every', value=0)
+    set_setting(sweep, 'output', 'persistent', value=True)
+    commands = record_commands(sweep)
+    sweep.grab_data()
+    assert sweep.session_active
+    assert sweep.board.generator[1]['SWEEP:STATE'] == 'ON'
+    assert sweep.board.generator[1]['OUTPUT:STATE'] == 'ON'
+
+    for ind in range(3):
+        commands.clear()
+        sweep.grab_data()
+        assert generator_commands(commands) == ['SOUR1:TRIG:INT']  # only the sweep re-triggered
+    assert len(sweep.emitted) == 4
+
+
+def test_session_verified(sweep):
+    set_setting(sweep, 'sampling', 'nsamples', value=1024)
+    set_setting(sweep, 'output', 'verify_every', value=2)
+    set_setting(sweep, 'output', 'persistent', value=True)
+    commands = record_commands(sweep)
+    sweep.grab_data()
+    checked = []
+    for ind in range(4):
+        commands.clear()
+        sweep.grab_data()
+        checked.append(any(command.endswith('?') for command in generator_commands(commands)))
+    assert checked == [False, True, False, True]
+
+
+def test_session_rewritten(sweep):
+    set_setting(sweep, 'sampling', 'nsamples', value=1024)
+    set_setting(sweep, 'output', 'amplitude', value=0.2)
+    set_setting(sweep, 'output', 'verify_every', value=1)
+    set_setting(sweep, 'output', 'persistent', value=True)
+    sweep.grab_data()
+    sweep.grab_data()
+    assert not status_messages(sweep)
+
+    with sweep.board.lock:  # changed by another client of the board
+        sweep.board.generator[1]['VOLT'] = '0.9'
+        sweep.board.generator[1]['SWEEP:MODE'] = 'LOG'
+    sweep.grab_data()
+    assert float(sweep.board.generator[1]['VOLT']) == pytest.approx(0.2)
+    assert sweep.board.generator[1]['SWEEP:MODE'] == sweep.settings['output', 'sweep_mode']
+    assert 'reconfiguring' in status_messages(sweep)[-1]
+    assert sweep.session_active
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import csv
+import json
+
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.telemetry import FrameTelemetry, STAGES
+
+
+class FakeController:
+    def __init__(self):
+        self.commands = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+def record_frame(telemetry: FrameTelemetry, controller: FakeController, emit=True):
+    telemetry.begin()
+    for stage in STAGES[:-1]:
+        controller.commands += 1
+        controller.bytes_sent += 10
+        telemetry.mark(stage)
+    controller.bytes_received += 100
+    if emit:
+        telemetry.mark('emit')
+    return telemetry.end()
+
+
+def test_disabled():
+    telemetry = FrameTelemetry(FakeController())
+    assert not record_frame(telemetry, telemetry.controller)
+    assert len(telemetry.records) == 0
+    assert telemetry.statistics() == {}
+
+
+def test_records():
+    controller = FakeController()
+    telemetry = FrameTelemetry(controller, window=3)
+    telemetry.enabled = True
+    assert not record_frame(telemetry, controller, emit=False)
+    assert len(telemetry.records) == 0
+
+    for ind in range(5):
+        assert record_frame(telemetry, controller)
+    assert len(telemetry.records) == 3
+    record = telemetry.records[-1]
+    assert record['commands'] == 4
+    assert record['bytes_sent'] == 40
+    assert record['bytes_received'] == 100
+    assert record['total'] == pytest.approx(sum(record[stage] for stage in STAGES))
+
+    statistics = telemetry.statistics()
+    assert statistics['commands'] == 4
+    assert set(STAGES) <= set(statistics)
+
+    telemetry.window = 2
+    assert len(telemetry.records) == 2
+    telemetry.reset()
+    assert len(telemetry.records) == 0
+
+
+def test_export(tmp_path):
+    controller = FakeController()
+    telemetry = FrameTelemetry(controller)
+    telemetry.enabled = True
+    for ind in range(2):
+        record_frame(telemetry, controller)
+
+    records = json.loads(telemetry.export(tmp_path / 'telemetry.json').read_text())
+    assert len(records) == 2
+    assert records[0]['bytes_received'] == 100
+
+    with telemetry.export(tmp_path / 'telemetry.csv').open() as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 2
+    assert int(rows[1]['commands']) == 4
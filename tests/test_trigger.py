@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Created the 17/10/2026
+"""
+import threading
+import time
+
+import pytest
+
+from pymodaq_plugins_redpitaya.hardware.trigger import TriggerWaiter, TriggerTimeout
+
+
+class FakeController:
+    def __init__(self, npolls_trigger=3, npolls_filled=2):
+        self.npolls_trigger = npolls_trigger
+        self.npolls_filled = npolls_filled
+        self.polls = 0
+
+    @property
+    def acq_trigger_status(self):
+        self.polls += 1
+        return self.polls > self.npolls_trigger
+
+    @property
+    def acq_buffer_filled(self):
+        self.polls += 1
+        return self.polls > self.npolls_trigger + self.npolls_filled
+
+
+def test_wait():
+    controller = FakeController()
+    assert TriggerWaiter(controller).wait(1e-3)
+    assert controller.polls == 6
+
+
+def test_timeout():
+    with pytest.raises(TriggerTimeout):
+        TriggerWaiter(FakeController(npolls_trigger=10**6)).wait(1e-3, timeout=0.05)
+
+
+def test_cancel():
+    waiter = TriggerWaiter(FakeController(npolls_trigger=10**6))
+    threading.Timer(0.05, waiter.cancel).start()
+    start = time.perf_counter()
+    assert not waiter.wait(1e-3)
+    assert time.perf_counter() - start < 1
+    waiter.reset()
+    assert not waiter.cancelled